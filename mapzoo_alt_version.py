@@ -1,10 +1,32 @@
+import time
+startup_time = time.perf_counter()  # For the time-to-first-frame report
+
 from OpenGL.GL import *
 from OpenGL.GLUT import *
 from OpenGL.GLU import *
 from OpenGL.GLUT import GLUT_BITMAP_HELVETICA_18
-import random
 import math
-import time
+import os
+import sys
+
+import numpy as np
+
+import zoo_sim as sim
+from zoo_particles import ParticleSystem, MAX_PARTICLES
+from zoo_picking import EntityPicker, aim_direction, unproject_ray
+from zoo_simthread import SimThread, take_snapshot
+from zoo_render_queue import RenderQueue, OPAQUE, OVERLAY
+from zoo_quality import QualityController
+from zoo_profiler import DeepProfiler
+from zoo_impostors import ImpostorAtlas
+from zoo_minimap import Minimap, REFRESH_RATE as MINIMAP_RATE
+from zoo_meshes import MeshLibrary
+from zoo_lighting import BakedScenery, setup_light, place_light
+from zoo_framebuffer import Framebuffer
+from zoo_rewind import RewindBuffer, SECONDS as REWIND_SECONDS
+from zoo_terrain import VIEW_DISTANCE
+import zoo_telemetry
+import zoo_events
 
 # Camera-related variables
 camera_pos = (0, 500, 350)  # Adjusted camera height
@@ -12,26 +34,6 @@ camera_angle = 0
 camera_mode = "third_person"  # "first_person" or "third_person"
 
 fovY = 90  # Reduced field of view for better perspective
-GRID_LENGTH = 600  # Length of grid lines
-
-# Game state
-game_score = 0
-currency = 1000  # Starting currency
-game_time = 0
-game_paused = False
-last_time = time.time()
-
-# Player-related variables
-player_pos = [0, 0, 30]  # x, y, z position
-player_angle = 0
-player_speed = 10
-interaction_range = 100  # Range for animal interaction
-shoot_cooldown = 0
-selected_animal_index = None
-feed_cost = 50
-
-# OpenGL utilities
-quad = gluNewQuadric()
 
 
 SKY_COLOR = (0.6, 0.8, 1.0)  # Light blue sky
@@ -39,260 +41,127 @@ GROUND_COLOR = (0.35, 0.25, 0.1)  # Brown soil
 FENCE_HEIGHT = 50
 FENCE_POST_THICKNESS = 8
 
-game_over = False
-restart_timer = None
-
-# Animals
-class Animal:
-    def __init__(self, pos, type_name, habitat_color, size):
-        self.pos = list(pos)
-        self.type = type_name
-        self.habitat_color = habitat_color
-        self.size = size
-        self.happiness = 100
-        self.health = 100
-        self.last_move_time = time.time()
-        self.move_dir = [random.uniform(-1, 1), random.uniform(-1, 1), 0]
-        self.normalize_dir()
-        self.captured = False
-        self.last_happiness_decay = time.time()
-        self.is_eating = False
-        self.habitat_index = None  # Will be set when creating the animal
-        self.last_food_check = time.time()
-        self.last_food_check = time.time()
-        self.hunger_rate = random.uniform(0.15, 0.25)  # Different hunger rates for animals
-        self.dead = False
-    def normalize_dir(self):
-        length = math.sqrt(self.move_dir[0]**2 + self.move_dir[1]**2)
-        if length > 0:
-            self.move_dir[0] /= length
-            self.move_dir[1] /= length
-    
-    def update(self, current_time):
-        if self.dead or self.captured:
-            return
-            
-        # Move randomly or go to feeding station if hungry
-        if self.happiness < 70 and FOOD_LEVEL[self.habitat_index] > 0:
-            # Calculate direction to feeding station
-            habitat = habitats[self.habitat_index]
-            feeding_x = habitat["center"][0] + 50  # Feeding station offset
-            feeding_y = habitat["center"][1] - 50
-            
-            dir_to_food = [feeding_x - self.pos[0], feeding_y - self.pos[1]]
-            food_dist = math.sqrt(dir_to_food[0]**2 + dir_to_food[1]**2)
-            
-            if food_dist < 30:  # Close enough to eat - increased range
-                self.is_eating = True
-                # Check if we can consume food every 5 seconds
-                if current_time - self.last_food_check > 5 and FOOD_LEVEL[self.habitat_index] > 0:
-                    self.happiness = min(100, self.happiness + 20)
-                    self.health = min(100, self.health + 15)
-                    FOOD_LEVEL[self.habitat_index] -= 1  # Consume food
-                    self.last_food_check = current_time
-            else:
-                # Move toward feeding station
-                self.is_eating = False
-                if food_dist > 0:
-                    self.move_dir[0] = dir_to_food[0] / food_dist
-                    self.move_dir[1] = dir_to_food[1] / food_dist
-                    self.pos[0] += self.move_dir[0] * 2  # Move faster when hungry
-                    self.pos[1] += self.move_dir[1] * 2
-        else:
-            self.is_eating = False
-            # Normal random movement
-            if current_time - self.last_move_time > 3:
-                self.move_dir = [random.uniform(-1, 1), random.uniform(-1, 1), 0]
-                self.normalize_dir()
-                self.last_move_time = current_time
-            
-            # Stay within habitat bounds (radius 200 from habitat center)
-            dist_from_habitat = math.sqrt((self.pos[0] - self.habitat_pos[0])**2 + 
-                                         (self.pos[1] - self.habitat_pos[1])**2)
-            
-            if dist_from_habitat < 180:  # Normal movement inside habitat
-                self.pos[0] += self.move_dir[0] * 1
-                self.pos[1] += self.move_dir[1] * 1
-            else:  # Move back toward habitat center
-                dir_to_center = [self.habitat_pos[0] - self.pos[0], 
-                                self.habitat_pos[1] - self.pos[1]]
-                length = math.sqrt(dir_to_center[0]**2 + dir_to_center[1]**2)
-                if length > 0:
-                    dir_to_center[0] /= length
-                    dir_to_center[1] /= length
-                self.pos[0] += dir_to_center[0] * 2
-                self.pos[1] += dir_to_center[1] * 2
-        
-        # Happiness and health decay over time - more significant impact of hunger
-        if current_time - self.last_happiness_decay > 10:  # Every 10 seconds
-            self.happiness = max(0, self.happiness - 3)  # Faster happiness decay
-            
-            # Health decay based on happiness level
-            if self.happiness < 30:
-                self.health = max(0, self.health - self.hunger_rate * 4)  # Severe health impact
-            elif self.happiness < 60:
-                self.health = max(0, self.health - self.hunger_rate * 2)  # Moderate health impact
-            else:
-                # Minor health decay even when happy, to ensure feeding is needed
-                self.health = max(0, self.health - self.hunger_rate)
-                
-            self.last_happiness_decay = current_time
-            
-        # Check if animal has died from starvation
-        if self.health <= 0:
-            self.dead = True
-    
-    def feed(self):
-        # Old direct feeding method (still used for backward compatibility)
-        self.happiness = min(100, self.happiness + 30)
-        self.health = min(100, self.health + 20)
-        
-    def get_color(self):
-        # Health-based color (red component increases as health decreases)
-        r = 1.0 - (self.health / 100) * 0.8
-        g = (self.health / 100) * 0.8
-        b = 0.2
-        return (r, g, b)
-# Initialize animal habitats and animals
-# Update habitats to rename Desert to Farm
-habitats = [
-    {"center": (-400, 400, 0), "color": (0.2, 0.7, 0.2), "name": "Savannah"},
-    {"center": (400, 400, 0), "color": (0.2, 0.2, 0.7), "name": "Arctic"},
-    {"center": (-400, -400, 0), "color": (0.7, 0.5, 0.2), "name": "Farm"},  # Changed from Desert
-    {"center": (400, -400, 0), "color": (0.1, 0.5, 0.1), "name": "Jungle"}
-]
-FEEDING_STATION_SIZE = 40
-FOOD_LEVEL = {}
-# Initialize feeding stations for each habitat
-for i, habitat in enumerate(habitats):
-    FOOD_LEVEL[i] = 0  # Start with empty feeding stations
-
-# Expand animal types with farm animals
-animal_types = [
-    # Savannah zone
-    {"name": "Elephant", "size": 60, "habitat_index": 0},
-    {"name": "Lion", "size": 40, "habitat_index": 0},
-    {"name": "Giraffe", "size": 50, "habitat_index": 0},
-    {"name": "Zebra", "size": 35, "habitat_index": 0},
-    
-    # Arctic zone
-    {"name": "Polar Bear", "size": 50, "habitat_index": 1},
-    {"name": "Penguin", "size": 30, "habitat_index": 1},
-    {"name": "Arctic Fox", "size": 25, "habitat_index": 1},
-    
-    # Farm zone (replacing Desert)
-    {"name": "Cow", "size": 45, "habitat_index": 2},
-    {"name": "Horse", "size": 50, "habitat_index": 2},
-    {"name": "Goat", "size": 30, "habitat_index": 2},
-    {"name": "Sheep", "size": 35, "habitat_index": 2},
-    
-    # Jungle zone
-    {"name": "Tiger", "size": 40, "habitat_index": 3},
-    {"name": "Monkey", "size": 25, "habitat_index": 3},
-    {"name": "Panda", "size": 45, "habitat_index": 3}
-]
-
-# Initialize animals in their habitats (modify the existing initialization)
-animals = []
-for animal_type in animal_types:
-    habitat = habitats[animal_type["habitat_index"]]
-    pos_x = habitat["center"][0] + random.uniform(-150, 150)
-    pos_y = habitat["center"][1] + random.uniform(-150, 150)
-    animal = Animal((pos_x, pos_y, 20), animal_type["name"], habitat["color"], animal_type["size"])
-    animal.habitat_pos = habitat["center"]
-    animal.habitat_index = animal_type["habitat_index"]  # Set the habitat index
-    animals.append(animal)
-# Poachers
-class Poacher:
-    def __init__(self, pos, target_animal):
-        self.pos = list(pos)
-        self.target_animal = target_animal
-        self.speed = 10
-        self.captured = False
-        self.active = True
-        self.direction_change_time = time.time()
-        
-    def update(self):
-        if not self.active or self.captured:
-            return
-        
-        current_time = time.time()
-        
-        # Move towards target animal
-        if self.target_animal and not self.target_animal.captured and not self.target_animal.dead:
-            # Change direction less frequently for slower, more predictable movement
-            if current_time - self.direction_change_time > 2:
-                dir_x = self.target_animal.pos[0] - self.pos[0]
-                dir_y = self.target_animal.pos[1] - self.pos[1]
-                length = math.sqrt(dir_x**2 + dir_y**2)
-                
-                if length < 20:  # Captured animal
-                    self.target_animal.captured = True
-                    self.active = False
-                elif length > 0:
-                    dir_x /= length
-                    dir_y /= length
-                    
-                    # Add some randomness to movement for less direct pathing
-                    dir_x += random.uniform(-0.3, 0.3)
-                    dir_y += random.uniform(-0.3, 0.3)
-                    
-                    # Re-normalize
-                    new_length = math.sqrt(dir_x**2 + dir_y**2)
-                    if new_length > 0:
-                        dir_x /= new_length
-                        dir_y /= new_length
-                    
-                    # Update position
-                    self.pos[0] += dir_x * self.speed
-                    self.pos[1] += dir_y * self.speed
-                    
-                self.direction_change_time = current_time
-        else:
-            # Find a new target if the current one is captured or dead
-            valid_targets = [a for a in animals if not a.captured and not a.dead]
-            if valid_targets:
-                self.target_animal = random.choice(valid_targets)
-            else:
-                self.active = False  # No more targets available
-
-poachers = []
-last_poacher_spawn_time = time.time()
-poacher_spawn_interval = 15  # Spawn a poacher every 15 seconds
-
-# Tranquilizer darts
-class Dart:
-    def __init__(self, pos, direction):
-        self.pos = list(pos)
-        self.direction = direction
-        self.speed = 15
-        self.active = True
-        self.life_time = time.time() + 5  # Dart exists for 5 seconds
-        
-    def update(self):
-        if not self.active:
+# Startup budget: warn if the first frame takes longer than this after launch
+FIRST_FRAME_TARGET = 1.5  # seconds
+first_frame_done = False
+
+# Particle effects (feeding, dart hits, captures, deaths)
+particles = ParticleSystem(MAX_PARTICLES)
+PARTICLE_SIZE = 4
+last_frame_time = None
+
+WAVE_POACHER_SIZE = 12  # Point size for poachers in a wave
+
+# Solid shapes go through a sorted render queue; static scenery is recorded once
+# and drawn with its lighting baked into vertex colours
+render_queue = RenderQueue()
+scenery = RenderQueue()
+baked_scenery = BakedScenery()
+show_render_stats = False
+
+WINDOW_WIDTH, WINDOW_HEIGHT = 1000, 800
+
+# Detail and internal resolution follow measured frame time (see zoo_quality)
+quality = QualityController()
+low_res = None  # Smaller framebuffer the scene is drawn into when the tier's render_scale < 1
+
+def apply_quality(settings):
+    render_queue.detail = scenery.detail = settings["detail"]
+    scenery.begin()  # Re-recorded with the new fence detail on the next frame
+    particles.set_limit(settings["particle_cap"])
+
+quality.listeners.append(apply_quality)
+apply_quality(quality.settings)
+
+# Shift+P captures the next frames with cProfile and a stack sampler (see zoo_profiler)
+profiler = DeepProfiler()
+
+# Species models as packed meshes, per detail level (zoo_meshes); set up by init_gl
+species_meshes = MeshLibrary()
+
+# Species sprites for distant animals (zoo_impostors); baked or loaded from disk by init_gl
+impostors = None
+
+# Top-down minimap, re-rendered to a texture a few times a second (ZOO_MINIMAP_RATE, in Hz)
+minimap = Minimap(rate=float(os.environ.get("ZOO_MINIMAP_RATE", MINIMAP_RATE)))
+show_minimap = True
+MINIMAP_RECT = (780, 20, 980, 220)  # In the 1000x800 HUD coordinates
+
+# Per-tick shared-memory telemetry when ZOO_TELEMETRY is set (see zoo_telemetry)
+telemetry = None
+
+# Gameplay event log when ZOO_EVENTS is set (see zoo_events)
+events = None
+
+camera_eye = (0, 500, 350)  # Updated by setupCamera, used for terrain LOD
+
+# Mouse picking: camera matrices from the last frame and a BVH over entities
+pick_matrices = None
+picker = EntityPicker()
+
+def mouse_ray(x, y):
+    # World-space ray under the mouse, or None before the first frame
+    if pick_matrices is None:
+        return None
+    return unproject_ray(x, y, *pick_matrices)
+
+# Other rangers' (position, angle) pairs, filled in by the network client
+other_rangers = []
+
+# World state the renderer draws: zoo_sim itself, or the simulation thread's latest snapshot
+view = sim
+sim_thread = None
+ticks = 0  # update_game() calls made by step_frame
+
+# The last seconds of play (ZOO_REWIND_SECONDS), scrubbed through with , and .
+rewind = RewindBuffer(seconds=float(os.environ.get("ZOO_REWIND_SECONDS", REWIND_SECONDS)))
+rewind_view = None  # Snapshot under the rewind cursor
+rewind_paused_game = False  # Whether rewinding paused the game, so leaving it resumes
+SCRUB_STEP = 6  # Frames per key press
+
+def send(action, *args):
+    # Game actions run on the simulation thread when there is one
+    if sim_thread is not None:
+        sim_thread.submit(action, *args)
+    else:
+        action(*args)
+
+def select_animal(handle):
+    sim.selected_animal = handle
+
+def set_paused(paused):
+    sim.game_paused = paused
+
+def scrub(frames):
+    # Move through the rewind buffer; the game is held still while looking back
+    global rewind_view, rewind_paused_game
+    if rewind.cursor is None:
+        if frames > 0 or not len(rewind):
             return
-        
-        self.pos[0] += self.direction[0] * self.speed
-        self.pos[1] += self.direction[1] * self.speed
-        self.pos[2] += self.direction[2] * self.speed
-        
-        # Check if dart has expired
-        if time.time() > self.life_time:
-            self.active = False
-        
-        # Check collision with poachers (use only X/Y distance)
-        for poacher in poachers:
-            if poacher.active and not poacher.captured:
-                dist = math.sqrt((self.pos[0] - poacher.pos[0])**2 + 
-                                (self.pos[1] - poacher.pos[1])**2)
-                if dist < 30:  # Hit detection radius
-                    poacher.captured = True
-                    self.active = False
-                    global game_score
-                    game_score += 100
-
-darts = []
+        rewind_paused_game = not view.game_paused
+        if rewind_paused_game:
+            send(set_paused, True)
+    rewind_view = rewind.scrub(frames)
+    if rewind_view is None:
+        leave_rewind()
+
+def leave_rewind():
+    global rewind_view, rewind_paused_game
+    rewind.cursor = None
+    rewind_view = None
+    if rewind_paused_game:
+        send(set_paused, False)
+        rewind_paused_game = False
+
+def find_selected_animal():
+    # The selection is a handle; find it among the animals being drawn
+    for animal in view.animals:
+        if animal.handle == view.selected_animal:
+            return animal
+    return None
+
+# GLUT bitmap text needs glutInit; headless OSMesa capture turns the HUD text off
+hud_text = True
 
 def draw_sky():
     # Draw a sky gradient as a large quad backdrop
@@ -370,115 +239,167 @@ def draw_mountain_ring(center_x, center_y, radius=1200, base_z=-1, peak_min=250,
     
     glPopMatrix()
 
+def draw_terrain():
+    # Quadtree-selected tiles, each one cached vertex/colour array draw
+    glDisable(GL_LIGHTING)  # Shading is baked into the tile colours
+    glEnableClientState(GL_VERTEX_ARRAY)
+    glEnableClientState(GL_COLOR_ARRAY)
+    indices = view.terrain.indices
+    lod_range = quality.settings["terrain_lod_range"]
+    for level, tx, ty in view.terrain.select_tiles(camera_eye, lod_range=lod_range):
+        vertices, colors = view.terrain.tile(level, tx, ty)
+        glVertexPointer(3, GL_FLOAT, 0, vertices)
+        glColorPointer(3, GL_FLOAT, 0, colors)
+        glDrawElements(GL_TRIANGLES, len(indices), GL_UNSIGNED_INT, indices)
+    glDisableClientState(GL_COLOR_ARRAY)
+    glDisableClientState(GL_VERTEX_ARRAY)
+    glEnable(GL_LIGHTING)
+
 def draw_environment():
     draw_sky()
     
-    # Draw ground (large enough for all habitats and mountains)
-    # Ground color (sandy/dirt color)
-    glDisable(GL_LIGHTING)  # Disable lighting for consistent ground color
-    glColor3f(0.76, 0.70, 0.50)  # Sandy/dirt color
-    glBegin(GL_QUADS)
-    glVertex3f(-1400, -1400, -1)
-    glVertex3f(1400, -1400, -1)
-    glVertex3f(1400, 1400, -1)
-    glVertex3f(-1400, 1400, -1)
-    glEnd()
-    glEnable(GL_LIGHTING)  # Re-enable lighting for other objects
+    if view.terrain is not None:
+        draw_terrain()
+    else:
+        # Draw ground (large enough for all habitats and mountains)
+        # Ground color (sandy/dirt color)
+        glDisable(GL_LIGHTING)  # Disable lighting for consistent ground color
+        glColor3f(0.76, 0.70, 0.50)  # Sandy/dirt color
+        glBegin(GL_QUADS)
+        glVertex3f(-1400, -1400, -1)
+        glVertex3f(1400, -1400, -1)
+        glVertex3f(1400, 1400, -1)
+        glVertex3f(-1400, 1400, -1)
+        glEnd()
+        glEnable(GL_LIGHTING)  # Re-enable lighting for other objects
+        
+        # Draw mountains ring around the play area
+        draw_mountain_ring(0, 0, radius=1200, base_z=-1, peak_min=250, peak_max=400,
+                           segments=quality.settings["mountain_segments"])
     
-    # Draw mountains ring around the play area
-    draw_mountain_ring(0, 0, radius=1200, base_z=-1, peak_min=250, peak_max=400, segments=64)
+    # Habitat grounds, fences and troughs never change; record and light them once
+    if not scenery.items:
+        record_habitat_scenery(scenery)
+        baked_scenery.bake(scenery.items)
+    baked_scenery.draw()
+    
+    # Draw food piles (height based on food level)
+    rq = render_queue
+    for i, habitat in enumerate(view.habitats):
+        if view.FOOD_LEVEL[i] <= 0:
+            continue
+        food_height = min(view.FOOD_LEVEL[i] * 2, 20)
+        
+        # Food color depends on habitat
+        if i == 0:  # Savannah - yellowish grass
+            rq.color(0.8, 0.7, 0.2)
+        elif i == 1:  # Arctic - fish
+            rq.color(0.7, 0.7, 0.8)
+        elif i == 2:  # Farm - hay
+            rq.color(0.9, 0.8, 0.2)
+        else:  # Jungle - fruits
+            rq.color(0.8, 0.2, 0.2)
+        
+        x, y, z = habitat["center"]
+        rq.push()
+        rq.translate(x + 50, y - 50, z + food_height/2)  # Feeding station offset from center
+        rq.scale(view.FEEDING_STATION_SIZE - 10, view.FEEDING_STATION_SIZE/2 - 5, food_height)
+        rq.cube(1)
+        rq.pop()
+
+def record_habitat_scenery(rq):
+    posts = quality.settings["fence_posts"]
+    rails = quality.settings["fence_rails"]
     
     # Draw habitats (main area, detailed)
-    for i, habitat in enumerate(habitats):
-        glPushMatrix()
+    for i, habitat in enumerate(view.habitats):
+        rq.push()
         x, y, z = habitat["center"]
-        glTranslatef(x, y, z)
+        rq.translate(x, y, z)
         
         # Draw habitat circular ground with unique texture
-        glColor3f(*habitat["color"])
-        glBegin(GL_POLYGON)
-        for j in range(36):
-            angle = j * 10 * math.pi / 180
-            glVertex3f(200 * math.cos(angle), 200 * math.sin(angle), 0.1)  # Slightly above ground
-        glEnd()
+        rq.color(*habitat["color"])
+        rq.disc(200, 36, 0.1)  # Slightly above ground
         
         # Draw fences around habitats
-        glColor3f(0.6, 0.4, 0.2)  # Wood color
-        for j in range(36):
-            angle1 = j * 10 * math.pi / 180
-            angle2 = (j+1) * 10 * math.pi / 180
+        rq.color(0.6, 0.4, 0.2)  # Wood color
+        for j in range(posts):
+            angle1 = j * 2 * math.pi / posts
             
             # Draw fence post
-            glPushMatrix()
-            glTranslatef(200 * math.cos(angle1), 200 * math.sin(angle1), 0)
-            glRotatef(angle1 * 180/math.pi + 90, 0, 0, 1)
+            rq.push()
+            rq.translate(200 * math.cos(angle1), 200 * math.sin(angle1), 0)
+            rq.rotate(angle1 * 180/math.pi + 90, 0, 0, 1)
             
             # Fence post
-            glPushMatrix()
-            glScalef(FENCE_POST_THICKNESS, FENCE_POST_THICKNESS, FENCE_HEIGHT)
-            glutSolidCube(1)
-            glPopMatrix()
+            rq.push()
+            rq.scale(FENCE_POST_THICKNESS, FENCE_POST_THICKNESS, FENCE_HEIGHT)
+            rq.cube(1)
+            rq.pop()
             
-            # Horizontal rails (2 rails)
-            for h in range(1, 3):
-                rail_height = FENCE_HEIGHT * h/3
-                glPushMatrix()
-                glTranslatef(0, 0, rail_height)
-                glRotatef(90, 0, 1, 0)
-                gluCylinder(gluNewQuadric(), FENCE_POST_THICKNESS/2, FENCE_POST_THICKNESS/2, 
-                           2 * math.pi * 200/36, 4, 1)
-                glPopMatrix()
+            # Horizontal rails
+            for h in range(1, rails + 1):
+                rail_height = FENCE_HEIGHT * h/(rails + 1)
+                rq.push()
+                rq.translate(0, 0, rail_height)
+                rq.rotate(90, 0, 1, 0)
+                rq.cylinder(FENCE_POST_THICKNESS/2, FENCE_POST_THICKNESS/2, 
+                           2 * math.pi * 200/posts, 4, 1)
+                rq.pop()
                 
-            glPopMatrix()
+            rq.pop()
         
         # Draw feeding station for this habitat
-        glPushMatrix()
-        glTranslatef(50, -50, 0)  # Offset from center
+        rq.push()
+        rq.translate(50, -50, 0)  # Offset from center
         
         # Base of feeding trough
-        glColor3f(0.4, 0.3, 0.2)  # Dark wood color
-        glPushMatrix()
-        glScalef(FEEDING_STATION_SIZE, FEEDING_STATION_SIZE/2, FEEDING_STATION_SIZE/4)
-        glutSolidCube(1)
-        glPopMatrix()
+        rq.color(0.4, 0.3, 0.2)  # Dark wood color
+        rq.push()
+        rq.scale(view.FEEDING_STATION_SIZE, view.FEEDING_STATION_SIZE/2, view.FEEDING_STATION_SIZE/4)
+        rq.cube(1)
+        rq.pop()
         
         # Legs for the feeding trough
         for leg_x, leg_y in [(1, 1), (1, -1), (-1, 1), (-1, -1)]:
-            glPushMatrix()
-            glTranslatef(
-                leg_x * (FEEDING_STATION_SIZE/2 - 5), 
-                leg_y * (FEEDING_STATION_SIZE/4 - 5), 
-                -FEEDING_STATION_SIZE/8
+            rq.push()
+            rq.translate(
+                leg_x * (view.FEEDING_STATION_SIZE/2 - 5), 
+                leg_y * (view.FEEDING_STATION_SIZE/4 - 5), 
+                -view.FEEDING_STATION_SIZE/8
             )
-            glScalef(4, 4, FEEDING_STATION_SIZE/4)
-            glutSolidCube(1)
-            glPopMatrix()
-            
-        # Draw food pile (height based on food level)
-        if FOOD_LEVEL[i] > 0:
-            food_height = min(FOOD_LEVEL[i] * 2, 20)
-            
-            # Food color depends on habitat
-            if i == 0:  # Savannah - yellowish grass
-                glColor3f(0.8, 0.7, 0.2)
-            elif i == 1:  # Arctic - fish
-                glColor3f(0.7, 0.7, 0.8)
-            elif i == 2:  # Farm - hay
-                glColor3f(0.9, 0.8, 0.2)
-            else:  # Jungle - fruits
-                glColor3f(0.8, 0.2, 0.2)
-                
-            glPushMatrix()
-            glTranslatef(0, 0, food_height/2)
-            glScalef(FEEDING_STATION_SIZE - 10, FEEDING_STATION_SIZE/2 - 5, food_height)
-            glutSolidCube(1)
-            glPopMatrix()
+            rq.scale(4, 4, view.FEEDING_STATION_SIZE/4)
+            rq.cube(1)
+            rq.pop()
             
-        glPopMatrix()  # End feeding station
+        rq.pop()  # End feeding station
         
-        glPopMatrix()  # End of habitat drawing
+        rq.pop()  # End of habitat drawing
+
+def draw_minimap():
+    # One textured quad in HUD coordinates, like draw_text
+    glDisable(GL_LIGHTING)
+    glDisable(GL_DEPTH_TEST)
+    glMatrixMode(GL_PROJECTION)
+    glPushMatrix()
+    glLoadIdentity()
+    gluOrtho2D(0, 1000, 0, 800)
+    glMatrixMode(GL_MODELVIEW)
+    glPushMatrix()
+    glLoadIdentity()
+    
+    minimap.draw(*MINIMAP_RECT)
+    
+    glPopMatrix()
+    glMatrixMode(GL_PROJECTION)
+    glPopMatrix()
+    glMatrixMode(GL_MODELVIEW)
+    glEnable(GL_DEPTH_TEST)
+    glEnable(GL_LIGHTING)
 
 def draw_text(x, y, text, font=GLUT_BITMAP_HELVETICA_18):
+    if not hud_text:
+        return
     glColor3f(1, 1, 1)
     glMatrixMode(GL_PROJECTION)
     glPushMatrix()
@@ -502,466 +423,306 @@ def draw_text(x, y, text, font=GLUT_BITMAP_HELVETICA_18):
     glPopMatrix()
     glMatrixMode(GL_MODELVIEW)
 
-def draw_player():
-    glPushMatrix()
-    glTranslatef(player_pos[0], player_pos[1], player_pos[2])
-    glRotatef(player_angle, 0, 0, 1)  # Rotate in XY plane
-
-    quad = gluNewQuadric()
-
-    if camera_mode == "third_person":
+def draw_player(pos=None, angle=None, third_person=None):
+    # Defaults to the local player; other rangers pass their own pose
+    if pos is None:
+        pos = view.player_pos
+    if angle is None:
+        angle = view.player_angle
+    if third_person is None:
+        third_person = camera_mode == "third_person"
+
+    rq = render_queue
+    rq.push()
+    rq.translate(pos[0], pos[1], pos[2])
+    rq.rotate(angle, 0, 0, 1)  # Rotate in XY plane
+
+    if third_person:
         # Main body - upright cylinder
-        glColor3f(0.2, 0.5, 0.2)  # Green color
-        gluCylinder(quad, 10, 10, 40, 8, 1)  # Simple cylinder body
+        rq.color(0.2, 0.5, 0.2)  # Green color
+        rq.cylinder(10, 10, 40, 8, 1)  # Simple cylinder body
 
         # Head
-        glColor3f(0.3, 0.3, 0.3)  # Dark gray
-        glPushMatrix()
-        glTranslatef(0, 0, 40)  # Top of cylinder
-        glutSolidSphere(8, 8, 8)  # Simple sphere for head
-        glPopMatrix()
+        rq.color(0.3, 0.3, 0.3)  # Dark gray
+        rq.push()
+        rq.translate(0, 0, 40)  # Top of cylinder
+        rq.sphere(8, 8, 8)  # Simple sphere for head
+        rq.pop()
 
         # Legs
-        glColor3f(0.2, 0.5, 0.2)  # Match body color
+        rq.color(0.2, 0.5, 0.2)  # Match body color
         # Left leg
-        glPushMatrix()
-        glTranslatef(-5, 0, 0)  # Left side
-        gluCylinder(quad, 3, 3, 20, 8, 1)  # Upper leg
-        glTranslatef(0, 2, 0)  # Foot points forward
-        glColor3f(0.3, 0.3, 0.3)  # Dark gray for shoes
-        glutSolidCube(6)
-        glPopMatrix()
+        rq.push()
+        rq.translate(-5, 0, 0)  # Left side
+        rq.cylinder(3, 3, 20, 8, 1)  # Upper leg
+        rq.translate(0, 2, 0)  # Foot points forward
+        rq.color(0.3, 0.3, 0.3)  # Dark gray for shoes
+        rq.cube(6)
+        rq.pop()
 
         # Right leg
-        glPushMatrix()
-        glTranslatef(5, 0, 0)  # Right side
-        glColor3f(0.2, 0.5, 0.2)
-        gluCylinder(quad, 3, 3, 20, 8, 1)
-        glTranslatef(0, 2, 0)
-        glColor3f(0.3, 0.3, 0.3)
-        glutSolidCube(6)
-        glPopMatrix()
+        rq.push()
+        rq.translate(5, 0, 0)  # Right side
+        rq.color(0.2, 0.5, 0.2)
+        rq.cylinder(3, 3, 20, 8, 1)
+        rq.translate(0, 2, 0)
+        rq.color(0.3, 0.3, 0.3)
+        rq.cube(6)
+        rq.pop()
 
         # Arms and hands positioned to hold the gun
-        glPushMatrix()
-        glTranslatef(0, 6, 25)  # Move to chest height and slightly forward
+        rq.push()
+        rq.translate(0, 6, 25)  # Move to chest height and slightly forward
 
         # Left arm
-        glColor3f(0.2, 0.5, 0.2)
-        glPushMatrix()
-        glTranslatef(-10, -2, 0)  # Position for holding gun
-        glRotatef(30, 0, 0, 1)  # Angle arm to hold gun
-        gluCylinder(quad, 3, 3, 12, 8, 1)
-        glTranslatef(0, 0, 12)
-        glColor3f(0.8, 0.6, 0.4)  # Hand color
-        glutSolidSphere(4, 8, 8)
-        glPopMatrix()
+        rq.color(0.2, 0.5, 0.2)
+        rq.push()
+        rq.translate(-10, -2, 0)  # Position for holding gun
+        rq.rotate(30, 0, 0, 1)  # Angle arm to hold gun
+        rq.cylinder(3, 3, 12, 8, 1)
+        rq.translate(0, 0, 12)
+        rq.color(0.8, 0.6, 0.4)  # Hand color
+        rq.sphere(4, 8, 8)
+        rq.pop()
 
         # Right arm
-        glColor3f(0.2, 0.5, 0.2)
-        glPushMatrix()
-        glTranslatef(10, -2, 0)  # Position for holding gun
-        glRotatef(-30, 0, 0, 1)  # Angle arm to hold gun
-        gluCylinder(quad, 3, 3, 12, 8, 1)
-        glTranslatef(0, 0, 12)
-        glColor3f(0.8, 0.6, 0.4)  # Hand color
-        glutSolidSphere(4, 8, 8)
-        glPopMatrix()
+        rq.color(0.2, 0.5, 0.2)
+        rq.push()
+        rq.translate(10, -2, 0)  # Position for holding gun
+        rq.rotate(-30, 0, 0, 1)  # Angle arm to hold gun
+        rq.cylinder(3, 3, 12, 8, 1)
+        rq.translate(0, 0, 12)
+        rq.color(0.8, 0.6, 0.4)  # Hand color
+        rq.sphere(4, 8, 8)
+        rq.pop()
 
         # Gun between hands, aligned with shooting direction
-        glColor3f(0.4, 0.4, 0.4)  # Gray
-        glPushMatrix()
-        glTranslatef(0, 10, 6)  # Position between hands
-        glRotatef(-90, 1, 0, 0)  # Point gun forward
-        gluCylinder(quad, 2.5, 2, 22, 8, 1)  # Gun barrel (cylinder)
+        rq.color(0.4, 0.4, 0.4)  # Gray
+        rq.push()
+        rq.translate(0, 10, 6)  # Position between hands
+        rq.rotate(-90, 1, 0, 0)  # Point gun forward
+        rq.cylinder(2.5, 2, 22, 8, 1)  # Gun barrel (cylinder)
         # Gun sight on top
-        glPushMatrix()
-        glTranslatef(0, 0, 10)
-        glScalef(1, 1, 0.3)
-        glutSolidCube(4)
-        glPopMatrix()
-        glPopMatrix()  # End gun
+        rq.push()
+        rq.translate(0, 0, 10)
+        rq.scale(1, 1, 0.3)
+        rq.cube(4)
+        rq.pop()
+        rq.pop()  # End gun
 
-        glPopMatrix()  # End arms assembly
+        rq.pop()  # End arms assembly
 
     else:  # First-person mode
         # Only draw hands and gun in front of camera
-        glPushMatrix()
+        rq.push()
         # Position hands and gun in front of camera (tweak as needed)
-        glTranslatef(0, 18, 18)
-        glRotatef(-10, 1, 0, 0)
+        rq.translate(0, 18, 18)
+        rq.rotate(-10, 1, 0, 0)
         # Left hand
-        glPushMatrix()
-        glTranslatef(-4, 0, 0)
-        glColor3f(0.8, 0.6, 0.4)
-        glutSolidSphere(3.5, 8, 8)
-        glPopMatrix()
+        rq.push()
+        rq.translate(-4, 0, 0)
+        rq.color(0.8, 0.6, 0.4)
+        rq.sphere(3.5, 8, 8)
+        rq.pop()
         # Right hand
-        glPushMatrix()
-        glTranslatef(4, 0, 0)
-        glColor3f(0.8, 0.6, 0.4)
-        glutSolidSphere(3.5, 8, 8)
-        glPopMatrix()
+        rq.push()
+        rq.translate(4, 0, 0)
+        rq.color(0.8, 0.6, 0.4)
+        rq.sphere(3.5, 8, 8)
+        rq.pop()
         # Gun (barrel)
-        glColor3f(0.4, 0.4, 0.4)
-        glPushMatrix()
-        glTranslatef(0, 4, 0)
-        glRotatef(-90, 1, 0, 0)
-        gluCylinder(quad, 2.5, 2, 18, 8, 1)
+        rq.color(0.4, 0.4, 0.4)
+        rq.push()
+        rq.translate(0, 4, 0)
+        rq.rotate(-90, 1, 0, 0)
+        rq.cylinder(2.5, 2, 18, 8, 1)
         # Gun sight
-        glPushMatrix()
-        glTranslatef(0, 0, 8)
-        glScalef(1, 1, 0.3)
-        glutSolidCube(3)
-        glPopMatrix()
-        glPopMatrix()  # End gun
-        glPopMatrix()  # End hands/gun
+        rq.push()
+        rq.translate(0, 0, 8)
+        rq.scale(1, 1, 0.3)
+        rq.cube(3)
+        rq.pop()
+        rq.pop()  # End gun
+        rq.pop()  # End hands/gun
 
-    glPopMatrix()
+    rq.pop()
+
+def record_animal_model(rq, animal):
+    # The species model at the current transform; also baked into the impostor atlas.
+    # Models come from the species files, compiled to packed meshes by zoo_meshes
+    species_meshes.get(animal.type, rq.detail).record(rq, animal)
 
 def draw_shapes():
+    # Solid shapes are recorded into the render queue and drawn sorted by flush()
+    rq = render_queue
+    rq.begin()
+    
     # Draw environment first
     draw_environment()
     
     # Draw animals
-    for i, animal in enumerate(animals):
+    far_animals = [] if impostors is not None else None
+    impostor_distance_sq = quality.settings["impostor_distance"] ** 2
+    for animal in view.animals:
         if animal.captured:
             continue
             
-        glPushMatrix()
-        glTranslatef(animal.pos[0], animal.pos[1], animal.pos[2])
+        rq.push()
+        rq.translate(animal.pos[0], animal.pos[1], animal.pos[2])
         
         # Rotate in the direction of movement
         angle = math.atan2(animal.move_dir[1], animal.move_dir[0]) * 180/math.pi
-        glRotatef(angle, 0, 0, 1)
+        rq.rotate(angle, 0, 0, 1)
         
         # Draw selection indicator if this animal is selected
-        if selected_animal_index == i:
-            glColor3f(1, 1, 0)  # Yellow selection ring
-            glutWireSphere(animal.size + 10, 10, 10)
+        if animal.handle == view.selected_animal:
+            rq.color(1, 1, 0)  # Yellow selection ring
+            rq.wire_sphere(animal.size + 10, 10, 10)
         
-        # Draw different animal shapes based on type
-        if "Cow" in animal.type:
-            # Body
-            glColor3f(0.9, 0.9, 0.9)  # White/cream color
-            glPushMatrix()
-            glScalef(1.5, 0.9, 0.8)
-            glutSolidSphere(animal.size * 0.8, 20, 20)
-            glPopMatrix()
-            
-            # Head
-            glPushMatrix()
-            glTranslatef(animal.size * 1.0, 0, animal.size * 0.3)
-            glScalef(0.8, 0.6, 0.5)
-            glutSolidSphere(animal.size * 0.5, 16, 16)
-            
-            # Eyes
-            glColor3f(0.1, 0.1, 0.1)  # Black eyes
-            glPushMatrix()
-            glTranslatef(animal.size * 0.3, animal.size * 0.25, animal.size * 0.15)
-            glutSolidSphere(animal.size * 0.07, 8, 8)
-            glPopMatrix()
-            
-            glPushMatrix()
-            glTranslatef(animal.size * 0.3, -animal.size * 0.25, animal.size * 0.15)
-            glutSolidSphere(animal.size * 0.07, 8, 8)
-            glPopMatrix()
-            
-            # Horns
-            glColor3f(0.8, 0.8, 0.7)  # Horn color
-            glPushMatrix()
-            glTranslatef(0, animal.size * 0.3, animal.size * 0.35)
-            glRotatef(45, 0, 1, 0)
-            gluCylinder(gluNewQuadric(), animal.size * 0.08, animal.size * 0.02, animal.size * 0.4, 8, 8)
-            glPopMatrix()
-            
-            glPushMatrix()
-            glTranslatef(0, -animal.size * 0.3, animal.size * 0.35)
-            glRotatef(-45, 0, 1, 0)
-            gluCylinder(gluNewQuadric(), animal.size * 0.08, animal.size * 0.02, animal.size * 0.4, 8, 8)
-            glPopMatrix()
-            
-            glPopMatrix()  # End head
-            
-            # Legs
-            glColor3f(0.8, 0.8, 0.8)  # Leg color
-            leg_positions = [
-                (animal.size * 0.7, animal.size * 0.4, -animal.size * 0.8),
-                (animal.size * 0.7, -animal.size * 0.4, -animal.size * 0.8),
-                (-animal.size * 0.7, animal.size * 0.4, -animal.size * 0.8),
-                (-animal.size * 0.7, -animal.size * 0.4, -animal.size * 0.8)
-            ]
-            
-            for leg_x, leg_y, leg_z in leg_positions:
-                glPushMatrix()
-                glTranslatef(leg_x, leg_y, leg_z)
-                glRotatef(90, 1, 0, 0)
-                gluCylinder(gluNewQuadric(), animal.size * 0.12, animal.size * 0.1, animal.size * 0.8, 8, 8)
-                glPopMatrix()
-                
-        elif "Horse" in animal.type:
-            # Body
-            glColor3f(0.6, 0.4, 0.2)  # Brown color
-            glPushMatrix()
-            glScalef(1.7, 0.8, 0.9)
-            glutSolidSphere(animal.size * 0.7, 20, 20)
-            glPopMatrix()
-            
-            # Neck
-            glPushMatrix()
-            glTranslatef(animal.size * 0.8, 0, animal.size * 0.3)
-            glRotatef(45, 0, 1, 0)
-            gluCylinder(gluNewQuadric(), animal.size * 0.25, animal.size * 0.2, animal.size * 0.7, 12, 8)
-            
-            # Head
-            glTranslatef(0, 0, animal.size * 0.7)
-            glRotatef(20, 0, 1, 0)
-            glScalef(0.8, 0.5, 0.4)
-            glutSolidSphere(animal.size * 0.5, 16, 16)
-            glPopMatrix()
-            
-            # Legs
-            glColor3f(0.5, 0.3, 0.2)  # Leg color
-            leg_positions = [
-                (animal.size * 0.7, animal.size * 0.3, -animal.size * 0.9),
-                (animal.size * 0.7, -animal.size * 0.3, -animal.size * 0.9),
-                (-animal.size * 0.7, animal.size * 0.3, -animal.size * 0.9),
-                (-animal.size * 0.7, -animal.size * 0.3, -animal.size * 0.9)
-            ]
-            
-            for leg_x, leg_y, leg_z in leg_positions:
-                glPushMatrix()
-                glTranslatef(leg_x, leg_y, leg_z)
-                glRotatef(90, 1, 0, 0)
-                gluCylinder(gluNewQuadric(), animal.size * 0.1, animal.size * 0.08, animal.size * 0.9, 8, 8)
-                glPopMatrix()
-                
-            # Tail
-            glColor3f(0.1, 0.1, 0.1)  # Black tail
-            glPushMatrix()
-            glTranslatef(-animal.size * 1.2, 0, animal.size * 0.2)
-            glRotatef(-20, 0, 0, 1)
-            gluCylinder(gluNewQuadric(), animal.size * 0.08, animal.size * 0.02, animal.size * 0.9, 8, 8)
-            glPopMatrix()
-            
-        elif "Goat" in animal.type:
-            # Body
-            glColor3f(0.8, 0.8, 0.8)  # Light gray
-            glPushMatrix()
-            glScalef(1.3, 0.7, 0.8)
-            glutSolidSphere(animal.size * 0.6, 16, 16)
-            glPopMatrix()
-            
-            # Head
-            glPushMatrix()
-            glTranslatef(animal.size * 0.8, 0, animal.size * 0.3)
-            glScalef(0.8, 0.6, 0.5)
-            glutSolidSphere(animal.size * 0.4, 16, 16)
-            
-            # Beard
-            glColor3f(0.7, 0.7, 0.7)
-            glPushMatrix()
-            glTranslatef(animal.size * 0.1, 0, -animal.size * 0.4)
-            glRotatef(90, 1, 0, 0)
-            glutSolidCone(animal.size * 0.2, animal.size * 0.4, 8, 8)
-            glPopMatrix()
-            
-            # Horns
-            glColor3f(0.4, 0.3, 0.2)
-            
-            # Left horn
-            glPushMatrix()
-            glTranslatef(-animal.size * 0.1, animal.size * 0.3, animal.size * 0.3)
-            glRotatef(-30, 1, 0, 0)
-            glRotatef(45, 0, 0, 1)
-            gluCylinder(gluNewQuadric(), animal.size * 0.08, animal.size * 0.03, animal.size * 0.6, 8, 8)
-            glPopMatrix()
-            
-            # Right horn
-            glPushMatrix()
-            glTranslatef(-animal.size * 0.1, -animal.size * 0.3, animal.size * 0.3)
-            glRotatef(-30, 1, 0, 0)
-            glRotatef(-45, 0, 0, 1)
-            gluCylinder(gluNewQuadric(), animal.size * 0.08, animal.size * 0.03, animal.size * 0.6, 8, 8)
-            glPopMatrix()
-            
-            glPopMatrix()  # End head
-            
-        elif "Sheep" in animal.type:
-            # Fluffy body
-            glColor3f(0.9, 0.9, 0.9)  # White wool
-            glPushMatrix()
-            
-            # Add wool texture with small spheres
-            for _ in range(20):
-                wool_x = random.uniform(-animal.size * 0.5, animal.size * 0.5)
-                wool_y = random.uniform(-animal.size * 0.4, animal.size * 0.4)
-                wool_z = random.uniform(0, animal.size * 0.5)
-                wool_size = random.uniform(animal.size * 0.15, animal.size * 0.25)
-                
-                glPushMatrix()
-                glTranslatef(wool_x, wool_y, wool_z)
-                glutSolidSphere(wool_size, 8, 8)
-                glPopMatrix()
-            
-            glPopMatrix()
-            
-            # Head
-            glColor3f(0.3, 0.3, 0.3)  # Black face
-            glPushMatrix()
-            glTranslatef(animal.size * 0.7, 0, animal.size * 0.5)
-            glScalef(0.8, 0.5, 0.5)
-            glutSolidSphere(animal.size * 0.35, 16, 16)
-            glPopMatrix()
-            
-            # Legs
-            glColor3f(0.3, 0.3, 0.3)  # Black legs
-            leg_positions = [
-                (animal.size * 0.5, animal.size * 0.3, -animal.size * 0.8),
-                (animal.size * 0.5, -animal.size * 0.3, -animal.size * 0.8),
-                (-animal.size * 0.5, animal.size * 0.3, -animal.size * 0.8),
-                (-animal.size * 0.5, -animal.size * 0.3, -animal.size * 0.8)
-            ]
-            
-            for leg_x, leg_y, leg_z in leg_positions:
-                glPushMatrix()
-                glTranslatef(leg_x, leg_y, leg_z)
-                glRotatef(90, 1, 0, 0)
-                gluCylinder(gluNewQuadric(), animal.size * 0.08, animal.size * 0.06, animal.size * 0.8, 8, 8)
-                glPopMatrix()
-                
-        elif "Elephant" in animal.type:
-            # Body
-            glColor3f(0.6, 0.6, 0.6)  # Gray color
-            glutSolidSphere(animal.size, 20, 20)
-            
-            # Trunk
-            glPushMatrix()
-            glTranslatef(animal.size*0.8, 0, 0)
-            glRotatef(90, 0, 1, 0)
-            # Make trunk move if eating
-            if animal.is_eating:
-                trunk_bend = 30 * math.sin(time.time() * 3)
-                glRotatef(trunk_bend, 0, 0, 1)
-            glColor3f(0.55, 0.55, 0.55)
-            gluCylinder(gluNewQuadric(), animal.size*0.2, animal.size*0.1, animal.size*1.3, 12, 8)
-            glPopMatrix()
-            
-            # Ears
-            glPushMatrix()
-            glTranslatef(0, animal.size*0.6, animal.size*0.4)
-            glScalef(0.5, 1, 1)
-            glColor3f(0.5, 0.5, 0.5)
-            glutSolidSphere(animal.size*0.4, 12, 12)
-            glPopMatrix()
-            
-            glPushMatrix()
-            glTranslatef(0, -animal.size*0.6, animal.size*0.4)
-            glScalef(0.5, 1, 1)
-            glutSolidSphere(animal.size*0.4, 12, 12)
-            glPopMatrix()
-            
+        # Near animals get the full model; distant ones are drawn as impostor sprites
+        if far_animals is not None and animal.handle != view.selected_animal and \
+                sum((p - e)**2 for p, e in zip(animal.pos, camera_eye)) > impostor_distance_sq and \
+                impostors.has(animal.type):
+            far_animals.append(animal)
         else:
-            # Default animal shape (for other animals)
-            glColor3f(*animal.get_color())
-            glutSolidSphere(animal.size, 20, 20)
-            
-            # Head for generic animal
-            glPushMatrix()
-            glTranslatef(animal.size*0.6, 0, animal.size*0.2)
-            glutSolidSphere(animal.size*0.4, 12, 12)
-            glPopMatrix()
+            record_animal_model(rq, animal)
         
         # Draw health bar above animal
-        glTranslatef(0, 0, animal.size + 20)
+        rq.translate(0, 0, animal.size + 20)
+        
+        # Bars are drawn in submission order (fill over background)
+        rq.set_pass(OVERLAY)
         
         # Health bar background
-        glColor3f(0.3, 0.3, 0.3)
-        glBegin(GL_QUADS)
-        glVertex3f(-20, -5, 0)
-        glVertex3f(20, -5, 0)
-        glVertex3f(20, 5, 0)
-        glVertex3f(-20, 5, 0)
-        glEnd()
+        rq.color(0.3, 0.3, 0.3)
+        rq.rect(-20, -5, 20, 5)
         
         # Health bar fill
         health_width = 40 * (animal.health / 100) - 20
-        glColor3f(0, 1, 0)
-        glBegin(GL_QUADS)
-        glVertex3f(-20, -5, 0)
-        glVertex3f(health_width, -5, 0)
-        glVertex3f(health_width, 5, 0)
-        glVertex3f(-20, 5, 0)
-        glEnd()
+        rq.color(0, 1, 0)
+        rq.rect(-20, -5, health_width, 5)
         
         # Happiness indicator (above health bar)
-        glTranslatef(0, 0, 10)
+        rq.translate(0, 0, 10)
         happiness_width = 40 * (animal.happiness / 100) - 20
-        glColor3f(1, 1, 0)  # Yellow for happiness
-        glBegin(GL_QUADS)
-        glVertex3f(-20, -5, 0)
-        glVertex3f(happiness_width, -5, 0)
-        glVertex3f(happiness_width, 5, 0)
-        glVertex3f(-20, 5, 0)
-        glEnd()
+        rq.color(1, 1, 0)  # Yellow for happiness
+        rq.rect(-20, -5, happiness_width, 5)
+        rq.set_pass(OPAQUE)
         
         # Show eating animation if animal is eating
         if animal.is_eating:
-            glTranslatef(0, 0, 10)
-            glColor3f(0.2, 0.8, 0.2)
-            glutSolidSphere(5 + math.sin(time.time() * 5) * 2, 8, 8)
+            rq.translate(0, 0, 10)
+            rq.color(0.2, 0.8, 0.2)
+            rq.sphere(5 + math.sin(sim.clock() * 5) * 2, 8, 8)
         
-        glPopMatrix()  # End of animal drawing
+        rq.pop()  # End of animal drawing
     
     # Draw poachers
-    for poacher in poachers:
+    for poacher in view.poachers:
         if not poacher.active:
             continue
             
-        glPushMatrix()
-        glTranslatef(poacher.pos[0], poacher.pos[1], poacher.pos[2])
+        rq.push()
+        rq.translate(poacher.pos[0], poacher.pos[1], poacher.pos[2])
         
         if poacher.captured:
-            glColor3f(0.5, 0, 0.5)  # Purple for captured
+            rq.color(0.5, 0, 0.5)  # Purple for captured
         else:
-            glColor3f(1, 0, 0)  # Red for active poacher
+            rq.color(1, 0, 0)  # Red for active poacher
         
         # Draw poacher as cone
-        glutSolidCone(20, 50, 10, 10)
+        rq.cone(20, 50, 10, 10)
         
-        glPopMatrix()  # End of poacher drawing
+        rq.pop()  # End of poacher drawing
     
     # Draw darts
-    for dart in darts:
+    for dart in view.darts:
         if not dart.active:
             continue
             
-        glPushMatrix()
-        glTranslatef(dart.pos[0], dart.pos[1], dart.pos[2])
-        glColor3f(0, 0, 1)  # Blue for darts
+        rq.push()
+        rq.translate(dart.pos[0], dart.pos[1], dart.pos[2])
+        rq.color(0, 0, 1)  # Blue for darts
         
         # Point the dart in the direction of travel
         if dart.direction[0] != 0 or dart.direction[1] != 0:
             angle = math.atan2(dart.direction[1], dart.direction[0]) * 180 / math.pi
-            glRotatef(angle, 0, 0, 1)
+            rq.rotate(angle, 0, 0, 1)
         
         # Draw dart as cylinder
-        glRotatef(90, 0, 1, 0)
-        gluCylinder(gluNewQuadric(), 2, 2, 20, 8, 1)
+        rq.rotate(90, 0, 1, 0)
+        rq.cylinder(2, 2, 20, 8, 1)
         
-        glPopMatrix()  # End of dart drawing
-    
+        rq.pop()  # End of dart drawing
+
+    # Draw other rangers (network play)
+    for ranger_pos, ranger_angle in other_rangers:
+        draw_player(ranger_pos, ranger_angle, third_person=True)
+
     # Draw player
     draw_player()
+    
+    rq.flush()
+    
+    if far_animals:
+        impostors.draw(far_animals, camera_eye)
+    
+    if view.poacher_wave is not None:
+        draw_poacher_wave()
+    
+    # Draw particle effects (translucent, so after everything solid)
+    draw_particles()
+
+def draw_particles():
+    # Whole particle pool in one vertex-array draw call; dead slots have zero alpha
+    count = particles.used
+    if count == 0:
+        return
+    glDisable(GL_LIGHTING)
+    glEnable(GL_BLEND)
+    glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+    glDepthMask(GL_FALSE)  # Don't let translucent points hide each other
+    glEnable(GL_POINT_SMOOTH)
+    glPointSize(PARTICLE_SIZE)
+
+    glEnableClientState(GL_VERTEX_ARRAY)
+    glEnableClientState(GL_COLOR_ARRAY)
+    glVertexPointer(3, GL_FLOAT, 0, particles.pos[:count])
+    glColorPointer(4, GL_FLOAT, 0, particles.color[:count])
+    glDrawArrays(GL_POINTS, 0, count)
+    glDisableClientState(GL_COLOR_ARRAY)
+    glDisableClientState(GL_VERTEX_ARRAY)
+
+    glDisable(GL_POINT_SMOOTH)
+    glDepthMask(GL_TRUE)
+    glDisable(GL_BLEND)
+    glEnable(GL_LIGHTING)
+
+def draw_poacher_wave():
+    # Thousands of poachers as one batch of points, coloured like the single poacher cones
+    wave = view.poacher_wave
+    shown = np.nonzero(wave.active[:wave.count])[0]
+    if len(shown) == 0:
+        return
+    vertices = wave.pos[shown].astype(np.float32)
+    vertices[:, 2] += 25  # Middle of the cone
+    colors = np.where(wave.captured[shown, None], np.float32((0.5, 0, 0.5)), np.float32((1, 0, 0)))
+    glDisable(GL_LIGHTING)
+    glPointSize(WAVE_POACHER_SIZE)
+    glEnableClientState(GL_VERTEX_ARRAY)
+    glEnableClientState(GL_COLOR_ARRAY)
+    glVertexPointer(3, GL_FLOAT, 0, np.ascontiguousarray(vertices))
+    glColorPointer(3, GL_FLOAT, 0, np.ascontiguousarray(colors, dtype=np.float32))
+    glDrawArrays(GL_POINTS, 0, len(shown))
+    glDisableClientState(GL_COLOR_ARRAY)
+    glDisableClientState(GL_VERTEX_ARRAY)
+    glEnable(GL_LIGHTING)
 
 def keyboardListener(key, x, y):
-    global camera_mode, player_angle, game_paused, currency
+    global camera_mode, show_minimap
     
     if key == b'\x1b':  # ESC key
         glutLeaveMainLoop()
-    
-    if key == b'p':  # Pause game
-        game_paused = not game_paused
         
     # Switch camera mode
     if key == b'c':
@@ -973,44 +734,35 @@ def keyboardListener(key, x, y):
             global camera_pos
             camera_pos = (0, 500, 350)
     
-    # Rotate player left (A key)
-    if key == b'a':
-        player_angle += 5
+    # Toggle render queue statistics
+    if key == b'r':
+        global show_render_stats
+        show_render_stats = not show_render_stats
     
-    # Rotate player right (D key)
-    if key == b'd':
-        player_angle -= 5
+    # Quality: auto -> pinned High ... Minimal -> auto
+    if key == b'q':
+        quality.cycle_pin()
     
-    # Player movement
-    if key == b'w':  # Forward
-        angle_rad = player_angle * math.pi / 180
-        player_pos[0] += -math.sin(angle_rad) * player_speed
-        player_pos[1] += math.cos(angle_rad) * player_speed
+    # Toggle the minimap
+    if key == b'm':
+        show_minimap = not show_minimap
     
-    if key == b's':  # Backward
-        angle_rad = player_angle * math.pi / 180
-        player_pos[0] -= -math.sin(angle_rad) * player_speed
-        player_pos[1] -= math.cos(angle_rad) * player_speed
+    # Deep-profile the next frames, for stutters that can't be reproduced on demand
+    if key == b'P':
+        profiler.arm()
     
-    # Add food to feeding station or feed selected animal
-    if key == b'f':
-        if selected_animal_index is not None and not game_over:
-            animal = animals[selected_animal_index]
-            if not animal.dead and not animal.captured and currency >= feed_cost:
-                animal.feed()
-                currency -= feed_cost
-        else:
-            # Check if player is near a feeding station
-            for i, habitat in enumerate(habitats):
-                feeding_x = habitat["center"][0] + 50  # Feeding station offset
-                feeding_y = habitat["center"][1] - 50
-                dist = math.sqrt((player_pos[0] - feeding_x)**2 + 
-                               (player_pos[1] - feeding_y)**2)
-                if dist < 50:  # Close enough to feeding station
-                    if currency >= feed_cost:
-                        FOOD_LEVEL[i] += 5  # Add food units
-                        currency -= feed_cost
-                        break
+    # Rewind: , steps back through the last seconds, . forward again up to live play
+    if key in (b',', b'.'):
+        scrub(-SCRUB_STEP if key == b',' else SCRUB_STEP)
+    
+    # Nothing reaches the game while rewound; P goes back to live play
+    if rewind_view is not None:
+        if key == b'p':
+            leave_rewind()
+        return
+    
+    # Movement, feeding and pause are game rules
+    send(sim.key_action, key)
 
 def specialKeyListener(key, x, y):
     global camera_pos, camera_angle
@@ -1035,57 +787,40 @@ def specialKeyListener(key, x, y):
         camera_pos = (camera_pos[0], new_y, new_z)
 
 def mouseListener(button, state, x, y):
-    global selected_animal_index, shoot_cooldown
+    if rewind_view is not None:
+        return  # The rewound world can be looked at, not played
+    ray = mouse_ray(x, y)
     
     # Left mouse button for shooting
     if button == GLUT_LEFT_BUTTON and state == GLUT_DOWN:
-        current_time = time.time()
-        if shoot_cooldown <= current_time:
-            shoot_cooldown = current_time + 1  # 1 second cooldown
-
-            # Dart direction: player is facing along +Y rotated by player_angle
-            angle_rad = math.radians(player_angle)
-            direction = [-math.sin(angle_rad), math.cos(angle_rad), 0]
-
-            # Dart position: match gun muzzle position visually
-            dart_pos = [
-                player_pos[0] + 30 * math.sin(angle_rad),  # Further forward
-                player_pos[1] - 30 * math.cos(angle_rad),  # Further forward
-                player_pos[2] + 31  # Match gun height (25 + 6)
-            ]
-
-            darts.append(Dart(dart_pos, direction))
-
-
+        direction = None  # Player's facing unless the mouse gives a target
+        
+        # Aim at whatever is under the mouse: a picked entity, else the ground
+        if ray is not None:
+            direction = aim_direction(picker, ray, sim.gun_muzzle(), view.animals, view.poachers)
+        
+        send(sim.fire_dart, direction)
     
     # Right mouse button for selecting animals
     if button == GLUT_RIGHT_BUTTON and state == GLUT_DOWN:
-        # Find closest animal to player within interaction range
-        closest_animal = None
-        closest_distance = interaction_range
-        
-        for i, animal in enumerate(animals):
-            if animal.captured:
-                continue
-                
-            dist = math.sqrt((player_pos[0] - animal.pos[0])**2 + 
-                           (player_pos[1] - animal.pos[1])**2)
-            
-            if dist < closest_distance:
-                closest_animal = i
-                closest_distance = dist
-        
-        selected_animal_index = closest_animal
+        if ray is not None:
+            # Select the animal under the mouse cursor
+            entity, _ = picker.pick(*ray, kind="animal")
+            send(select_animal, view.animals[entity[1]].handle if entity is not None else None)
+        else:
+            send(sim.select_nearest_animal)
 
 def setupCamera():
     """
     Configures the camera's projection and view settings.
     Uses a perspective projection and positions the camera to look at the target.
     """
+    global camera_eye
     glMatrixMode(GL_PROJECTION)  # Switch to projection matrix mode
     glLoadIdentity()  # Reset the projection matrix
     # Set up a perspective projection (field of view, aspect ratio, near clip, far clip)
-    gluPerspective(fovY, 1.25, 0.1, 1500) # Aspect ratio 1.25 (1000/800)
+    # The far plane reaches as far as terrain tiles are selected
+    gluPerspective(fovY, 1.25, 0.1, VIEW_DISTANCE) # Aspect ratio 1.25 (1000/800)
     glMatrixMode(GL_MODELVIEW)  # Switch to model-view matrix mode
     glLoadIdentity()  # Reset the model-view matrix
 
@@ -1100,252 +835,296 @@ def setupCamera():
         rotated_y = cam_x * math.sin(camera_angle * math.pi / 180) + cam_y * math.cos(camera_angle * math.pi / 180)
         
         # Position the camera and set its orientation
+        camera_eye = (rotated_x, rotated_y, cam_z)
         gluLookAt(rotated_x, rotated_y, cam_z,  # Camera position
-                player_pos[0], player_pos[1], player_pos[2],  # Look-at target (player)
+                view.player_pos[0], view.player_pos[1], view.player_pos[2],  # Look-at target (player)
                 0, 0, 1)  # Up vector (z-axis)
     else:  # First person
         # Calculate look-at point based on player angle (match dart direction)
-        angle_rad = player_angle * math.pi / 180
-        look_x = player_pos[0] + 100 * -math.sin(angle_rad)
-        look_y = player_pos[1] + 100 * math.cos(angle_rad)
-        look_z = player_pos[2] + 40  # Look straight ahead at gun height
+        angle_rad = view.player_angle * math.pi / 180
+        look_x = view.player_pos[0] + 100 * -math.sin(angle_rad)
+        look_y = view.player_pos[1] + 100 * math.cos(angle_rad)
+        look_z = view.player_pos[2] + 40  # Look straight ahead at gun height
 
         # Position camera slightly above player's head
-        gluLookAt(player_pos[0], player_pos[1], player_pos[2] + 40,
+        camera_eye = (view.player_pos[0], view.player_pos[1], view.player_pos[2] + 40)
+        gluLookAt(view.player_pos[0], view.player_pos[1], view.player_pos[2] + 40,
                 look_x, look_y, look_z,
                 0, 0, 1)
 
-def reset_game():
-    global animals, poachers, darts, game_time, currency, game_score, game_over, restart_timer
-    global last_poacher_spawn_time, poacher_spawn_interval, FOOD_LEVEL, selected_animal_index
-    
-    # Reset game variables
-    game_time = 0
-    currency = 1000
-    game_score = 0
-    game_over = False
-    restart_timer = None
-    last_poacher_spawn_time = time.time()
-    poacher_spawn_interval = 15
-    selected_animal_index = None
-    
-    # Clear existing entities
-    poachers = []
-    darts = []
-    
-    # Reset feeding stations
-    for i, habitat in enumerate(habitats):
-        FOOD_LEVEL[i] = 0
-    
-    # Re-initialize animals
-    animals = []
-    for animal_type in animal_types:
-        habitat = habitats[animal_type["habitat_index"]]
-        pos_x = habitat["center"][0] + random.uniform(-150, 150)
-        pos_y = habitat["center"][1] + random.uniform(-150, 150)
-        animal = Animal((pos_x, pos_y, 20), animal_type["name"], habitat["color"], animal_type["size"])
-        animal.habitat_pos = habitat["center"]
-        animal.habitat_index = animal_type["habitat_index"]
-        animal.dead = False
-        animal.captured = False
-        animal.health = 100
-        animal.happiness = 100
-        animals.append(animal)
-
-def update_game():
-    if game_paused:
-        return
-        
-    global last_time, game_time, last_poacher_spawn_time, currency, darts, poacher_spawn_interval
-    global game_over, restart_timer
-    
-    current_time = time.time()
-    dt = current_time - last_time
-    last_time = current_time
-    
-    # Check for game over
-    if game_over:
-        if restart_timer is None:
-            restart_timer = current_time + 5  # Wait 5 seconds before restarting
-        elif current_time >= restart_timer:
-            reset_game()
-        return
-        
-    # Check if all animals are dead or captured
-    alive_animals = [a for a in animals if not a.dead and not a.captured]
-    if not alive_animals:
-        game_over = True
-        return
-    
-    # Update game timer
-    game_time += dt
-    
-    # Add currency over time
-    if int(game_time) % 10 == 0 and int(game_time) > 0:  # Every 10 seconds
-        currency += 25
-    
-    # Update all animals
-    for animal in animals:
-        animal.update(current_time)
-    
-    # Update all poachers
-    for poacher in poachers:
-        poacher.update()
-    
-    # Update all darts
-    for dart in darts:
-        dart.update()
-    
-    # Remove inactive darts
-    darts = [d for d in darts if d.active]
-    
-    # Spawn new poachers
-    if current_time - last_poacher_spawn_time > poacher_spawn_interval:
-        # Find a valid animal target that's not already captured or dead
-        valid_targets = [a for a in animals if not a.captured and not a.dead]
-        
-        if valid_targets:
-            target_animal = random.choice(valid_targets)
-            
-            # Spawn poacher at edge of map
-            spawn_side = random.randint(0, 3)  # 0=top, 1=right, 2=bottom, 3=left
-            
-            if spawn_side == 0:  # Top
-                poacher_pos = [random.uniform(-GRID_LENGTH, GRID_LENGTH), GRID_LENGTH, 30]
-            elif spawn_side == 1:  # Right
-                poacher_pos = [GRID_LENGTH, random.uniform(-GRID_LENGTH, GRID_LENGTH), 30]
-            elif spawn_side == 2:  # Bottom
-                poacher_pos = [random.uniform(-GRID_LENGTH, GRID_LENGTH), -GRID_LENGTH, 30]
-            else:  # Left
-                poacher_pos = [-GRID_LENGTH, random.uniform(-GRID_LENGTH, GRID_LENGTH), 30]
-                
-            poachers.append(Poacher(poacher_pos, target_animal))
-            last_poacher_spawn_time = current_time
-            
-            # Make poachers spawn more frequently as game progresses, but not too fast
-            poacher_spawn_interval = max(8, 15 - game_time / 120)  # Slower scaling
 def idle():
     """
     Idle function that runs continuously:
     - Updates game state
     - Triggers screen redraw for real-time updates.
     """
-    update_game()
+    step_frame()
     glutPostRedisplay()
 
+def step_frame():
+    # Advance the game and the front end's per-frame state by one frame
+    global last_frame_time, view, ticks
+    if profiler.armed:
+        profiler.frame_boundary()
+    if sim_thread is None:
+        tick_start = time.perf_counter()
+        sim.update_game()
+        if telemetry is not None:
+            telemetry.publish(time.perf_counter() - tick_start)
+        if not sim.game_paused:
+            ticks += 1
+            rewind.record(take_snapshot(ticks))
+        view = sim
+    else:
+        view = sim_thread.front  # Held for the whole frame, so it is drawn consistently
+        for effect, pos in sim_thread.drain_effects():
+            if effect is None:
+                particles.clear()  # The world was reset
+            else:
+                particles.burst(effect, pos)
+        if not view.game_paused and view.tick != rewind.last_tick:
+            rewind.record(view)
+    if rewind_view is not None:
+        view = rewind_view
+    
+    # Effects keep animating through the game-over countdown, but not while paused or rewound.
+    # Frame time comes from zoo_sim's clock, so a capture on a virtual clock drives both.
+    now = sim.clock()
+    if last_frame_time is not None:
+        if not view.game_paused and rewind_view is None:
+            particles.update(now - last_frame_time, sim.ground_offsets)
+        quality.update(now - last_frame_time)
+        if telemetry is not None:
+            telemetry.frame_time = now - last_frame_time
+            telemetry.quality = quality.tier
+    last_frame_time = now
+    
+    picker.update(view.animals, view.poachers)  # Picks see this tick's positions
+
 def showScreen():
     """
     Display function to render the game scene
     """
+    render_frame()
+    # Swap buffers for smooth rendering (double buffering)
+    glutSwapBuffers()
+    
+    global first_frame_done
+    if not first_frame_done:
+        first_frame_done = True
+        report_first_frame()
+        if os.environ.get("ZOO_EXIT_AFTER_FIRST_FRAME"):
+            glutLeaveMainLoop()  # Used by zoo_startup.py to time startup
+
+def report_first_frame():
+    # Time from the start of this module's import to the first presented frame
+    elapsed = time.perf_counter() - startup_time
+    status = "OK" if elapsed <= FIRST_FRAME_TARGET else "over target"
+    print(f"Time to first frame: {elapsed * 1000:.0f} ms "
+          f"(target {FIRST_FRAME_TARGET * 1000:.0f} ms, {status})", file=sys.stderr)
+
+def render_frame():
+    """
+    Draws one complete frame into the current framebuffer (window or offscreen)
+    """
+    # The minimap texture is only redrawn when due; outside the scene so it isn't downscaled
+    if show_minimap:
+        minimap.update(view, other_rangers, sim.clock())
+    
+    # Below full quality the scene goes to a smaller buffer, upscaled into the target afterwards
+    target = int(glGetIntegerv(GL_FRAMEBUFFER_BINDING))
+    scene_buffer = scene_framebuffer(quality.settings["render_scale"])
+    if scene_buffer is not None:
+        scene_buffer.bind()
+    
     # Clear color and depth buffers
     glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
     glLoadIdentity()  # Reset modelview matrix
-    glViewport(0, 0, 1000, 800)  # Set viewport size
+    glViewport(0, 0, WINDOW_WIDTH, WINDOW_HEIGHT)  # Set viewport size
     
     # Enable lighting for 3D objects
     glEnable(GL_LIGHTING)
     glEnable(GL_LIGHT0)
 
     setupCamera()  # Configure camera perspective
+    place_light()  # In world space, as the scenery's lighting was baked
+    
+    # Keep this frame's matrices for mouse picking
+    global pick_matrices
+    pick_matrices = (glGetDoublev(GL_MODELVIEW_MATRIX), glGetDoublev(GL_PROJECTION_MATRIX),
+                     glGetIntegerv(GL_VIEWPORT))
+
+    if scene_buffer is not None:
+        glViewport(0, 0, scene_buffer.width, scene_buffer.height)
 
     # Remove grid drawing code and call draw_shapes directly
     draw_shapes()
+    
+    if scene_buffer is not None:
+        upscale(scene_buffer, target)
+    
+    if show_minimap:
+        draw_minimap()
 
     # Display habitat names in 2D
-    for i, habitat in enumerate(habitats):
+    for i, habitat in enumerate(view.habitats):
         x, y, z = habitat["center"]
         draw_text(x + 500, y + 400, habitat["name"])
     # Display game info
     draw_text(10, 770, f"Zoo Defender: Animal Rescue")
-    draw_text(10, 740, f"Score: {game_score}  |  Currency: ${currency}")
-    draw_text(10, 710, f"Game Time: {int(game_time)}s  |  Camera Mode: {camera_mode}")
+    draw_text(10, 740, f"Score: {view.game_score}  |  Currency: ${view.currency}")
+    draw_text(10, 710, f"Game Time: {int(view.game_time)}s  |  Camera Mode: {camera_mode}")
     
-    if game_paused:
+    if rewind_view is not None:
+        draw_text(350, 400, f"REWIND -{rewind.seconds_back():.1f}s  (, back  . forward  P resume)")
+    elif view.game_paused:
         draw_text(400, 400, "GAME PAUSED - Press P to continue")
     
-    if game_over:
+    if view.game_over:
         draw_text(350, 450, "GAME OVER - ALL ANIMALS LOST!")
-        draw_text(350, 420, f"Final Score: {game_score}")
+        draw_text(350, 420, f"Final Score: {view.game_score}")
         
         # Show restart countdown
-        if restart_timer:
-            seconds_left = max(0, int(restart_timer - time.time()))
+        if view.restart_timer:
+            seconds_left = max(0, int(view.restart_timer - sim.clock()))
             draw_text(350, 390, f"Restarting in {seconds_left} seconds...")
     
     # Display controls
     draw_text(750, 770, "Controls:")
     draw_text(750, 740, "WASD - Move")
     draw_text(750, 710, "F - Feed selected animal ($50)")
-    draw_text(750, 680, "Left click - Shoot dart")
+    draw_text(750, 680, "Left click - Shoot at cursor")
     draw_text(750, 650, "Right click - Select animal")
     draw_text(750, 620, "C - Toggle camera")
     draw_text(750, 590, "P - Pause game")
+    draw_text(750, 560, "V - Poacher wave")
+    draw_text(750, 530, "Q - Quality (auto/pinned)")
+    draw_text(750, 500, "Shift+P - Profile frames")
+    draw_text(750, 470, "M - Minimap")
+    draw_text(750, 440, ", / . - Rewind")
+    
+    draw_text(10, 560, quality.status())
+    profile_status = profiler.status()
+    if profile_status is not None:
+        draw_text(10, 530, profile_status)
+    
+    if view.poacher_wave is not None:
+        draw_text(10, 620, f"Wave: {view.poacher_wave.live_count()} poachers")
+    
+    if show_render_stats:
+        stats = render_queue.stats
+        draw_text(10, 590, f"Render queue: {stats['items']} items, {stats['draw_calls']} draw calls, "
+                           f"state changes {stats['state_changes_submitted']} -> {stats['state_changes_sorted']}")
     
     # Display selected animal info and animal statistics
-    if selected_animal_index is not None and not game_over:
-        animal = animals[selected_animal_index]
+    animal = find_selected_animal() if view.selected_animal is not None else None
+    if animal is not None and not view.game_over:
         draw_text(400, 50, f"Selected: {animal.type}")
         draw_text(400, 30, f"Health: {animal.health:.1f}%  Happiness: {animal.happiness:.1f}%")
         
     # Show animal count statistics
-    living_count = sum(1 for a in animals if not a.dead and not a.captured)
-    draw_text(10, 680, f"Animals: {living_count}/{len(animals)} alive")
+    living_count = sum(1 for a in view.animals if not a.dead and not a.captured)
+    draw_text(10, 680, f"Animals: {living_count}/{view.starting_animals} alive")
     
     # Show warning if animals are hungry (average happiness < 50)
     avg_happiness = 0
     if living_count > 0:
-        avg_happiness = sum(a.happiness for a in animals if not a.dead and not a.captured) / living_count
+        avg_happiness = sum(a.happiness for a in view.animals if not a.dead and not a.captured) / living_count
         if avg_happiness < 50:
             draw_text(10, 650, "WARNING: Animals are hungry!", GLUT_BITMAP_HELVETICA_18)
-    # Swap buffers for smooth rendering (double buffering)
-    glutSwapBuffers()
+
+def scene_framebuffer(scale):
+    # The reduced-resolution scene buffer for this scale, or None at full resolution
+    global low_res
+    if scale >= 1.0:
+        return None
+    width, height = int(WINDOW_WIDTH * scale), int(WINDOW_HEIGHT * scale)
+    if low_res is None or (low_res.width, low_res.height) != (width, height):
+        if low_res is not None:
+            low_res.delete()
+        low_res = Framebuffer(width, height)
+    return low_res
+
+def upscale(scene_buffer, target):
+    # Stretch the scene into the target; the HUD is then drawn on top at full resolution
+    glBindFramebuffer(GL_READ_FRAMEBUFFER, scene_buffer.fbo)
+    glBindFramebuffer(GL_DRAW_FRAMEBUFFER, target)
+    glBlitFramebuffer(0, 0, scene_buffer.width, scene_buffer.height,
+                      0, 0, WINDOW_WIDTH, WINDOW_HEIGHT, GL_COLOR_BUFFER_BIT, GL_LINEAR)
+    glBindFramebuffer(GL_FRAMEBUFFER, target)
+    glViewport(0, 0, WINDOW_WIDTH, WINDOW_HEIGHT)
+    glClear(GL_DEPTH_BUFFER_BIT)
+
 # Main function to set up OpenGL window and loop
-def main():
+def main(idle_func=None, keyboard_func=None, mouse_func=None, threaded=True):
     glutInit()
     glutInitDisplayMode(GLUT_DOUBLE | GLUT_RGB | GLUT_DEPTH)  # Double buffering, RGB color, depth test
-    glutInitWindowSize(1000, 800)  # Window size
+    glutInitWindowSize(WINDOW_WIDTH, WINDOW_HEIGHT)  # Window size
     glutInitWindowPosition(0, 0)  # Window position
     glutCreateWindow(b"Zoo Defender: Animal Rescue")  # Create the window
 
-    # Enable depth testing and set up proper lighting
-    glEnable(GL_DEPTH_TEST)
-    glEnable(GL_COLOR_MATERIAL)
-    glEnable(GL_LIGHTING)
-    glEnable(GL_LIGHT0)
-    glShadeModel(GL_SMOOTH)
-
-    # Configure main light
-    glLightfv(GL_LIGHT0, GL_POSITION, [0.0, 0.0, 1.0, 0.0])  # Directional light from above
-    glLightfv(GL_LIGHT0, GL_AMBIENT, [0.4, 0.4, 0.4, 1.0])   # Soft ambient light
-    glLightfv(GL_LIGHT0, GL_DIFFUSE, [1.0, 1.0, 1.0, 1.0])   # Bright diffuse light
-    glLightfv(GL_LIGHT0, GL_SPECULAR, [0.5, 0.5, 0.5, 1.0])  # Moderate specular
-
-    # Set up material properties
-    glMaterialfv(GL_FRONT, GL_SPECULAR, [0.5, 0.5, 0.5, 1.0])
-    glMaterialf(GL_FRONT, GL_SHININESS, 50.0)
-
-    # Clear color to light blue
-    glClearColor(0.7, 0.85, 1.0, 1.0)
+    init_gl()
+    start_game(threaded=threaded)
 
     # Register callbacks
+    # Network clients swap in their own idle/input handlers
     glutDisplayFunc(showScreen)  # Register display function
-    glutKeyboardFunc(keyboardListener)  # Register keyboard listener
+    glutKeyboardFunc(keyboard_func or keyboardListener)  # Register keyboard listener
     glutSpecialFunc(specialKeyListener)
-    glutMouseFunc(mouseListener)
-    glutIdleFunc(idle)  # Register the idle function
+    glutMouseFunc(mouse_func or mouseListener)
+    glutIdleFunc(idle_func or idle)  # Register the idle function
 
     # Start the main loop
     glutMainLoop()
 
-if __name__ == "__main__":
-    main()
-
-
-
-
+def start_game(seed=None, threaded=False):
+    # Build the world and hook the simulation's effects up to the particle system
+    global sim_thread, view, telemetry, events
+    if telemetry is None:
+        telemetry = zoo_telemetry.from_environment()
+    if events is None:
+        events = zoo_events.from_environment()
+        if events is not None:
+            sim.event_sink = events.append
+    if threaded:
+        # Effects and resets arrive through the thread's queue (see step_frame)
+        sim_thread = SimThread()
+        sim_thread.telemetry = telemetry
+        sim.init_world(seed)
+        sim_thread.start()
+        view = sim_thread.front
+        return
+    sim.effect_sink = particles.burst
+    if particles.clear not in sim.reset_listeners:
+        sim.reset_listeners.append(particles.clear)
+    sim.init_world(seed)
 
+def init_gl():
+    # Enable depth testing and set up proper lighting
+    glEnable(GL_DEPTH_TEST)
+    glEnable(GL_COLOR_MATERIAL)
+    glShadeModel(GL_SMOOTH)
 
+    # Directional light from above with specular material (parameters in zoo_lighting)
+    setup_light()
 
+    # Clear color to light blue
+    glClearColor(0.7, 0.85, 1.0, 1.0)
 
+    # Heightfield ground and mountains (generated on first run)
+    sim.load_terrain()
 
+    # Species data and their compiled meshes (compiled on first run, then mapped from disk)
+    global impostors, species_meshes
+    if not sim.animal_types:
+        sim.load_species()
+    species_meshes = MeshLibrary(sim.animal_types)
+    
+    # Impostor atlas for distant animals (baked on first run, then loaded from disk)
+    try:
+        impostors = ImpostorAtlas.load_or_bake(record_animal_model, sim.animal_types)
+    except RuntimeError as error:
+        print(f"Impostors disabled: {error}", file=sys.stderr)  # e.g. no framebuffer objects
 
+if __name__ == "__main__":
+    main()
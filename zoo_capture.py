@@ -0,0 +1,189 @@
+"""
+Offscreen gameplay capture.
+
+Renders frames into a framebuffer object and reads them back asynchronously
+through two pixel-pack buffers. Frame N is read into one PBO while frame N-1,
+whose transfer has finished by then, is mapped from the other. The mapped
+memory is handed to the sink as a memoryview without copying. A synchronous
+glReadPixels stalls the pipeline every frame; this avoids that stall.
+
+Frames are streamed as raw bottom-up RGBA, e.g. for ffmpeg:
+
+    python zoo_capture.py --frames 600 --out - | \\
+        ffmpeg -f rawvideo -pix_fmt rgba -s 1000x800 -r 60 -i - -vf vflip out.mp4
+
+On a build box without a display use --osmesa (software Mesa, no window).
+--golden 1,120,600 also writes those frames as PPM files for comparisons.
+The game runs on a virtual clock (zoo_soak.VirtualClock) that moves FRAME_TIME
+per captured frame, and the quality tier is pinned. With --seed, frame N
+therefore shows the same moment of play however fast the machine renders.
+"""
+import argparse
+import os
+import sys
+import time
+
+WIDTH = 1000
+HEIGHT = 800
+FRAME_TIME = 1 / 60  # Game seconds per captured frame
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Render Zoo Defender offscreen and record frames")
+    parser.add_argument("--frames", type=int, default=300, help="number of frames to render")
+    parser.add_argument("--out", default=None, help="raw RGBA output file, or - for stdout")
+    parser.add_argument("--golden", default="", help="comma-separated frame numbers to save as PPM")
+    parser.add_argument("--golden-dir", default="golden_frames")
+    parser.add_argument("--osmesa", action="store_true", help="render with OSMesa instead of a GLUT window")
+    parser.add_argument("--sync", action="store_true", help="use blocking glReadPixels (for comparison)")
+    parser.add_argument("--seed", type=int, default=None, help="seed the world for repeatable frames")
+    return parser.parse_args(argv)
+
+
+args = parse_args() if __name__ == "__main__" else None
+if args is not None and args.osmesa:
+    # Must be chosen before PyOpenGL is first imported
+    os.environ["PYOPENGL_PLATFORM"] = "osmesa"
+
+import numpy as np
+from OpenGL.GL import *
+from OpenGL.GLUT import *
+
+import mapzoo_alt_version as mz
+import zoo_sim as sim
+from zoo_framebuffer import Framebuffer, AsyncReadback
+from zoo_soak import VirtualClock
+
+
+class FrameSink:
+    """Streams raw frames to a file or pipe and saves selected golden frames."""
+
+    def __init__(self, out=None, golden=(), golden_dir="golden_frames"):
+        if out == "-":
+            self.stream = sys.stdout.buffer
+        elif out:
+            self.stream = open(out, "wb")
+        else:
+            self.stream = None
+        self.golden = set(golden)
+        self.golden_dir = golden_dir
+        self.frames = 0
+
+    def __call__(self, frame, pixels):
+        if self.stream is not None:
+            self.stream.write(pixels)  # Written straight from the mapped buffer
+        if frame in self.golden:
+            self.write_ppm(frame, pixels)
+        self.frames += 1
+
+    def write_ppm(self, frame, pixels):
+        # PPM is top-down RGB; GL rows are bottom-up RGBA
+        os.makedirs(self.golden_dir, exist_ok=True)
+        rgb = np.frombuffer(pixels, dtype=np.uint8).reshape(HEIGHT, WIDTH, 4)[::-1, :, :3]
+        with open(os.path.join(self.golden_dir, f"frame_{frame:05d}.ppm"), "wb") as f:
+            f.write(b"P6\n%d %d\n255\n" % (WIDTH, HEIGHT))
+            f.write(rgb.tobytes())
+
+    def close(self):
+        if self.stream is not None and self.stream is not sys.stdout.buffer:
+            self.stream.close()
+
+
+def read_sync(frame, sink):
+    pixels = glReadPixels(0, 0, WIDTH, HEIGHT, GL_RGBA, GL_UNSIGNED_BYTE)
+    sink(frame, memoryview(pixels))
+
+
+class Recorder:
+    def __init__(self, options):
+        self.options = options
+        self.frame = 0
+        mz.quality.pin(0)  # Golden frames must not depend on how fast this machine renders
+        self.clock = sim.clock  # The VirtualClock main() installed before building the world
+        self.sink = FrameSink(options.out, [int(f) for f in options.golden.split(",") if f.strip()],
+                              options.golden_dir)
+        self.fbo = Framebuffer(WIDTH, HEIGHT)
+        self.readback = None if options.sync else AsyncReadback(WIDTH, HEIGHT)
+        self.start = None
+
+    def step(self):
+        if self.start is None:
+            self.start = time.perf_counter()
+        self.clock.advance(FRAME_TIME)
+        mz.step_frame()
+
+        self.fbo.bind()
+        mz.render_frame()
+        self.frame += 1
+        if self.readback is not None:
+            self.readback.read(self.frame, self.sink)
+        else:
+            read_sync(self.frame, self.sink)
+        self.fbo.unbind()
+        return self.frame < self.options.frames
+
+    def finish(self):
+        self.fbo.bind()
+        if self.readback is not None:
+            self.readback.flush(self.sink)
+            self.readback.delete()
+        self.fbo.unbind()
+        self.fbo.delete()
+        self.sink.close()
+        elapsed = time.perf_counter() - (self.start or time.perf_counter())
+        print(f"Captured {self.sink.frames} frames in {elapsed:.2f}s "
+              f"({self.sink.frames / max(elapsed, 1e-9):.1f} fps, "
+              f"{'sync' if self.readback is None else 'async PBO'} readback)", file=sys.stderr)
+
+
+def create_osmesa_context():
+    from OpenGL import osmesa, arrays
+    context = osmesa.OSMesaCreateContextExt(osmesa.OSMESA_RGBA, 24, 0, 0, None)
+    if not context:
+        raise RuntimeError("Could not create an OSMesa context")
+    # OSMesa needs a backing buffer even though we render into our own FBO
+    buffer = arrays.GLubyteArray.zeros((HEIGHT, WIDTH, 4))
+    if not osmesa.OSMesaMakeCurrent(context, buffer, GL_UNSIGNED_BYTE, WIDTH, HEIGHT):
+        raise RuntimeError("Could not make the OSMesa context current")
+    return context, buffer
+
+
+def main(options):
+    if options.seed is not None:
+        mz.particles.rng = np.random.default_rng(options.seed)
+    sim.clock = VirtualClock()  # Game time moves per frame, not with the wall clock
+
+    if options.osmesa:
+        context, buffer = create_osmesa_context()
+        mz.hud_text = False  # GLUT bitmap fonts are unavailable without glutInit
+        mz.init_gl()
+        mz.start_game(options.seed)
+        recorder = Recorder(options)
+        while recorder.step():
+            pass
+        recorder.finish()
+        return
+
+    # GLUT window kept hidden; frames go to the FBO, not the screen
+    glutInit()
+    glutInitDisplayMode(GLUT_DOUBLE | GLUT_RGB | GLUT_DEPTH)
+    glutInitWindowSize(WIDTH, HEIGHT)
+    glutCreateWindow(b"Zoo Defender: Capture")
+    glutHideWindow()
+    mz.init_gl()
+    mz.start_game(options.seed)
+    recorder = Recorder(options)
+
+    def idle():
+        if not recorder.step():
+            recorder.finish()
+            glutLeaveMainLoop()
+
+    glutDisplayFunc(lambda: None)
+    glutIdleFunc(idle)
+    glutSetOption(GLUT_ACTION_ON_WINDOW_CLOSE, GLUT_ACTION_GLUTMAINLOOP_RETURNS)
+    glutMainLoop()
+
+
+if __name__ == "__main__":
+    main(args)
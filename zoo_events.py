@@ -0,0 +1,268 @@
+"""
+Append-only gameplay event log.
+
+zoo_sim reports every feed, food eaten, dart hit, capture, starvation, spawn
+and reset through its event_sink hook. With ZOO_EVENTS set, the front end
+points that hook at an EventLog. The log keeps one typed array.array per column
+(time, game time, round, kind, habitat, species, x, y, value), so recording an
+event is a few appends and nothing is formatted or written on the tick. Every
+BATCH events, or FLUSH_INTERVAL seconds, the full columns are swapped for empty
+ones and handed to a background writer thread. The writer appends them to the
+log file as one chunk: a small header, then each column's bytes in turn.
+Appending, flushing and closing share a lock, because the simulation thread
+can still be appending while the main thread closes the log at exit; once
+closed, appends are ignored.
+
+A log is one file per game instance, named after its start time and pid, with
+a JSON sidecar naming the habitats and species the numbers refer to. Running
+this module scans logs a column at a time with NumPy and prints counts per
+group per time bucket:
+
+    ZOO_EVENTS=1 python mapzoo_alt_version.py
+    python zoo_events.py --kind starve --by habitat --per 60    # deaths per habitat per minute
+    python zoo_events.py --by kind                              # everything, per kind
+
+ZOO_EVENTS=1 uses the default directory; any other value is taken as the
+directory to use.
+"""
+import argparse
+import atexit
+import glob
+import json
+import mmap
+import os
+import queue
+import struct
+import sys
+import threading
+import time
+from array import array
+
+import numpy as np
+
+EVENTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "event_logs")
+MAGIC = b"ZOOEVT1\0"
+CHUNK = struct.Struct("<8sI4x")  # magic, event count
+BATCH = 4096  # Events per chunk
+FLUSH_INTERVAL = 30.0  # Seconds; quiet games still reach the disk
+
+# Name, array typecode, on-disk dtype (little-endian)
+COLUMNS = (
+    ("time", "d", "<f8"),  # zoo_sim.clock()
+    ("game_time", "f", "<f4"),  # Seconds into the round
+    ("round", "I", "<u4"),  # Resets since the log was opened
+    ("kind", "B", "u1"),  # Index into KINDS
+    ("habitat", "b", "i1"),  # Index into zoo_sim.habitats, -1 for none
+    ("species", "h", "<i2"),  # Index into zoo_sim.animal_types, -1 for none
+    ("x", "f", "<f4"),
+    ("y", "f", "<f4"),
+    ("value", "f", "<f4"),  # Per kind: see KINDS
+)
+KINDS = (
+    "feed",  # Player fed an animal or stocked a station; value = currency spent
+    "eat",  # Animal ate at its station; value = food left there
+    "dart_hit",  # value = score gained
+    "capture",  # Poacher took an animal
+    "starve",  # Animal died of hunger
+    "spawn_animal",
+    "spawn_poacher",  # value = poachers spawned (more than 1 for a wave)
+    "reset",
+)
+KIND_CODES = {kind: code for code, kind in enumerate(KINDS)}
+
+
+def from_environment():
+    """An EventLog if ZOO_EVENTS asks for one, else None."""
+    setting = os.environ.get("ZOO_EVENTS")
+    if not setting or setting == "0":
+        return None
+    return EventLog(EVENTS_DIR if setting == "1" else setting)
+
+
+def _empty_columns():
+    return [array(typecode) for _, typecode, _ in COLUMNS]
+
+
+class EventLog:
+    def __init__(self, directory=EVENTS_DIR, batch=BATCH, flush_interval=FLUSH_INTERVAL):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, time.strftime("%Y%m%d-%H%M%S") + f"-{os.getpid()}.zev")
+        self.batch = batch
+        self.flush_interval = flush_interval
+        self.columns = _empty_columns()
+        self.count = 0
+        self.round = 0
+        self.last_flush = None
+        self.written = 0  # Events handed to the writer
+        self.pending = queue.Queue()
+        self.lock = threading.Lock()
+        self.closed = False
+        self.writer = threading.Thread(target=self._write_loop, name="event-writer", daemon=True)
+        self.writer.start()
+        atexit.register(self.close)
+
+    def append(self, kind, t, game_time, x, y, habitat=-1, species=-1, value=0):
+        """Records one event; the signature zoo_sim.event_sink is called with."""
+        code = KIND_CODES[kind]
+        with self.lock:
+            if self.closed:
+                return
+            if code == KIND_CODES["reset"]:
+                self.round += 1
+            columns = self.columns
+            columns[0].append(t)
+            columns[1].append(game_time)
+            columns[2].append(self.round)
+            columns[3].append(code)
+            columns[4].append(-1 if habitat is None else habitat)
+            columns[5].append(species)
+            columns[6].append(x)
+            columns[7].append(y)
+            columns[8].append(value)
+            self.count += 1
+            if self.last_flush is None:
+                self.last_flush = t
+            if self.count >= self.batch or t - self.last_flush > self.flush_interval:
+                self._flush(t)
+
+    def flush(self, t=None):
+        """Hands the buffered events to the writer and starts new columns."""
+        with self.lock:
+            self._flush(t)
+
+    def _flush(self, t):
+        # Called with the lock held
+        self.last_flush = t
+        if not self.count:
+            return
+        if self.written == 0:
+            self._write_sidecar()
+        self.pending.put((self.count, self.columns))
+        self.written += self.count
+        self.columns = _empty_columns()
+        self.count = 0
+
+    def _write_sidecar(self):
+        import zoo_sim as sim
+        with open(self.path + ".json", "w") as f:
+            json.dump({"pid": os.getpid(), "kinds": list(KINDS),
+                       "habitats": [h["name"] for h in sim.habitats],
+                       "species": [t["name"] for t in sim.animal_types]}, f)
+
+    def _write_loop(self):
+        with open(self.path, "ab") as f:
+            while True:
+                item = self.pending.get()
+                if item is None:
+                    break
+                count, columns = item
+                f.write(CHUNK.pack(MAGIC, count))
+                for column in columns:
+                    if sys.byteorder == "big":
+                        column.byteswap()
+                    f.write(column.tobytes())
+                f.flush()
+
+    def close(self):
+        with self.lock:
+            if self.closed:
+                return
+            self._flush(None)
+            self.closed = True
+        self.pending.put(None)
+        self.writer.join()
+
+
+# Reading
+
+def read_log(path):
+    """All events in one log file as a dict of NumPy columns; a torn last chunk is dropped."""
+    parts = {name: [] for name, _, _ in COLUMNS}
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+    offset = 0
+    while offset + CHUNK.size <= size:
+        magic, count = CHUNK.unpack_from(buf, offset)
+        end = offset + CHUNK.size + count * sum(np.dtype(dtype).itemsize for _, _, dtype in COLUMNS)
+        if magic != MAGIC or end > size:
+            break
+        offset += CHUNK.size
+        for name, _, dtype in COLUMNS:
+            parts[name].append(np.frombuffer(buf, dtype=dtype, count=count, offset=offset))
+            offset += count * np.dtype(dtype).itemsize
+    return {name: np.concatenate(chunks) if chunks else np.zeros(0, dtype=COLUMNS[i][2])
+            for i, (name, chunks) in enumerate(parts.items())}
+
+
+def read_logs(paths):
+    """Events from several logs, concatenated, and the names from the first log's sidecar."""
+    logs = [read_log(path) for path in paths]
+    names = {"kinds": list(KINDS), "habitats": [], "species": []}
+    for path in paths:
+        if os.path.exists(path + ".json"):
+            with open(path + ".json") as f:
+                names.update(json.load(f))
+            break
+    events = {name: np.concatenate([log[name] for log in logs]) if logs else np.zeros(0, dtype=dtype)
+              for name, _, dtype in COLUMNS}
+    return events, names
+
+
+def count_table(events, names, by="kind", per=60.0, clock="wall"):
+    """Event counts per time bucket and group: (bucket starts, group labels, counts[bucket, group])."""
+    t = events["time"] if clock == "wall" else events["game_time"].astype(np.float64)
+    if not len(t):
+        return np.zeros(0), [], np.zeros((0, 0), dtype=np.int64)
+    if clock == "wall":
+        t = t - t.min()
+    buckets = (t // per).astype(np.int64)
+
+    group = events[by].astype(np.int64)
+    if by == "round":
+        labels = [str(r) for r in range(int(group.max()) + 1)]
+    else:
+        labels = list(names[{"kind": "kinds", "habitat": "habitats", "species": "species"}[by]])
+        labels += [str(g) for g in range(len(labels), int(group.max()) + 1)]  # Names the sidecar lacks
+        if (group < 0).any():
+            labels.append("-")
+            group = np.where(group < 0, len(labels) - 1, group)
+
+    width = len(labels)
+    counts = np.bincount(buckets * width + group, minlength=(buckets.max() + 1) * width)
+    return np.arange(buckets.max() + 1) * per, labels, counts.reshape(-1, width)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Count Zoo Defender gameplay events")
+    parser.add_argument("logs", nargs="*", help="log files (default: every log in --dir)")
+    parser.add_argument("--dir", default=EVENTS_DIR)
+    parser.add_argument("--kind", action="append", choices=KINDS, help="only these kinds (repeatable)")
+    parser.add_argument("--by", default="kind", choices=("kind", "habitat", "species", "round"))
+    parser.add_argument("--per", type=float, default=60.0, help="seconds per row")
+    parser.add_argument("--clock", default="wall", choices=("wall", "game"),
+                        help="bucket by time since the log started, or by time into each round")
+    args = parser.parse_args()
+
+    paths = args.logs or sorted(glob.glob(os.path.join(args.dir, "*.zev")))
+    start = time.perf_counter()
+    events, names = read_logs(paths)
+    total = len(events["kind"])
+    if args.kind:
+        keep = np.isin(events["kind"], [KIND_CODES[kind] for kind in args.kind])
+        events = {name: column[keep] for name, column in events.items()}
+    starts, labels, counts = count_table(events, names, args.by, args.per, args.clock)
+    print(f"{len(events['kind'])} of {total} events from {len(paths)} log(s) "
+          f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    used = counts.sum(axis=0) > 0
+    labels = [label for label, keep in zip(labels, used) if keep]
+    counts = counts[:, used]
+    width = max([8] + [len(label) for label in labels])
+    print(f"{'seconds':>8} " + " ".join(f"{label:>{width}}" for label in labels))
+    for start, row in zip(starts, counts):
+        print(f"{start:>8.0f} " + " ".join(f"{n:>{width}}" for n in row))
+
+
+if __name__ == "__main__":
+    main()
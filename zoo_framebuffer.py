@@ -0,0 +1,91 @@
+"""
+Offscreen render targets shared by the front end, the impostor bake and capture.
+
+Framebuffer is a colour + depth FBO to render into instead of the window.
+AsyncReadback reads frames back through pixel-pack buffers without stalling.
+Only PyOpenGL is imported here, so any module can use these without loading
+the game.
+"""
+import ctypes
+
+from OpenGL.GL import *
+
+
+class Framebuffer:
+    """Colour + depth FBO that the game renders into instead of the window."""
+
+    def __init__(self, width, height):
+        self.width, self.height = width, height
+        self.fbo = glGenFramebuffers(1)
+        self.color, self.depth = glGenRenderbuffers(2)
+        glBindRenderbuffer(GL_RENDERBUFFER, self.color)
+        glRenderbufferStorage(GL_RENDERBUFFER, GL_RGBA8, width, height)
+        glBindRenderbuffer(GL_RENDERBUFFER, self.depth)
+        glRenderbufferStorage(GL_RENDERBUFFER, GL_DEPTH_COMPONENT24, width, height)
+        glBindRenderbuffer(GL_RENDERBUFFER, 0)
+
+        glBindFramebuffer(GL_FRAMEBUFFER, self.fbo)
+        glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_RENDERBUFFER, self.color)
+        glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_DEPTH_ATTACHMENT, GL_RENDERBUFFER, self.depth)
+        status = glCheckFramebufferStatus(GL_FRAMEBUFFER)
+        glBindFramebuffer(GL_FRAMEBUFFER, 0)
+        if status != GL_FRAMEBUFFER_COMPLETE:
+            raise RuntimeError(f"Framebuffer incomplete: 0x{status:x}")
+
+    def bind(self):
+        glBindFramebuffer(GL_FRAMEBUFFER, self.fbo)
+
+    def unbind(self):
+        glBindFramebuffer(GL_FRAMEBUFFER, 0)
+
+    def delete(self):
+        glDeleteFramebuffers(1, [self.fbo])
+        glDeleteRenderbuffers(2, [self.color, self.depth])
+
+
+class AsyncReadback:
+    """Double-buffered PBO readback; each frame is delivered one frame late."""
+
+    def __init__(self, width, height, buffers=2):
+        self.width, self.height = width, height
+        self.size = width * height * 4
+        self.pbos = list(glGenBuffers(buffers))
+        for pbo in self.pbos:
+            glBindBuffer(GL_PIXEL_PACK_BUFFER, pbo)
+            glBufferData(GL_PIXEL_PACK_BUFFER, self.size, None, GL_STREAM_READ)
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+        self.index = 0
+        self.pending = []  # (pbo, frame number) with a transfer in flight
+
+    def read(self, frame, sink):
+        # Queue this frame's transfer; glReadPixels into a bound PBO returns immediately
+        pbo = self.pbos[self.index]
+        self.index = (self.index + 1) % len(self.pbos)
+        glPixelStorei(GL_PACK_ALIGNMENT, 1)
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, pbo)
+        glReadPixels(0, 0, self.width, self.height, GL_RGBA, GL_UNSIGNED_BYTE, ctypes.c_void_p(0))
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+        self.pending.append((pbo, frame))
+
+        # Hand over the oldest frame once every buffer is in flight
+        if len(self.pending) >= len(self.pbos):
+            self._deliver(sink)
+
+    def flush(self, sink):
+        while self.pending:
+            self._deliver(sink)
+
+    def _deliver(self, sink):
+        pbo, frame = self.pending.pop(0)
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, pbo)
+        address = glMapBuffer(GL_PIXEL_PACK_BUFFER, GL_READ_ONLY)
+        if address:
+            # A view straight onto the mapped buffer; valid only until glUnmapBuffer
+            pixels = memoryview((ctypes.c_ubyte * self.size).from_address(address)).cast("B")
+            sink(frame, pixels)
+            pixels.release()
+            glUnmapBuffer(GL_PIXEL_PACK_BUFFER)
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+
+    def delete(self):
+        glDeleteBuffers(len(self.pbos), self.pbos)
@@ -0,0 +1,122 @@
+"""
+Herding for the herd species: cohesion, alignment, separation and fleeing.
+
+Neighbour queries go through a cell list, a uniform grid that is rebuilt once
+per tick. Building it bins every animal into a cell with one vectorized pass.
+Per-cell sums (count, position, heading) then come from np.bincount, and a
+3x3 box sum over the grid gives each cell its neighbourhood totals.
+Subtracting an animal's own contribution leaves the sums over its neighbours.
+No animal is ever compared with every other one, so the cost is linear in the
+number of animals (plus the number of cells) however crowded a habitat gets.
+
+Three grids are used: a coarse one (NEIGHBOUR_RADIUS) for cohesion and
+alignment, a fine one (SEPARATION_RADIUS) that pushes animals away from the
+centre of their crowd, and one at FLEE_RADIUS that poachers are binned into.
+"""
+import numpy as np
+
+NEIGHBOUR_RADIUS = 100  # Cohesion/alignment cell size; neighbours are in the 3x3 cells around
+SEPARATION_RADIUS = 40
+FLEE_RADIUS = 150
+COHESION = 0.3
+ALIGNMENT = 0.5
+SEPARATION = 0.8
+FLEE = 4.0
+CROWDING = 3  # Neighbours within SEPARATION_RADIUS at which separation is at full strength
+TURN_RATE = 0.2  # Weight of this tick's steering against the current heading
+
+
+def _unit(vectors):
+    length = np.hypot(vectors[:, 0], vectors[:, 1])
+    return vectors / np.maximum(length, 1e-9)[:, None]
+
+
+class CellList:
+    """Uniform grid of square cells over a set of 2D points."""
+
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+
+    def build(self, points, bounds=None):
+        # One spare ring of cells on every side, so 3x3 neighbourhoods never wrap
+        points = np.asarray(points, dtype=np.float64)
+        lo, hi = bounds if bounds is not None else (points.min(axis=0), points.max(axis=0))
+        self.origin = lo - self.cell_size
+        self.cols = int((hi[0] - lo[0]) // self.cell_size) + 3
+        self.rows = int((hi[1] - lo[1]) // self.cell_size) + 3
+        self.cells, _ = self.bin(points)
+        return self
+
+    def bin(self, points):
+        """Flat cell index of each point, and whether it fell inside the grid at all."""
+        cell = np.floor((np.asarray(points, dtype=np.float64) - self.origin) / self.cell_size).astype(np.int64)
+        inside = (cell[:, 0] >= 0) & (cell[:, 0] < self.cols) & (cell[:, 1] >= 0) & (cell[:, 1] < self.rows)
+        return np.where(inside, cell[:, 1] * self.cols + cell[:, 0], 0), inside
+
+    def cell_sums(self, cells, values):
+        # (cells, width) sums of values per cell
+        size = self.rows * self.cols
+        return np.stack([np.bincount(cells, weights=values[:, k], minlength=size)
+                         for k in range(values.shape[1])], axis=1)
+
+    def around(self, per_cell):
+        """Sum over each cell and its 8 neighbours."""
+        grid = per_cell.reshape(self.rows, self.cols, -1)
+        padded = np.pad(grid, ((1, 1), (1, 1), (0, 0)))
+        total = np.zeros_like(grid)
+        for dy in range(3):
+            for dx in range(3):
+                total += padded[dy:dy + self.rows, dx:dx + self.cols]
+        return total.reshape(self.rows * self.cols, -1)
+
+    def neighbour_means(self, points, values):
+        """Per point: number of other points in its 3x3 cells and the mean of their values."""
+        totals = self.around(self.cell_sums(self.cells, np.column_stack((np.ones(len(points)), values))))
+        own = totals[self.cells]
+        others = own[:, 0] - 1
+        means = (own[:, 1:] - values) / np.maximum(others, 1)[:, None]
+        return others, means
+
+    def foreign_means(self, points):
+        """For each of this grid's points: how many of the given points lie in its 3x3 cells, and their mean."""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        cells, inside = self.bin(points)
+        weighted = np.column_stack((np.ones(len(points)), points)) * inside[:, None]
+        own = self.around(self.cell_sums(cells, weighted))[self.cells]
+        return own[:, 0], own[:, 1:] / np.maximum(own[:, 0], 1)[:, None]
+
+
+def steer(pos, heading, threats=None, turn_rate=TURN_RATE):
+    """New unit headings for herd animals at pos moving along heading.
+
+    threats are the poacher positions. turn_rate weighs the steering against
+    the current heading; callers that steer less often than every tick pass a
+    larger one. Returns (headings, fleeing); fleeing
+    marks the animals whose nearby poachers are centred within FLEE_RADIUS.
+    """
+    pos = np.asarray(pos, dtype=np.float64).reshape(-1, 2)
+    heading = np.asarray(heading, dtype=np.float64).reshape(-1, 2)
+    fleeing = np.zeros(len(pos), dtype=bool)
+    if len(pos) == 0:
+        return heading, fleeing
+
+    # Cohesion and alignment with the herd around
+    bounds = np.array(((pos[:, 0].min(), pos[:, 1].min()), (pos[:, 0].max(), pos[:, 1].max())))
+    values = np.column_stack((pos, heading))
+    others, means = CellList(NEIGHBOUR_RADIUS).build(pos, bounds).neighbour_means(pos, values)
+    has_others = (others > 0)[:, None]
+    force = COHESION * _unit(means[:, :2] - pos) * has_others
+    force += ALIGNMENT * _unit(means[:, 2:]) * has_others
+
+    # Separation: away from the centre of the crowd close by
+    crowd, crowd_pos = CellList(SEPARATION_RADIUS).build(pos, bounds).neighbour_means(pos, pos)
+    force += SEPARATION * _unit(pos - crowd_pos) * np.minimum(crowd / CROWDING, 1)[:, None]
+
+    # Flee from poachers close by
+    if threats is not None and len(threats):
+        count, threat_pos = CellList(FLEE_RADIUS).build(pos, bounds).foreign_means(threats)
+        away = pos - threat_pos
+        fleeing = (count > 0) & (np.hypot(away[:, 0], away[:, 1]) < FLEE_RADIUS)
+        force += FLEE * _unit(away) * fleeing[:, None]
+
+    return _unit(heading + turn_rate * force), fleeing
@@ -0,0 +1,163 @@
+"""
+Many independent zoo worlds in one process.
+
+zoo_sim keeps a world in module globals. A World holds its own copy of the
+globals listed in zoo_sim.WORLD_STATE, its own clock and its own
+random.Random. Before anything runs against a world, the host swaps the
+world's values into zoo_sim; afterwards it swaps the (possibly rebound) values
+back out, the way zoo_net runs each ranger's input against that ranger's state.
+Everything outside WORLD_STATE is loaded once and shared by every world:
+habitats, species, behaviour tables, terrain, the influence map's fence cover,
+and on the render side meshes and display lists.
+
+WorldHost steps all its worlds round-robin from one scheduler thread at a fixed
+tick rate. Each world has its own input queue and publishes a zoo_simthread
+Snapshot after every tick, so a cabinet's front end draws `world.front` exactly
+as it draws a SimThread's.
+
+Running this module builds N worlds and reports the memory each one adds
+against the footprint of a whole process running one world:
+
+    python zoo_host.py [--worlds 16] [--seconds 10] [--rate 60] [--no-snapshots]
+"""
+import argparse
+import contextlib
+import gc
+import queue
+import random
+import threading
+import time
+
+import zoo_sim as sim
+from zoo_simthread import TICK_RATE, take_snapshot
+
+
+class World:
+    def __init__(self, seed=None, clock=time.time):
+        self.state = sim.new_world_state(clock, random.Random(seed))
+        self.inputs = queue.SimpleQueue()
+        self.ticks = 0
+        self.tick_time = 0.0
+        self.front = None
+        with self.entered():
+            sim.init_world(seed)
+            self.front = take_snapshot(0)
+
+    @contextlib.contextmanager
+    def entered(self):
+        """Makes zoo_sim's globals this world's for the duration; one world at a time."""
+        vars(sim).update(self.state)
+        try:
+            yield
+        finally:
+            self.state = {name: getattr(sim, name) for name in sim.WORLD_STATE}
+
+    def submit(self, action, *args):
+        """Runs action(*args), e.g. zoo_sim.key_action, in this world before its next tick."""
+        self.inputs.put((action, args))
+
+    def step(self, snapshots=True):
+        with self.entered():
+            while True:
+                try:
+                    action, args = self.inputs.get_nowait()
+                except queue.Empty:
+                    break
+                action(*args)
+            start = time.perf_counter()
+            sim.update_game()
+            self.tick_time = time.perf_counter() - start
+            self.ticks += 1
+            if snapshots:
+                self.front = take_snapshot(self.ticks)
+
+
+class WorldHost(threading.Thread):
+    def __init__(self, count=0, rate=TICK_RATE, seed=None, snapshots=True):
+        super().__init__(name="zoo-host", daemon=True)
+        self.interval = 1.0 / rate
+        self.snapshots = snapshots
+        self.worlds = []
+        self.lock = threading.Lock()  # Held while a world is swapped in
+        self.running = False
+        self.late_ticks = 0
+        for i in range(count):
+            self.add_world(None if seed is None else seed + i)
+
+    def add_world(self, seed=None, clock=time.time):
+        with self.lock:
+            world = World(seed, clock)
+            self.worlds.append(world)
+        return world
+
+    def remove_world(self, world):
+        with self.lock:
+            self.worlds.remove(world)
+
+    def step(self):
+        with self.lock:
+            for world in self.worlds:
+                world.step(self.snapshots)
+
+    def start(self):
+        self.running = True
+        super().start()
+
+    def stop(self, timeout=1.0):
+        self.running = False
+        if self.is_alive():
+            self.join(timeout)
+
+    def run(self):
+        next_tick = time.perf_counter()
+        while self.running:
+            self.step()
+            next_tick += self.interval
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                self.late_ticks += 1
+                next_tick = time.perf_counter()  # Running late; don't try to catch up
+
+
+def main():
+    from zoo_soak import rss_mb
+
+    parser = argparse.ArgumentParser(description="Run many Zoo Defender worlds in one process")
+    parser.add_argument("--worlds", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10.0, help="how long to run them")
+    parser.add_argument("--rate", type=float, default=TICK_RATE, help="ticks per second, for every world")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--no-snapshots", action="store_true", help="skip publishing snapshots")
+    args = parser.parse_args()
+
+    # The first world pays for the shared data; the rest only for their own state
+    host = WorldHost(rate=args.rate, snapshots=not args.no_snapshots)
+    host.add_world(args.seed)
+    host.step()
+    gc.collect()
+    one_world = rss_mb()
+    for i in range(1, args.worlds):
+        host.add_world(None if args.seed is None else args.seed + i)
+    host.step()
+    gc.collect()
+    per_world = (rss_mb() - one_world) / max(1, args.worlds - 1)
+    print(f"process with one world: {one_world:.1f} MB RSS")
+    print(f"each further world:     {per_world:.2f} MB ({100 * per_world / one_world:.1f}% of the process)")
+
+    host.start()
+    time.sleep(args.seconds)
+    host.stop()
+    ticks = [w.ticks for w in host.worlds]
+    tick_ms = sum(w.tick_time for w in host.worlds) * 1000 / len(host.worlds)
+    print(f"{len(host.worlds)} worlds, {min(ticks)}-{max(ticks)} ticks each in {args.seconds:.0f} s, "
+          f"{host.late_ticks} late ticks, last tick {tick_ms:.2f} ms per world, {rss_mb():.1f} MB RSS")
+    for i, world in enumerate(host.worlds):
+        snap = world.front
+        print(f"  world {i:>2}: score {snap.game_score:>6} ${snap.currency:>5} "
+              f"animals {len(snap.animals):>2} poachers {len(snap.poachers):>2}")
+
+
+if __name__ == "__main__":
+    main()
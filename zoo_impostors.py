@@ -0,0 +1,219 @@
+"""
+Impostor sprites for distant animals.
+
+Every species in animal_types is rendered once from ANGLES directions around
+it into one RGBA texture atlas: a row per species, a column per angle. Beyond
+the impostor distance an animal is drawn as a camera-facing quad showing the
+atlas cell closest to the direction it is seen from. All sprites go out in
+one alpha-tested glDrawArrays(GL_QUADS), instead of a dozen spheres and
+cylinders per animal.
+
+Species whose model is coloured by health (get_color) are baked in white and
+tinted with get_color() in full, so they look exactly like their models. The
+others keep their own colours with a lighter health tint.
+
+Views are lit with zoo_lighting's light placed in world space, the way the
+game lights the models, so an animal keeps its shading when it turns into a
+sprite.
+
+The baked atlas is cached next to this file (impostor_atlas.npy plus a .json
+description). A later launch loads it instead of baking. The cache key covers
+the species list (their part lists included), the bake settings and the
+source of the model function, so editing a model triggers a new bake.
+"""
+import hashlib
+import inspect
+import json
+import math
+import os
+
+import numpy as np
+from OpenGL.GL import *
+from OpenGL.GLU import *
+
+from zoo_framebuffer import Framebuffer
+from zoo_lighting import place_light
+from zoo_render_queue import RenderQueue
+
+ATLAS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "impostor_atlas.npy")
+BAKE_VERSION = 2  # 2: lit by the world-space light from above, as in game
+ANGLES = 8  # Views around each species
+CELL = 64  # Pixels per view
+ELEVATION = 30  # Degrees above the horizon the views are taken from, close to the game camera
+EXTENT = 2.0  # Half-size of a sprite, in multiples of the species size
+HEALTH_TINT = 0.3  # How much get_color() tints species that have their own colours
+ALPHA_CUTOFF = 0.5
+
+
+class BakePose:
+    """Stand-in animal for baking: at the origin, facing +X, healthy, not eating."""
+
+    def __init__(self, type_name, size):
+        self.type = type_name
+        self.size = size
+        self.pos = (0, 0, 0)
+        self.move_dir = (1, 0, 0)
+        self.health = 100
+        self.happiness = 100
+        self.is_eating = False
+        self.uses_health_color = False
+
+    def get_color(self):
+        # White, so the sprite can be tinted with the live animal's colour
+        self.uses_health_color = True
+        return (1.0, 1.0, 1.0)
+
+
+def cache_key(record_model, animal_types):
+    source = inspect.getsource(record_model)
+    settings = [BAKE_VERSION, ANGLES, CELL, ELEVATION, EXTENT, animal_types]
+    return hashlib.sha1((json.dumps(settings, sort_keys=True) + source).encode()).hexdigest()
+
+
+class ImpostorAtlas:
+    def __init__(self, pixels, species):
+        self.pixels = pixels  # (rows * CELL, ANGLES * CELL, 4) uint8, bottom row first
+        self.species = species  # Name -> {"row", "size", "tint"}
+        self.texture = None
+
+    @classmethod
+    def load_or_bake(cls, record_model, animal_types, path=ATLAS_FILE):
+        key = cache_key(record_model, animal_types)
+        try:
+            with open(path + ".json") as f:
+                meta = json.load(f)
+            if meta["key"] == key:
+                return cls(np.load(path), meta["species"])
+        except (OSError, ValueError, KeyError):
+            pass  # No usable cache; bake a new one
+
+        atlas = cls.bake(record_model, animal_types)
+        try:
+            np.save(path, atlas.pixels)
+            with open(path + ".json", "w") as f:
+                json.dump({"key": key, "species": atlas.species}, f)
+        except OSError:
+            pass  # Read-only install; bake again next launch
+        return atlas
+
+    @classmethod
+    def bake(cls, record_model, animal_types):
+        """Renders every species at every angle into an offscreen atlas and reads it back."""
+        width, height = ANGLES * CELL, len(animal_types) * CELL
+        previous = int(glGetIntegerv(GL_FRAMEBUFFER_BINDING))
+        clear_color = glGetFloatv(GL_COLOR_CLEAR_VALUE)
+        viewport = glGetIntegerv(GL_VIEWPORT)
+        fbo = Framebuffer(width, height)
+        fbo.bind()
+        glClearColor(0.5, 0.5, 0.5, 0.0)  # Transparent grey limits dark fringes when filtering
+        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+        glMatrixMode(GL_PROJECTION)
+        glPushMatrix()
+        glMatrixMode(GL_MODELVIEW)
+        glPushMatrix()
+
+        rq = RenderQueue()
+        species = {}
+        elevation = math.radians(ELEVATION)
+        for row, animal_type in enumerate(animal_types):
+            pose = BakePose(animal_type["name"], animal_type["size"])
+            extent = EXTENT * pose.size
+            for column in range(ANGLES):
+                glViewport(column * CELL, row * CELL, CELL, CELL)
+                glMatrixMode(GL_PROJECTION)
+                glLoadIdentity()
+                glOrtho(-extent, extent, -extent, extent, extent, extent * 7)
+                glMatrixMode(GL_MODELVIEW)
+                glLoadIdentity()
+                yaw = 2 * math.pi * column / ANGLES  # Direction of the camera from the animal
+                distance = extent * 4
+                gluLookAt(distance * math.cos(yaw) * math.cos(elevation),
+                          distance * math.sin(yaw) * math.cos(elevation),
+                          distance * math.sin(elevation),
+                          0, 0, 0, 0, 0, 1)
+                place_light()  # In world space, under this view
+                rq.begin()
+                record_model(rq, pose)
+                rq.flush()
+            species[pose.type] = {"row": row, "size": pose.size,
+                                  "tint": 1.0 if pose.uses_health_color else HEALTH_TINT}
+
+        pixels = glReadPixels(0, 0, width, height, GL_RGBA, GL_UNSIGNED_BYTE)
+        glMatrixMode(GL_PROJECTION)
+        glPopMatrix()
+        glMatrixMode(GL_MODELVIEW)
+        glPopMatrix()
+        glBindFramebuffer(GL_FRAMEBUFFER, previous)
+        fbo.delete()
+        glClearColor(*clear_color)
+        glViewport(*viewport)
+        pixels = np.frombuffer(pixels, dtype=np.uint8).reshape(height, width, 4).copy()
+        return cls(pixels, species)
+
+    def upload(self):
+        self.texture = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_2D, self.texture)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+        height, width = self.pixels.shape[:2]
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA8, width, height, 0, GL_RGBA, GL_UNSIGNED_BYTE, self.pixels)
+        glBindTexture(GL_TEXTURE_2D, 0)
+
+    def has(self, type_name):
+        return type_name in self.species
+
+    def draw(self, animals, eye):
+        """Draws the animals as sprites facing the camera, in one call."""
+        if not animals:
+            return
+        if self.texture is None:
+            self.upload()
+        rows = self.pixels.shape[0] // CELL
+        n = len(animals)
+        info = [self.species[a.type] for a in animals]
+        pos = np.array([a.pos for a in animals], dtype=np.float32)
+        heading = np.array([math.atan2(a.move_dir[1], a.move_dir[0]) for a in animals])
+        extent = np.array([EXTENT * s["size"] for s in info], dtype=np.float32)
+        row = np.array([s["row"] for s in info])
+        tint = np.array([s["tint"] for s in info], dtype=np.float32)[:, None]
+        color = 1 - tint * (1 - np.array([a.get_color() for a in animals], dtype=np.float32))
+
+        # Atlas column: direction of the camera seen from the animal, in the animal's own frame
+        seen_from = np.arctan2(eye[1] - pos[:, 1], eye[0] - pos[:, 0]) - heading
+        column = np.round(seen_from / (2 * math.pi / ANGLES)).astype(int) % ANGLES
+
+        # Camera right and up vectors in world space, from the modelview matrix
+        modelview = np.asarray(glGetFloatv(GL_MODELVIEW_MATRIX), dtype=np.float32).reshape(4, 4)
+        right, up = modelview[:3, 0], modelview[:3, 1]
+        corners = np.array(((-1, -1), (1, -1), (1, 1), (-1, 1)), dtype=np.float32)
+        offsets = corners[:, 0, None] * right + corners[:, 1, None] * up  # (4, 3)
+        vertices = pos[:, None, :] + extent[:, None, None] * offsets  # (n, 4, 3)
+
+        u0, v0 = column / ANGLES, row / rows
+        texcoords = np.empty((n, 4, 2), dtype=np.float32)
+        texcoords[:, :, 0] = u0[:, None] + (corners[:, 0] + 1) / 2 / ANGLES
+        texcoords[:, :, 1] = v0[:, None] + (corners[:, 1] + 1) / 2 / rows
+        colors = np.repeat(color[:, None, :], 4, axis=1)
+
+        glDisable(GL_LIGHTING)  # Lighting is baked into the atlas
+        glEnable(GL_TEXTURE_2D)
+        glBindTexture(GL_TEXTURE_2D, self.texture)
+        glTexEnvi(GL_TEXTURE_ENV, GL_TEXTURE_ENV_MODE, GL_MODULATE)
+        glEnable(GL_ALPHA_TEST)  # Cut out instead of blending, so sprites need no sorting
+        glAlphaFunc(GL_GREATER, ALPHA_CUTOFF)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_TEXTURE_COORD_ARRAY)
+        glEnableClientState(GL_COLOR_ARRAY)
+        glVertexPointer(3, GL_FLOAT, 0, np.ascontiguousarray(vertices))
+        glTexCoordPointer(2, GL_FLOAT, 0, texcoords)
+        glColorPointer(3, GL_FLOAT, 0, np.ascontiguousarray(colors))
+        glDrawArrays(GL_QUADS, 0, 4 * n)
+        glDisableClientState(GL_COLOR_ARRAY)
+        glDisableClientState(GL_TEXTURE_COORD_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+        glDisable(GL_ALPHA_TEST)
+        glBindTexture(GL_TEXTURE_2D, 0)
+        glDisable(GL_TEXTURE_2D)
+        glEnable(GL_LIGHTING)
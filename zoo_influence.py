@@ -0,0 +1,168 @@
+"""
+Influence map for poacher tactics.
+
+A SIZE x SIZE grid over the park holds four layers:
+
+- threat: where the players are and have just been
+- darts: the trails of recent darts
+- animals: smoothed animal density
+- cover: how close a cell is to a habitat fence (static)
+
+Nothing is rebuilt on an update. The dynamic layers are decayed in place by
+one vectorized multiply for the time since the last update. Each player and
+each dart then stamp a precomputed radial kernel into the few cells around
+them, and animals are binned into the density layer with np.bincount. Threat
+and density are exponential moving averages, so they settle at the kernel (or
+the count) around things that stay put and fade behind things that move. Dart
+stamps accumulate into a trail along the flight path. Once the dart trails
+have faded to nothing the dart layer is left alone until the next dart.
+The caller decides how often to update; zoo_sim does it 10 times a second.
+
+A query is a cell lookup. steer() scores a few candidate headings around
+each poacher's direction to its target by the danger a short way ahead,
+plus a penalty for turning away from the target. It picks the cheapest
+heading for all poachers at once, so a wave of thousands costs a handful of
+NumPy gathers.
+"""
+import math
+
+import numpy as np
+
+SIZE = 256  # Cells per side
+EXTENT = 768  # World units from the centre to the edge of the grid
+CELL = 2 * EXTENT / SIZE
+
+THREAT_RADIUS = 250
+THREAT_HALF_LIFE = 2.0  # Seconds
+DART_RADIUS = 60
+DART_STAMP = 0.3  # Added at a dart's position per 1/60 s
+DART_HALF_LIFE = 5.0
+ANIMAL_HALF_LIFE = 3.0
+FADED = 1e-3  # A dart layer whose peak can be no higher than this is cleared
+FENCE_RADIUS = 200  # Habitat fence ring, as drawn
+COVER_WIDTH = 40
+
+# Danger = THREAT * threat + DARTS * darts - COVER * cover
+THREAT = 3.0
+DARTS = 2.0
+COVER = 1.0
+
+CANDIDATES = np.radians([-60, -30, 0, 30, 60])  # Headings tried around the direct one
+LOOKAHEAD = 60  # World units ahead at which a heading's danger is sampled
+TURN_COST = 0.5  # Danger-equivalent per radian away from the target
+
+
+def _kernel(radius):
+    # Cone falling from 1 at the centre to 0 at radius
+    r = int(math.ceil(radius / CELL))
+    i, j = np.mgrid[-r:r + 1, -r:r + 1]
+    return np.maximum(0, 1 - np.hypot(i, j) * CELL / radius).astype(np.float32)
+
+
+_cover_cache = {}  # Habitat centres -> cover layer
+
+
+class InfluenceMap:
+    def __init__(self, habitats=()):
+        self.threat = np.zeros((SIZE, SIZE), dtype=np.float32)
+        self.darts = np.zeros((SIZE, SIZE), dtype=np.float32)
+        self.animals = np.zeros((SIZE, SIZE), dtype=np.float32)
+        self.darts_peak = 0.0  # Upper bound on the dart layer
+        self.cover = self.fence_cover(habitats)
+        self.threat_kernel = _kernel(THREAT_RADIUS)
+        self.dart_kernel = _kernel(DART_RADIUS)
+
+    @staticmethod
+    def fence_cover(habitats):
+        # Static, so maps over the same habitats (several worlds in one host) share it
+        key = tuple(tuple(habitat["center"][:2]) for habitat in habitats)
+        if key not in _cover_cache:
+            _cover_cache[key] = InfluenceMap.build_cover(key)
+        return _cover_cache[key]
+
+    @staticmethod
+    def build_cover(centres_xy):
+        # Cell centres, row = y and column = x
+        centres = (np.arange(SIZE) + 0.5) * CELL - EXTENT
+        x, y = np.meshgrid(centres, centres)
+        cover = np.zeros((SIZE, SIZE), dtype=np.float32)
+        for cx, cy in centres_xy:
+            ring = np.abs(np.hypot(x - cx, y - cy) - FENCE_RADIUS)
+            np.maximum(cover, np.maximum(0, 1 - ring / COVER_WIDTH), out=cover)
+        cover.flags.writeable = False
+        return cover
+
+    def clear(self):
+        for layer in (self.threat, self.darts, self.animals):
+            layer.fill(0)
+        self.darts_peak = 0.0
+
+    def cells(self, xs, ys):
+        """Row and column of the cells holding world points, clamped to the grid."""
+        i = np.clip(((np.asarray(ys) + EXTENT) / CELL).astype(np.int64), 0, SIZE - 1)
+        j = np.clip(((np.asarray(xs) + EXTENT) / CELL).astype(np.int64), 0, SIZE - 1)
+        return i, j
+
+    def stamp(self, layer, kernel, x, y, weight):
+        # Adds weight * kernel centred on (x, y), clipped at the grid's edges
+        r = kernel.shape[0] // 2
+        i, j = int((y + EXTENT) // CELL), int((x + EXTENT) // CELL)
+        i0, i1 = max(i - r, 0), min(i + r + 1, SIZE)
+        j0, j1 = max(j - r, 0), min(j + r + 1, SIZE)
+        if i0 >= i1 or j0 >= j1:
+            return
+        layer[i0:i1, j0:j1] += weight * kernel[i0 - i + r:i1 - i + r, j0 - j + r:j1 - j + r]
+
+    def update(self, dt, player_positions, dart_positions=(), animal_positions=()):
+        """Decays the dynamic layers by dt seconds and stamps the current players, darts and animals."""
+        if dt <= 0:
+            return
+        keep = 0.5 ** (dt / THREAT_HALF_LIFE)
+        self.threat *= keep
+        for pos in player_positions:
+            self.stamp(self.threat, self.threat_kernel, pos[0], pos[1], 1 - keep)
+
+        if self.darts_peak > 0:
+            keep = 0.5 ** (dt / DART_HALF_LIFE)
+            self.darts_peak *= keep
+            if self.darts_peak > FADED:
+                self.darts *= keep
+            else:
+                self.darts.fill(0)
+                self.darts_peak = 0.0
+        for pos in dart_positions:
+            self.stamp(self.darts, self.dart_kernel, pos[0], pos[1], DART_STAMP * dt * 60)
+        if len(dart_positions):
+            self.darts_peak = float(self.darts.max())
+
+        keep = 0.5 ** (dt / ANIMAL_HALF_LIFE)
+        self.animals *= keep
+        if len(animal_positions):
+            pos = np.asarray(animal_positions, dtype=np.float64)
+            i, j = self.cells(pos[:, 0], pos[:, 1])
+            counts = np.bincount(i * SIZE + j, minlength=SIZE * SIZE).reshape(SIZE, SIZE)
+            self.animals += (1 - keep) * counts
+
+    def danger(self, xs, ys):
+        i, j = self.cells(xs, ys)
+        return THREAT * self.threat[i, j] + DARTS * self.darts[i, j] - COVER * self.cover[i, j]
+
+    def density(self, xs, ys):
+        i, j = self.cells(xs, ys)
+        return self.animals[i, j]
+
+    def steer(self, pos, direction):
+        """Cheapest of the candidate headings around each unit direction; (N, 2) in, (N, 2) out."""
+        pos = np.asarray(pos, dtype=np.float64)[:, :2]
+        direction = np.asarray(direction, dtype=np.float64)
+        c, s = np.cos(CANDIDATES), np.sin(CANDIDATES)
+        headings = np.stack((direction[:, None, 0] * c - direction[:, None, 1] * s,
+                             direction[:, None, 0] * s + direction[:, None, 1] * c), axis=-1)  # (N, K, 2)
+        probes = pos[:, None, :] + headings * LOOKAHEAD
+        cost = self.danger(probes[..., 0], probes[..., 1]) + TURN_COST * np.abs(CANDIDATES)
+        best = np.argmin(cost, axis=1)
+        return headings[np.arange(len(pos)), best]
+
+    def steer_one(self, x, y, dx, dy):
+        heading = self.steer([(x, y)], [(dx, dy)])[0]
+        return float(heading[0]), float(heading[1])
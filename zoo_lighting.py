@@ -0,0 +1,125 @@
+"""
+The scene's light, and static scenery with that light baked in.
+
+LIGHT0 is a directional light from above with fixed ambient, diffuse and
+specular terms. Colour material takes ambient and diffuse from glColor. The
+light is placed in world space every frame, so it does not move with the
+camera and its effect on geometry that never moves can be worked out once.
+
+This changes the lighting of everything, not only the baked scenery. LIGHT0
+used to be placed once under an identity modelview. That made it a headlight
+shining along the view direction, so any surface facing the camera was fully
+lit. Animals, poachers, rangers, darts and food piles are now lit from above,
+the same as the scenery: tops get the full diffuse term, and sides that face
+away from the sky get only the ambient terms (0.6 of their colour).
+
+BakedScenery takes render queue items (static habitat grounds, fences,
+troughs). It tessellates them with zoo_meshes' unit meshes and moves them
+into world space. It then evaluates the fixed-function lighting equation at
+every vertex, as GL would, and compiles the lit colours, positions and
+indices into one display list that is drawn with lighting off. Specular
+depends on the viewer, so it is baked for the default third-person view
+direction. With this material and these surface angles it adds at most
+0.0006 to a colour channel (0 to 1), less than one 8-bit step.
+"""
+import numpy as np
+from OpenGL.GL import *
+
+from zoo_meshes import unit_mesh
+
+LIGHT_DIRECTION = (0.0, 0.0, 1.0)  # Towards the light
+LIGHT_AMBIENT = (0.4, 0.4, 0.4)
+LIGHT_DIFFUSE = (1.0, 1.0, 1.0)
+LIGHT_SPECULAR = (0.5, 0.5, 0.5)
+MODEL_AMBIENT = (0.2, 0.2, 0.2)  # GL's default GL_LIGHT_MODEL_AMBIENT
+MATERIAL_SPECULAR = (0.5, 0.5, 0.5)
+SHININESS = 50.0
+BAKE_VIEW = (0.0, 500.0, 350.0)  # Towards the viewer: the default camera offset
+
+
+def setup_light():
+    glEnable(GL_LIGHTING)
+    glEnable(GL_LIGHT0)
+    glLightfv(GL_LIGHT0, GL_AMBIENT, [*LIGHT_AMBIENT, 1.0])
+    glLightfv(GL_LIGHT0, GL_DIFFUSE, [*LIGHT_DIFFUSE, 1.0])
+    glLightfv(GL_LIGHT0, GL_SPECULAR, [*LIGHT_SPECULAR, 1.0])
+    glMaterialfv(GL_FRONT, GL_SPECULAR, [*MATERIAL_SPECULAR, 1.0])
+    glMaterialf(GL_FRONT, GL_SHININESS, SHININESS)
+    place_light()
+
+
+def place_light():
+    # The position goes through the current modelview: call with the camera loaded
+    glLightfv(GL_LIGHT0, GL_POSITION, [*LIGHT_DIRECTION, 0.0])
+
+
+def lit_colors(colors, normals, view=BAKE_VIEW):
+    """Fixed-function LIGHT0 lighting of unit normals with colour material; (N, 3) in, (N, 3) out."""
+    light = np.asarray(LIGHT_DIRECTION, dtype=np.float64)
+    light /= np.linalg.norm(light)
+    half = light + np.asarray(view, dtype=np.float64) / np.linalg.norm(view)  # Viewer at infinity
+    half /= np.linalg.norm(half)
+    diffuse = np.maximum(normals @ light, 0)[:, None]
+    specular = np.where(diffuse > 0, np.maximum(normals @ half, 0)[:, None] ** SHININESS, 0)
+    lit = colors * (np.add(MODEL_AMBIENT, LIGHT_AMBIENT) + diffuse * np.asarray(LIGHT_DIFFUSE)) + \
+        specular * np.multiply(LIGHT_SPECULAR, MATERIAL_SPECULAR)
+    return np.clip(lit, 0, 1)
+
+
+def bake(items):
+    """World-space positions, lit colours and triangle indices for render queue items."""
+    by_mesh = {}
+    for _, color, mesh, matrix in items:
+        by_mesh.setdefault(mesh, []).append((color, matrix))
+
+    # Items sharing a unit mesh are moved into place together
+    positions, colors, normals, indices, offset = [], [], [], [], 0
+    for mesh, placed in by_mesh.items():
+        p, n, t = unit_mesh(mesh)
+        matrices = np.array([matrix for _, matrix in placed])
+        linear = matrices[:, :3, :3]
+        positions.append((np.einsum("kij,vj->kvi", linear, p) + matrices[:, None, :3, 3]).reshape(-1, 3))
+        n = np.einsum("vj,kji->kvi", n, np.linalg.inv(linear)).reshape(-1, 3)  # Inverse transpose
+        normals.append(n / np.maximum(np.linalg.norm(n, axis=1), 1e-9)[:, None])
+        colors.append(np.repeat(np.array([color for color, _ in placed]), len(p), axis=0))
+        indices.append((t.ravel() + len(p) * np.arange(len(placed))[:, None]).ravel() + offset)
+        offset += len(placed) * len(p)
+    if not positions:
+        return np.zeros((0, 3), np.float32), np.zeros((0, 3), np.float32), np.zeros(0, np.uint32)
+    colors = lit_colors(np.concatenate(colors), np.concatenate(normals))
+    return (np.concatenate(positions).astype(np.float32), colors.astype(np.float32),
+            np.concatenate(indices).astype(np.uint32))
+
+
+class BakedScenery:
+    def __init__(self):
+        self.display_list = None
+        self.vertices = 0
+
+    def bake(self, items):
+        """Replaces the baked geometry with items (render queue items, any pass)."""
+        positions, colors, indices = bake(items)
+        self.release()
+        self.vertices = len(positions)
+        self.display_list = glGenLists(1)
+        glNewList(self.display_list, GL_COMPILE)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_COLOR_ARRAY)
+        glVertexPointer(3, GL_FLOAT, 0, positions)
+        glColorPointer(3, GL_FLOAT, 0, colors)
+        glDrawElements(GL_TRIANGLES, len(indices), GL_UNSIGNED_INT, indices)
+        glDisableClientState(GL_COLOR_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+        glEndList()
+
+    def release(self):
+        if self.display_list is not None:
+            glDeleteLists(self.display_list, 1)
+            self.display_list = None
+
+    def draw(self):
+        if self.display_list is None:
+            return
+        glDisable(GL_LIGHTING)  # Shading is baked into the vertex colours
+        glCallList(self.display_list)
+        glEnable(GL_LIGHTING)
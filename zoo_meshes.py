@@ -0,0 +1,319 @@
+"""
+Species models compiled from part lists into packed triangle meshes.
+
+A part list (see zoo_species) describes a model the way the old draw code
+built it: each part has a colour, a list of transforms, one shape (sphere,
+cylinder, cone or cube, in multiples of the species size) and optional child
+parts that inherit its transform and colour. Compiling a model records it
+into a RenderQueue, which does the transform and tessellation-detail
+bookkeeping. Every recorded shape is then tessellated as a unit mesh with
+NumPy, moved by its matrix and packed into one position array, one normal
+array and one index array. Triangles are grouped by colour, so an animal is
+drawn as a handful of meshes (one per colour) instead of one primitive per
+part.
+
+A part with "sway" (the elephant's trunk) gets groups of its own. These are
+stored relative to the part's transform and turned about the sway axis when
+drawn.
+
+Compiled meshes are cached in CACHE_DIR, one file per model and detail level,
+named after a hash of the part list and the detail. A cached mesh is
+memory-mapped and used in place: a small header and group table are read
+with struct, and the arrays are NumPy views of the mapping.
+
+    magic, version, vertex count, index count, group count (HEADER)
+    group table (GROUP per group)
+    positions (float32, n x 3), normals (float32, n x 3), indices (uint32)
+"""
+import hashlib
+import math
+import mmap
+import os
+import struct
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from zoo_render_queue import RenderQueue
+import zoo_species
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mesh_cache")
+MAGIC = b"ZOOMESH\0"
+VERSION = 1
+HEADER = struct.Struct("<8sIIII8x")
+# Index start, index count, colour, flags, sway axis, sway degrees, sway rate, pivot matrix (column-major)
+GROUP = struct.Struct("<II3fI3fff16f4x")
+HEALTH_COLOR, SWAY, WHILE_EATING = 1, 2, 4  # Group flags
+
+Group = namedtuple("Group", "start count color flags axis degrees rate pivot")
+
+
+def cache_key(model_hash, detail):
+    return hashlib.sha1(f"{VERSION}:{model_hash}:{detail:.3f}".encode()).hexdigest()
+
+
+# Unit meshes for the RenderQueue's mesh keys, as (positions, normals, triangle indices)
+
+def _grid(rows, columns, flip=False):
+    # Two triangles per cell of a (rows + 1) x (columns + 1) vertex grid
+    i, j = np.meshgrid(np.arange(rows), np.arange(columns), indexing="ij")
+    a = (i * (columns + 1) + j).ravel()
+    b, c, d = a + columns + 1, a + columns + 2, a + 1
+    if flip:
+        b, d = d, b
+    return np.stack((a, b, c, a, c, d), axis=1).reshape(-1, 3)
+
+
+def _sphere(slices, stacks):
+    # glutSolidSphere: poles on the Z axis
+    theta, phi = np.meshgrid(np.linspace(0, math.pi, stacks + 1), np.linspace(0, 2 * math.pi, slices + 1),
+                             indexing="ij")
+    normals = np.stack((np.sin(theta) * np.cos(phi), np.sin(theta) * np.sin(phi), np.cos(theta)), axis=-1)
+    normals = normals.reshape(-1, 3)
+    return normals, normals, _grid(stacks, slices)
+
+
+def _tube(base, top, slices, stacks):
+    # gluCylinder: side only, from z = 0 (radius base) to z = 1 (radius top)
+    z, phi = np.meshgrid(np.linspace(0, 1, stacks + 1), np.linspace(0, 2 * math.pi, slices + 1), indexing="ij")
+    radius = base + (top - base) * z
+    positions = np.stack((radius * np.cos(phi), radius * np.sin(phi), z), axis=-1).reshape(-1, 3)
+    normals = np.stack((np.cos(phi), np.sin(phi), np.full_like(phi, base - top)), axis=-1).reshape(-1, 3)
+    return positions, normals, _grid(stacks, slices, flip=True)
+
+
+def _disc_below(slices):
+    # Base cap facing -Z, as glutSolidCone draws it
+    phi = np.linspace(0, 2 * math.pi, slices + 1)
+    positions = np.concatenate(([(0, 0, 0)], np.stack((np.cos(phi), np.sin(phi), np.zeros_like(phi)), axis=-1)))
+    normals = np.tile((0.0, 0.0, -1.0), (slices + 2, 1))
+    ring = np.arange(1, slices + 1)
+    return positions, normals, np.stack((np.zeros(slices, dtype=int), ring + 1, ring), axis=1)
+
+
+def _disc_above(segments):
+    # The render queue's flat disc: a polygon facing +Z, as a fan
+    phi = 2 * math.pi * np.arange(segments) / segments
+    positions = np.stack((np.cos(phi), np.sin(phi), np.zeros_like(phi)), axis=-1)
+    normals = np.tile((0.0, 0.0, 1.0), (segments, 1))
+    ring = np.arange(1, segments - 1)
+    return positions, normals, np.stack((np.zeros(segments - 2, dtype=int), ring, ring + 1), axis=1)
+
+
+def _cube():
+    positions, normals, triangles = [], [], []
+    for axis in range(3):
+        for sign in (1, -1):
+            normal = np.zeros(3)
+            normal[axis] = sign
+            u, v = np.eye(3)[(axis + 1) % 3], np.eye(3)[(axis + 2) % 3]
+            if sign < 0:
+                u, v = v, u
+            base = len(positions)
+            for du, dv in ((-1, -1), (1, -1), (1, 1), (-1, 1)):
+                positions.append((normal + du * u + dv * v) / 2)
+                normals.append(normal)
+            triangles += [(base, base + 1, base + 2), (base, base + 2, base + 3)]
+    return np.array(positions), np.array(normals), np.array(triangles)
+
+
+def _merge(*parts):
+    positions, normals, triangles, offset = [], [], [], 0
+    for p, n, t in parts:
+        positions.append(p)
+        normals.append(n)
+        triangles.append(t + offset)
+        offset += len(p)
+    return np.concatenate(positions), np.concatenate(normals), np.concatenate(triangles)
+
+
+def unit_mesh(mesh):
+    kind = mesh[0]
+    if kind == "sphere":
+        return _sphere(mesh[1], mesh[2])
+    if kind == "cylinder":
+        return _tube(1.0, mesh[1], mesh[2], mesh[3])
+    if kind == "cylinder_tip":
+        return _tube(0.0, mesh[1], mesh[2], mesh[3])
+    if kind == "cone":
+        return _merge(_tube(1.0, 0.0, mesh[1], mesh[2]), _disc_below(mesh[1]))
+    if kind == "cube":
+        return _cube()
+    if kind == "disc":
+        return _disc_above(mesh[1])
+    if kind == "rect":
+        return (np.array([(0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 1, 0)], dtype=float),
+                np.tile((0.0, 0.0, 1.0), (4, 1)), np.array([(0, 1, 2), (0, 2, 3)]))
+    raise ValueError(f"Shape {kind!r} has no unit mesh")
+
+
+# Compiling part lists
+
+def _record_parts(rq, parts, color, sway, owners, sways):
+    for part in parts:
+        part_color = part.get("color", color)
+        rq.push()
+        for name, *args in part.get("transform", ()):
+            if name not in ("translate", "rotate", "scale"):
+                raise ValueError(f"Unknown transform {name!r}")
+            getattr(rq, name)(*args)
+
+        part_sway = sway
+        if "sway" in part:
+            # Children of a swaying part are stored relative to it
+            settings = part["sway"]
+            sways.append((rq.stack[-1], settings))
+            part_sway = len(sways)
+            rq.stack[-1] = np.identity(4)
+
+        if "shape" in part:
+            shape, *args = part["shape"]
+            if shape not in ("sphere", "cylinder", "cone", "cube"):
+                raise ValueError(f"Unknown shape {shape!r}")
+            getattr(rq, shape)(*args)
+            owners.append((tuple(part_color) if part_color != "health" else "health", part_sway))
+        _record_parts(rq, part.get("children", ()), part_color, part_sway, owners, sways)
+        rq.pop()
+
+
+def compile_model(model, detail=1.0):
+    """Tessellates a part list into (positions, normals, indices, groups)."""
+    rq = RenderQueue()
+    rq.detail = detail
+    rq.begin()
+    owners, sways = [], []  # Per recorded item: (colour or "health", sway number or 0)
+    _record_parts(rq, model, "health", 0, owners, sways)
+
+    grouped = {}
+    for (_, _, mesh, matrix), owner in zip(rq.items, owners):
+        grouped.setdefault(owner, []).append((mesh, matrix))
+
+    positions, normals, indices, groups, offset = [], [], [], [], 0
+    for (color, sway), items in grouped.items():
+        start = sum(len(i) for i in indices)
+        for mesh, matrix in items:
+            p, n, t = unit_mesh(mesh)
+            linear = matrix[:3, :3]
+            p = p @ linear.T + matrix[:3, 3]
+            n = n @ np.linalg.inv(linear)  # Inverse transpose, for row vectors
+            n /= np.maximum(np.linalg.norm(n, axis=1), 1e-9)[:, None]
+            positions.append(p)
+            normals.append(n)
+            indices.append(t.ravel() + offset)
+            offset += len(p)
+
+        flags, axis, degrees, rate, pivot = 0, (0, 0, 1), 0.0, 0.0, np.identity(4)
+        if color == "health":
+            flags |= HEALTH_COLOR
+            color = (1.0, 1.0, 1.0)
+        if sway:
+            pivot, settings = sways[sway - 1]
+            flags |= SWAY | (WHILE_EATING if settings.get("while") == "eating" else 0)
+            axis, degrees, rate = settings["axis"], settings["degrees"], settings["rate"]
+        groups.append(Group(start, sum(len(i) for i in indices) - start, tuple(color), flags,
+                            tuple(axis), float(degrees), float(rate), pivot))
+
+    return (np.concatenate(positions).astype(np.float32), np.concatenate(normals).astype(np.float32),
+            np.concatenate(indices).astype(np.uint32), groups)
+
+
+# Binary cache
+
+def write_mesh(path, positions, normals, indices, groups):
+    with open(path + ".tmp", "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(positions), len(indices), len(groups)))
+        for g in groups:
+            f.write(GROUP.pack(g.start, g.count, *g.color, g.flags, *g.axis, g.degrees, g.rate,
+                               *np.asarray(g.pivot).T.ravel()))
+        f.write(positions.tobytes())
+        f.write(normals.tobytes())
+        f.write(indices.tobytes())
+    os.replace(path + ".tmp", path)  # Never leave a half-written file under the final name
+
+
+def read_mesh(path):
+    """Maps a cached mesh; the arrays are read-only views of the file."""
+    with open(path, "rb") as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, vertex_count, index_count, group_count = HEADER.unpack_from(buf, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} mesh")
+    groups, offset = [], HEADER.size
+    for _ in range(group_count):
+        values = GROUP.unpack_from(buf, offset)
+        pivot = np.array(values[11:27]).reshape(4, 4).T
+        groups.append(Group(values[0], values[1], values[2:5], values[5], values[6:9], values[9], values[10], pivot))
+        offset += GROUP.size
+    positions = np.frombuffer(buf, np.float32, vertex_count * 3, offset).reshape(-1, 3)
+    offset += positions.nbytes
+    normals = np.frombuffer(buf, np.float32, vertex_count * 3, offset).reshape(-1, 3)
+    offset += normals.nbytes
+    indices = np.frombuffer(buf, np.uint32, index_count, offset)
+    return positions, normals, indices, groups
+
+
+class Mesh:
+    def __init__(self, key, positions, normals, indices, groups):
+        self.key = key
+        self.positions = positions
+        self.normals = normals
+        self.indices = indices
+        self.groups = groups
+
+    @classmethod
+    def load_or_compile(cls, model, model_hash, detail=1.0, cache_dir=CACHE_DIR):
+        key = cache_key(model_hash, detail)
+        path = os.path.join(cache_dir, key + ".mesh")
+        try:
+            return cls(key, *read_mesh(path))
+        except (OSError, ValueError, struct.error):
+            pass  # No usable cache; compile
+
+        arrays = compile_model(model, detail)
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            write_mesh(path, *arrays)
+        except OSError:
+            pass  # Read-only install; compile again next launch
+        return cls(key, *arrays)
+
+    @property
+    def triangles(self):
+        return len(self.indices) // 3
+
+    def record(self, rq, animal):
+        """Records the model at the current transform, one queue item per colour group."""
+        rq.push()
+        rq.scale(animal.size, animal.size, animal.size)
+        for number, group in enumerate(self.groups):
+            rq.color(*(animal.get_color() if group.flags & HEALTH_COLOR else group.color))
+            indices = self.indices[group.start:group.start + group.count]
+            if not group.flags & SWAY:
+                rq.packed((self.key, number), self.positions, self.normals, indices)
+                continue
+            rq.push()
+            rq.multiply(group.pivot)
+            if animal.is_eating or not group.flags & WHILE_EATING:
+                rq.rotate(group.degrees * math.sin(time.time() * group.rate), *group.axis)
+            rq.packed((self.key, number), self.positions, self.normals, indices)
+            rq.pop()
+        rq.pop()
+
+
+class MeshLibrary:
+    """Meshes for every species, compiled or loaded on first use at each detail level."""
+
+    def __init__(self, species=(), cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.models = {s["name"]: (s["model"], s["hash"]) for s in species}
+        self.default = (zoo_species.DEFAULT_MODEL, zoo_species.model_hash(zoo_species.DEFAULT_MODEL))
+        self.meshes = {}  # (model hash, detail) -> Mesh
+
+    def get(self, type_name, detail=1.0):
+        model, model_hash = self.models.get(type_name, self.default)
+        mesh = self.meshes.get((model_hash, detail))
+        if mesh is None:
+            mesh = Mesh.load_or_compile(model, model_hash, detail, self.cache_dir)
+            self.meshes[model_hash, detail] = mesh
+        return mesh
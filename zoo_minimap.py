@@ -0,0 +1,217 @@
+"""
+Top-down minimap rendered to a texture at a low rate.
+
+Two square render targets are used, each a framebuffer object with a texture
+attached. The static layer (ground, habitat discs, fences and feeding troughs)
+is drawn into the first one once. At REFRESH_RATE the second one is redrawn:
+the static layer as a single quad, then the animals (coloured by health),
+poachers, wave poachers, darts, other rangers and the player as points.
+Every frame the main view only draws the finished texture as one quad, so
+between refreshes the minimap costs one textured quad.
+"""
+import math
+import time
+
+import numpy as np
+from OpenGL.GL import *
+
+REFRESH_RATE = 5  # Minimap redraws per second
+SIZE = 256  # Texture size in pixels
+EXTENT = 700  # World units from the centre to the edge of the map
+GROUND_COLOR = (0.76, 0.70, 0.50, 1.0)
+FENCE_COLOR = (0.6, 0.4, 0.2)
+TROUGH_COLOR = (0.4, 0.3, 0.2)
+HABITAT_RADIUS = 200
+FEEDING_OFFSET = (50, -50)
+
+# Point sizes in texture pixels
+ANIMAL_SIZE = 7
+POACHER_SIZE = 6
+WAVE_SIZE = 2
+DART_SIZE = 3
+RANGER_SIZE = 6
+
+
+class TextureTarget:
+    """Square colour texture with a framebuffer object to render into it."""
+
+    def __init__(self, size):
+        self.size = size
+        self.texture = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_2D, self.texture)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA8, size, size, 0, GL_RGBA, GL_UNSIGNED_BYTE, None)
+        glBindTexture(GL_TEXTURE_2D, 0)
+
+        self.fbo = glGenFramebuffers(1)
+        glBindFramebuffer(GL_FRAMEBUFFER, self.fbo)
+        glFramebufferTexture2D(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_TEXTURE_2D, self.texture, 0)
+        status = glCheckFramebufferStatus(GL_FRAMEBUFFER)
+        glBindFramebuffer(GL_FRAMEBUFFER, 0)
+        if status != GL_FRAMEBUFFER_COMPLETE:
+            raise RuntimeError(f"Minimap framebuffer incomplete: 0x{status:x}")
+
+    def begin(self, extent):
+        # Top-down orthographic view of [-extent, extent]^2, north up
+        self.previous = int(glGetIntegerv(GL_FRAMEBUFFER_BINDING))
+        self.viewport = glGetIntegerv(GL_VIEWPORT)
+        glBindFramebuffer(GL_FRAMEBUFFER, self.fbo)
+        glViewport(0, 0, self.size, self.size)
+        glPushAttrib(GL_ENABLE_BIT | GL_POINT_BIT | GL_LINE_BIT | GL_COLOR_BUFFER_BIT | GL_TEXTURE_BIT)
+        glDisable(GL_LIGHTING)
+        glDisable(GL_DEPTH_TEST)
+        glMatrixMode(GL_PROJECTION)
+        glPushMatrix()
+        glLoadIdentity()
+        glOrtho(-extent, extent, -extent, extent, -1, 1)
+        glMatrixMode(GL_MODELVIEW)
+        glPushMatrix()
+        glLoadIdentity()
+
+    def end(self):
+        glMatrixMode(GL_PROJECTION)
+        glPopMatrix()
+        glMatrixMode(GL_MODELVIEW)
+        glPopMatrix()
+        glPopAttrib()
+        glBindFramebuffer(GL_FRAMEBUFFER, self.previous)
+        glViewport(*self.viewport)
+
+
+def _textured_quad(texture, x0, y0, x1, y1):
+    glEnable(GL_TEXTURE_2D)
+    glBindTexture(GL_TEXTURE_2D, texture)
+    glTexEnvi(GL_TEXTURE_ENV, GL_TEXTURE_ENV_MODE, GL_REPLACE)
+    glBegin(GL_QUADS)
+    glTexCoord2f(0, 0)
+    glVertex2f(x0, y0)
+    glTexCoord2f(1, 0)
+    glVertex2f(x1, y0)
+    glTexCoord2f(1, 1)
+    glVertex2f(x1, y1)
+    glTexCoord2f(0, 1)
+    glVertex2f(x0, y1)
+    glEnd()
+    glBindTexture(GL_TEXTURE_2D, 0)
+    glDisable(GL_TEXTURE_2D)
+
+
+def _points(positions, colors, size):
+    if len(positions) == 0:
+        return
+    glPointSize(size)
+    glEnableClientState(GL_VERTEX_ARRAY)
+    glEnableClientState(GL_COLOR_ARRAY)
+    glVertexPointer(2, GL_FLOAT, 0, np.ascontiguousarray(positions, dtype=np.float32))
+    glColorPointer(3, GL_FLOAT, 0, np.ascontiguousarray(colors, dtype=np.float32))
+    glDrawArrays(GL_POINTS, 0, len(positions))
+    glDisableClientState(GL_COLOR_ARRAY)
+    glDisableClientState(GL_VERTEX_ARRAY)
+
+
+class Minimap:
+    def __init__(self, rate=REFRESH_RATE, size=SIZE, extent=EXTENT):
+        self.interval = 1.0 / rate
+        self.size = size
+        self.extent = extent
+        self.static = None  # TextureTarget; created with the GL context on first update
+        self.dynamic = None
+        self.last_refresh = None
+        self.refreshes = 0
+
+    def update(self, view, rangers=(), now=None):
+        """Redraws the minimap texture if it is due; cheap otherwise.
+
+        rangers are other players' (position, angle) pairs.
+        """
+        now = time.time() if now is None else now
+        if self.last_refresh is not None and now - self.last_refresh < self.interval:
+            return
+        self.last_refresh = now
+        if self.static is None:
+            self.static = TextureTarget(self.size)
+            self.dynamic = TextureTarget(self.size)
+            self.bake_static(view.habitats, view.FEEDING_STATION_SIZE)
+        self.refresh(view, rangers)
+
+    def bake_static(self, habitats, trough_size):
+        self.static.begin(self.extent)
+        glClearColor(*GROUND_COLOR)
+        glClear(GL_COLOR_BUFFER_BIT)
+        for habitat in habitats:
+            x, y, _ = habitat["center"]
+            ring = [(x + HABITAT_RADIUS * math.cos(a), y + HABITAT_RADIUS * math.sin(a))
+                    for a in np.linspace(0, 2 * math.pi, 48, endpoint=False)]
+            glColor3f(*habitat["color"])
+            glBegin(GL_POLYGON)
+            for vx, vy in ring:
+                glVertex2f(vx, vy)
+            glEnd()
+
+            glColor3f(*FENCE_COLOR)
+            glLineWidth(2)
+            glBegin(GL_LINE_LOOP)
+            for vx, vy in ring:
+                glVertex2f(vx, vy)
+            glEnd()
+
+            tx, ty = x + FEEDING_OFFSET[0], y + FEEDING_OFFSET[1]
+            glColor3f(*TROUGH_COLOR)
+            glRectf(tx - trough_size / 2, ty - trough_size / 4, tx + trough_size / 2, ty + trough_size / 4)
+        self.static.end()
+
+    def refresh(self, view, rangers=()):
+        self.dynamic.begin(self.extent)
+        e = self.extent
+        _textured_quad(self.static.texture, -e, -e, e, e)
+        glEnable(GL_POINT_SMOOTH)
+
+        animals = [a for a in view.animals if not a.captured and not a.dead]
+        _points([a.pos[:2] for a in animals], [a.get_color() for a in animals], ANIMAL_SIZE)
+
+        wave = view.poacher_wave
+        if wave is not None:
+            shown = np.nonzero(wave.active[:wave.count] & ~wave.captured[:wave.count])[0]
+            _points(wave.pos[shown, :2], np.tile((1.0, 0.0, 0.0), (len(shown), 1)), WAVE_SIZE)
+
+        poachers = [p for p in view.poachers if p.active and not p.captured]
+        _points([p.pos[:2] for p in poachers], [(1.0, 0.0, 0.0)] * len(poachers), POACHER_SIZE)
+
+        darts = [d for d in view.darts if d.active]
+        _points([d.pos[:2] for d in darts], [(0.0, 0.0, 1.0)] * len(darts), DART_SIZE)
+
+        _points([pos[:2] for pos, _ in rangers], [(0.2, 0.5, 0.2)] * len(rangers), RANGER_SIZE)
+        self.draw_player(view.player_pos, view.player_angle)
+        self.dynamic.end()
+        self.refreshes += 1
+
+    def draw_player(self, pos, angle):
+        # White arrow pointing where the player faces (the dart direction)
+        a = math.radians(angle)
+        forward = (-math.sin(a), math.cos(a))
+        side = (forward[1], -forward[0])
+        length = self.extent * 0.05
+        glColor3f(1, 1, 1)
+        glBegin(GL_TRIANGLES)
+        glVertex2f(pos[0] + forward[0] * length, pos[1] + forward[1] * length)
+        glVertex2f(pos[0] - forward[0] * length * 0.6 + side[0] * length * 0.6,
+                   pos[1] - forward[1] * length * 0.6 + side[1] * length * 0.6)
+        glVertex2f(pos[0] - forward[0] * length * 0.6 - side[0] * length * 0.6,
+                   pos[1] - forward[1] * length * 0.6 - side[1] * length * 0.6)
+        glEnd()
+
+    def draw(self, x0, y0, x1, y1):
+        """Composites the last refresh as one quad; coordinates are in the current 2D projection."""
+        if self.dynamic is None:
+            return
+        _textured_quad(self.dynamic.texture, x0, y0, x1, y1)
+        glColor3f(0, 0, 0)
+        glBegin(GL_LINE_LOOP)
+        glVertex2f(x0, y0)
+        glVertex2f(x1, y0)
+        glVertex2f(x1, y1)
+        glVertex2f(x0, y1)
+        glEnd()
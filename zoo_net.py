@@ -0,0 +1,703 @@
+"""
+Local multiplayer for Zoo Defender.
+
+The server runs the world simulation from zoo_sim (no OpenGL needed) behind
+a UDP socket. Clients send their keyboard/mouse input and draw the snapshots they
+receive. A click carries the world-space ray under the mouse; the server
+picks along it the same way the single-player front end does. Snapshots are quantised, filtered to each ranger's area of interest
+and delta-compressed against the last snapshot the client acknowledged.
+Particle effects the tick emitted ride along once, uncompressed; clients
+burst and animate them locally.
+
+    python zoo_net.py server [--port 5555]
+    python zoo_net.py client [--host 127.0.0.1] [--port 5555]
+    python zoo_net.py bots [--count 8]      # headless load-test clients
+"""
+import argparse
+import math
+import random
+import select
+import socket
+import struct
+import time
+
+import numpy as np
+
+import zoo_sim as sim
+from zoo_picking import EntityPicker, aim_direction
+
+DEFAULT_PORT = 5555
+TICK_RATE = 30  # Server simulation/snapshot rate (Hz)
+AOI_RADIUS = 900  # Entities further than this from a ranger are not sent
+AOI_CELL = AOI_RADIUS  # Spatial grid cell size used for AOI queries
+HISTORY_TICKS = 64  # Snapshots kept per client for delta baselines
+CLIENT_TIMEOUT = 10  # Seconds of silence before a ranger is dropped
+MAX_PACKET = 60000  # Stay below the UDP datagram limit
+POS_SCALE = 2  # Positions are sent as int16 in half-unit steps
+
+# Message types
+MSG_HELLO = 1
+MSG_WELCOME = 2
+MSG_INPUT = 3
+MSG_SNAPSHOT = 4
+MSG_BYE = 5
+
+# Entity kinds
+KIND_ANIMAL = 0
+KIND_POACHER = 1
+KIND_DART = 2
+KIND_RANGER = 3
+
+# Only gameplay keys (zoo_sim.key_action) are simulated on the server; camera and ESC stay local
+SERVER_KEYS = (b'w', b'a', b's', b'd', b'f', b'p', b'v')
+
+# GLUT mouse constants, repeated so the server needs no OpenGL
+GLUT_LEFT_BUTTON = 0
+GLUT_RIGHT_BUTTON = 2
+GLUT_DOWN = 0
+
+INPUT_HEADER = struct.Struct("<BIIH")  # type, first event seq, acked tick, event count
+INPUT_EVENT = struct.Struct("<BBB6f")  # kind (0=key, 1=mouse), key/button, state, ray origin, ray direction
+NO_RAY = (0.0,) * 6  # Keys, and clicks made before the first frame was drawn
+SNAP_HEADER = struct.Struct("<BIIIIiifBHHHH")  # see encode_snapshot
+SNAP_IDS = struct.Struct("<IIh")  # ranger id, selected animal, seconds to restart
+SNAP_FOOD = struct.Struct("<H")
+ENTITY = struct.Struct("<BIhhhBBBBB")  # kind, id, x, y, z, yaw, a, b, c, flags
+REMOVED = struct.Struct("<BI")  # kind, id
+EFFECT = struct.Struct("<Bhhh")  # index into EFFECT_NAMES, x, y, z
+
+# Particle effects zoo_sim emits (zoo_particles.EFFECTS)
+EFFECT_NAMES = ("feed", "dart_hit", "capture", "death")
+
+MAX_ENTITIES = (MAX_PACKET - SNAP_HEADER.size - 64) // ENTITY.size
+PACKET_ROOM = MAX_PACKET - SNAP_HEADER.size - SNAP_IDS.size  # Bytes for food levels and records
+
+
+def quantize_pos(value):
+    return max(-32768, min(32767, int(round(value * POS_SCALE))))
+
+
+def quantize_angle(degrees):
+    return int(round((degrees % 360) * 256 / 360)) % 256
+
+
+def dequantize_angle(value):
+    return value * 360 / 256
+
+
+def direction_angle(direction):
+    return math.degrees(math.atan2(direction[1], direction[0]))
+
+
+class Ranger:
+    def __init__(self, ranger_id, addr):
+        self.id = ranger_id
+        self.addr = addr
+        self.pos = [random.uniform(-50, 50), random.uniform(-50, 50), 30]
+        self.angle = 0
+        self.selected = None
+        self.shoot_cooldown = 0
+        self.last_input_seq = 0  # Highest input event applied
+        self.acked_tick = 0  # Latest snapshot the client has decoded
+        self.last_heard = time.time()
+        self.history = {}  # tick -> {(kind, id): record} as sent to this client
+        self.bytes_sent = 0
+
+
+class Server:
+    def __init__(self, port=DEFAULT_PORT, host="127.0.0.1"):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((host, port))
+        self.sock.setblocking(False)
+        sim.load_terrain()  # So heights in snapshots follow the ground
+        sim.init_world()
+        self.rangers = {}  # addr -> Ranger
+        self.next_ranger_id = 1
+        self.next_net_id = 1
+        self.tick = 0
+        self.epoch = 0  # Bumped whenever reset_game replaces the world
+        sim.reset_listeners.append(self.world_reset)
+        self.effects = []  # (effect, pos) emitted this tick
+        sim.effect_sink = lambda effect, pos: self.effects.append((effect, pos))
+        self.picker = EntityPicker()  # Resolves the rays clients click along
+        self.picker.update(sim.animals, sim.poachers)
+        self.tick_time = 0.0
+
+    def world_reset(self):
+        # Old handles are stale after a reset; clients drop their entities on the epoch change
+        self.epoch += 1
+        for ranger in self.rangers.values():
+            ranger.selected = None
+
+    def net_id(self, entity):
+        # Entities get a stable id the first time the server sees them
+        net_id = getattr(entity, "net_id", None)
+        if net_id is None:
+            net_id = self.next_net_id
+            self.next_net_id += 1
+            entity.net_id = net_id
+        return net_id
+
+    def run(self):
+        print(f"Zoo server listening on {self.sock.getsockname()} at {TICK_RATE} Hz")
+        tick_length = 1.0 / TICK_RATE
+        next_tick = time.time()
+        last_report = time.time()
+        while True:
+            timeout = max(0, next_tick - time.time())
+            readable, _, _ = select.select([self.sock], [], [], timeout)
+            if readable:
+                self.receive()
+            now = time.time()
+            if now >= next_tick:
+                start = time.perf_counter()
+                self.step()
+                self.tick_time = time.perf_counter() - start
+                next_tick += tick_length
+                if next_tick < now:  # Fell behind; don't try to catch up
+                    next_tick = now + tick_length
+            if now - last_report > 5:
+                self.report(now - last_report)
+                last_report = now
+
+    def report(self, elapsed):
+        sent = sum(r.bytes_sent for r in self.rangers.values())
+        print(f"tick {self.tick}: {len(self.rangers)} rangers, "
+              f"{sent / elapsed / 1024:.1f} KiB/s out, step {self.tick_time * 1000:.2f} ms")
+        for ranger in self.rangers.values():
+            ranger.bytes_sent = 0
+
+    def receive(self):
+        while True:
+            try:
+                data, addr = self.sock.recvfrom(65536)
+            except (BlockingIOError, ConnectionResetError):
+                return
+            if not data:
+                continue
+            msg = data[0]
+            if msg == MSG_HELLO:
+                ranger = self.rangers.get(addr)
+                if ranger is None:
+                    ranger = Ranger(self.next_ranger_id, addr)
+                    self.next_ranger_id += 1
+                    self.rangers[addr] = ranger
+                    print(f"Ranger {ranger.id} joined from {addr}")
+                self.sock.sendto(struct.pack("<BI", MSG_WELCOME, ranger.id), addr)
+            elif msg == MSG_INPUT and addr in self.rangers:
+                self.handle_input(self.rangers[addr], data)
+            elif msg == MSG_BYE and addr in self.rangers:
+                print(f"Ranger {self.rangers[addr].id} left")
+                del self.rangers[addr]
+
+    def handle_input(self, ranger, data):
+        _, first_seq, acked_tick, count = INPUT_HEADER.unpack_from(data)
+        ranger.last_heard = time.time()
+        if acked_tick > ranger.acked_tick:
+            ranger.acked_tick = acked_tick
+            # Baselines older than the ack can never be used again
+            for tick in [t for t in ranger.history if t < acked_tick]:
+                del ranger.history[tick]
+        offset = INPUT_HEADER.size
+        for i in range(count):
+            seq = first_seq + i
+            kind, code, state, *ray = INPUT_EVENT.unpack_from(data, offset)
+            offset += INPUT_EVENT.size
+            if seq <= ranger.last_input_seq:
+                continue  # Resent event we already applied
+            ranger.last_input_seq = seq
+            ray = (np.array(ray[:3]), np.array(ray[3:])) if any(ray[3:]) else None
+            self.apply_input(ranger, kind, code, state, ray)
+
+    def apply_input(self, ranger, kind, code, state, ray=None):
+        # Run the game's player actions against this ranger's state, then put the world's back
+        saved = sim.player_pos, sim.player_angle, sim.selected_animal, sim.shoot_cooldown
+        sim.player_pos = ranger.pos
+        sim.player_angle = ranger.angle
+        sim.selected_animal = ranger.selected
+        sim.shoot_cooldown = ranger.shoot_cooldown
+        try:
+            if kind == 0:
+                key = bytes([code])
+                if key in SERVER_KEYS:
+                    sim.key_action(key)
+            elif state == GLUT_DOWN and code == GLUT_LEFT_BUTTON:
+                # As mapzoo_alt_version.mouseListener: at what the ray picks, else the facing
+                direction = None
+                if ray is not None:
+                    direction = aim_direction(self.picker, ray, sim.gun_muzzle(), sim.animals, sim.poachers)
+                sim.fire_dart(direction)
+            elif state == GLUT_DOWN and code == GLUT_RIGHT_BUTTON:
+                if ray is not None:
+                    entity, _ = self.picker.pick(*ray, kind="animal")
+                    sim.selected_animal = sim.animals[entity[1]].handle if entity is not None else None
+                else:
+                    sim.select_nearest_animal()
+        finally:
+            ranger.angle = sim.player_angle
+            ranger.selected = sim.selected_animal
+            ranger.shoot_cooldown = sim.shoot_cooldown
+            sim.player_pos, sim.player_angle, sim.selected_animal, sim.shoot_cooldown = saved
+
+    def step(self):
+        now = time.time()
+        for addr in [a for a, r in self.rangers.items() if now - r.last_heard > CLIENT_TIMEOUT]:
+            print(f"Ranger {self.rangers[addr].id} timed out")
+            del self.rangers[addr]
+
+        sim.ranger_positions = [ranger.pos for ranger in self.rangers.values()]  # All of them threaten poachers
+        self.effects = []
+        sim.update_game()
+        self.picker.update(sim.animals, sim.poachers)
+        self.tick += 1
+
+        grid = self.build_grid()
+        for ranger in self.rangers.values():
+            packet = self.encode_snapshot(ranger, grid)
+            try:
+                self.sock.sendto(packet, ranger.addr)
+            except OSError:
+                continue
+            ranger.bytes_sent += len(packet)
+
+    def build_grid(self):
+        # Bucket by AOI cell only what is in the 3x3 cells around some ranger. Only those
+        # entities are quantised; anywhere else an entity costs one cell lookup.
+        wanted = {(int(r.pos[0] // AOI_CELL) + dx, int(r.pos[1] // AOI_CELL) + dy)
+                  for r in self.rangers.values() for dx in (-1, 0, 1) for dy in (-1, 0, 1)}
+        grid = {}
+        if not wanted:
+            return grid
+
+        def cell_of(pos):
+            cell = (int(pos[0] // AOI_CELL), int(pos[1] // AOI_CELL))
+            return cell if cell in wanted else None
+
+        def add(cell, kind, entity_id, pos, yaw, a=0, b=0, c=0, flags=0):
+            record = (quantize_pos(pos[0]), quantize_pos(pos[1]), quantize_pos(pos[2]),
+                      yaw, a, b, c, flags)
+            grid.setdefault(cell, []).append(((kind, entity_id), record, pos[0], pos[1]))
+
+        type_index = None
+        for animal in sim.animals:
+            cell = cell_of(animal.pos)
+            if cell is None:
+                continue
+            if type_index is None:
+                type_index = {t["name"]: i for i, t in enumerate(sim.animal_types)}
+            flags = (animal.is_eating) | (animal.captured << 1) | (animal.dead << 2)
+            add(cell, KIND_ANIMAL, self.net_id(animal), animal.pos,
+                quantize_angle(direction_angle(animal.move_dir)),
+                type_index.get(animal.type, 0), int(animal.health * 2.55), int(animal.happiness * 2.55),
+                flags)
+        for poacher in sim.poachers:
+            cell = cell_of(poacher.pos) if poacher.active else None
+            if cell is not None:
+                add(cell, KIND_POACHER, self.net_id(poacher), poacher.pos, 0, flags=poacher.captured << 1)
+        for dart in sim.darts:
+            cell = cell_of(dart.pos) if dart.active else None
+            if cell is not None:
+                add(cell, KIND_DART, self.net_id(dart), dart.pos, quantize_angle(direction_angle(dart.direction)))
+        for ranger in self.rangers.values():
+            add(cell_of(ranger.pos), KIND_RANGER, ranger.id, ranger.pos, quantize_angle(ranger.angle))
+        return grid
+
+    def visible_records(self, ranger, grid):
+        # Only the 3x3 block of cells around the ranger is examined
+        cx, cy = int(ranger.pos[0] // AOI_CELL), int(ranger.pos[1] // AOI_CELL)
+        radius_sq = AOI_RADIUS * AOI_RADIUS
+        visible = []
+        for gx in range(cx - 1, cx + 2):
+            for gy in range(cy - 1, cy + 2):
+                for key, record, x, y in grid.get((gx, gy), ()):
+                    dist_sq = (x - ranger.pos[0]) ** 2 + (y - ranger.pos[1]) ** 2
+                    if dist_sq <= radius_sq or key == (KIND_RANGER, ranger.id):
+                        visible.append((dist_sq, key, record))
+        if len(visible) > MAX_ENTITIES:
+            # Keep the nearest; the rest are sent on later ticks
+            visible.sort(key=lambda v: v[0])
+            del visible[MAX_ENTITIES:]
+        return {key: record for _, key, record in visible}
+
+    def encode_snapshot(self, ranger, grid):
+        current = self.visible_records(ranger, grid)
+        baseline_tick = ranger.acked_tick
+        baseline = ranger.history.get(baseline_tick)
+        if baseline is None or baseline.get("epoch") != self.epoch:
+            baseline_tick = 0
+            baseline = {}
+
+        changed = [(key, rec) for key, rec in current.items() if baseline.get(key) != rec]
+        removed = [key for key in baseline if key != "epoch" and key not in current]
+
+        # Changed records go first and removals fill what is left of the packet. Whatever
+        # doesn't fit keeps its baseline entry in history, so it is sent again next tick.
+        room = PACKET_ROOM - len(sim.FOOD_LEVEL) * SNAP_FOOD.size
+        if len(changed) * ENTITY.size > room:
+            for key, _ in changed[room // ENTITY.size:]:
+                current[key] = baseline.get(key)
+                if current[key] is None:
+                    del current[key]
+            changed = changed[:room // ENTITY.size]
+        room -= len(changed) * ENTITY.size
+        if len(removed) * REMOVED.size > room:
+            for key in removed[room // REMOVED.size:]:
+                current[key] = baseline[key]
+            removed = removed[:room // REMOVED.size]
+        room -= len(removed) * REMOVED.size
+
+        # Effects are only for show: the ones out of range or out of room are dropped
+        radius_sq = AOI_RADIUS * AOI_RADIUS
+        effects = [(effect, pos) for effect, pos in self.effects
+                   if (pos[0] - ranger.pos[0]) ** 2 + (pos[1] - ranger.pos[1]) ** 2 <= radius_sq]
+        del effects[room // EFFECT.size:]
+
+        current["epoch"] = self.epoch
+        ranger.history[self.tick] = current
+        if len(ranger.history) > HISTORY_TICKS:
+            for tick in sorted(ranger.history)[:-HISTORY_TICKS]:
+                del ranger.history[tick]
+
+        selected = 0
+        selected_animal = sim.animal_registry.get(ranger.selected)
+        if selected_animal is not None:
+            selected = self.net_id(selected_animal)
+        flags = sim.game_over | (sim.game_paused << 1)
+        parts = [SNAP_HEADER.pack(MSG_SNAPSHOT, self.tick, baseline_tick, self.epoch,
+                                  ranger.last_input_seq, sim.game_score, sim.currency, sim.game_time,
+                                  flags, len(sim.FOOD_LEVEL), len(changed), len(removed), len(effects)),
+                 SNAP_IDS.pack(ranger.id, selected,
+                               -1 if sim.restart_timer is None else int(sim.restart_timer - time.time()))]
+        for i in range(len(sim.FOOD_LEVEL)):
+            parts.append(SNAP_FOOD.pack(min(65535, sim.FOOD_LEVEL[i])))
+        for (kind, entity_id), rec in changed:
+            parts.append(ENTITY.pack(kind, entity_id, *rec))
+        for kind, entity_id in removed:
+            parts.append(REMOVED.pack(kind, entity_id))
+        for effect, pos in effects:
+            parts.append(EFFECT.pack(EFFECT_NAMES.index(effect), *map(quantize_pos, pos)))
+        return b"".join(parts)
+
+
+class Snapshot:
+    def __init__(self):
+        self.tick = 0
+        self.epoch = 0
+        self.input_seq = 0
+        self.score = 0
+        self.currency = 0
+        self.game_time = 0.0
+        self.game_over = False
+        self.paused = False
+        self.ranger_id = 0
+        self.selected = 0
+        self.restart_in = -1
+        self.food = []
+        self.entities = {}  # (kind, id) -> record
+        self.effects = []  # (effect, pos) emitted on this tick
+
+
+def decode_snapshot(data, history):
+    """Rebuild the full snapshot from a delta packet, or return None if its baseline is gone."""
+    (_, tick, baseline_tick, epoch, input_seq, score, currency, game_time, flags,
+     food_count, changed_count, removed_count, effect_count) = SNAP_HEADER.unpack_from(data)
+    if baseline_tick:
+        baseline = history.get(baseline_tick)
+        if baseline is None or baseline.epoch != epoch:
+            return None
+        entities = dict(baseline.entities)
+    else:
+        entities = {}
+
+    snap = Snapshot()
+    snap.tick, snap.epoch, snap.input_seq = tick, epoch, input_seq
+    snap.score, snap.currency, snap.game_time = score, currency, game_time
+    snap.game_over, snap.paused = bool(flags & 1), bool(flags & 2)
+    offset = SNAP_HEADER.size
+    snap.ranger_id, snap.selected, snap.restart_in = SNAP_IDS.unpack_from(data, offset)
+    offset += SNAP_IDS.size
+    for _ in range(food_count):
+        snap.food.append(SNAP_FOOD.unpack_from(data, offset)[0])
+        offset += SNAP_FOOD.size
+    for _ in range(changed_count):
+        kind, entity_id, *rec = ENTITY.unpack_from(data, offset)
+        entities[(kind, entity_id)] = tuple(rec)
+        offset += ENTITY.size
+    for _ in range(removed_count):
+        entities.pop(REMOVED.unpack_from(data, offset), None)
+        offset += REMOVED.size
+    for _ in range(effect_count):
+        effect, *pos = EFFECT.unpack_from(data, offset)
+        snap.effects.append((EFFECT_NAMES[effect], tuple(p / POS_SCALE for p in pos)))
+        offset += EFFECT.size
+    snap.entities = entities
+    return snap
+
+
+class HeadlessClient:
+    """Protocol client with no rendering; the GL client and the bots both build on it."""
+
+    def __init__(self, host="127.0.0.1", port=DEFAULT_PORT):
+        self.server = (host, port)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+        self.ranger_id = None
+        self.history = {}  # tick -> Snapshot
+        self.latest = None
+        self.effects = []  # (effect, pos) from the snapshots decoded by the last poll()
+        self.pending = []  # (seq, event) not yet acknowledged by the server
+        self.next_seq = 1
+        self.last_send = 0
+        self.bytes_received = 0
+        self.snapshots_dropped = 0
+
+    def connect(self, timeout=5):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            self.sock.sendto(bytes([MSG_HELLO]), self.server)
+            readable, _, _ = select.select([self.sock], [], [], 0.25)
+            if readable:
+                data, _ = self.sock.recvfrom(65536)
+                if data and data[0] == MSG_WELCOME:
+                    self.ranger_id = struct.unpack_from("<I", data, 1)[0]
+                    return True
+        return False
+
+    def close(self):
+        try:
+            self.sock.sendto(bytes([MSG_BYE]), self.server)
+        except OSError:
+            pass
+        self.sock.close()
+
+    def send_key(self, key):
+        self.queue_event((0, key[0], 0) + NO_RAY)
+
+    def send_mouse(self, button, state, ray=None):
+        # Without a ray the server fires along the facing and selects the nearest animal
+        self.queue_event((1, button, state) + (NO_RAY if ray is None else (*ray[0], *ray[1])))
+
+    def queue_event(self, event):
+        self.pending.append((self.next_seq, event))
+        self.next_seq += 1
+
+    def flush(self):
+        # Unacknowledged events are resent until a snapshot confirms them
+        acked = self.latest.tick if self.latest else 0
+        events = self.pending[:256]
+        first_seq = events[0][0] if events else self.next_seq
+        packet = [INPUT_HEADER.pack(MSG_INPUT, first_seq, acked, len(events))]
+        for _, event in events:
+            packet.append(INPUT_EVENT.pack(*event))
+        self.sock.sendto(b"".join(packet), self.server)
+        self.last_send = time.time()
+
+    def poll(self):
+        """Drain the socket; returns True if a newer snapshot was decoded."""
+        updated = False
+        self.effects = []
+        while True:
+            try:
+                data, _ = self.sock.recvfrom(65536)
+            except (BlockingIOError, ConnectionResetError):
+                break
+            if not data or data[0] != MSG_SNAPSHOT:
+                continue
+            self.bytes_received += len(data)
+            snap = decode_snapshot(data, self.history)
+            if snap is None:
+                self.snapshots_dropped += 1
+                continue
+            if self.latest and snap.tick <= self.latest.tick:
+                continue  # Out of order
+            self.history[snap.tick] = snap
+            if len(self.history) > HISTORY_TICKS:
+                for tick in sorted(self.history)[:-HISTORY_TICKS]:
+                    del self.history[tick]
+            self.latest = snap
+            self.effects.extend(snap.effects)
+            self.pending = [(seq, e) for seq, e in self.pending if seq > snap.input_seq]
+            updated = True
+        since_send = time.time() - self.last_send
+        if updated or (self.pending and since_send > 1.0 / TICK_RATE) or since_send > 0.1:
+            self.flush()
+        return updated
+
+
+class GLClient(HeadlessClient):
+    """Feeds decoded snapshots into the GLUT front end's globals."""
+
+    def __init__(self, host="127.0.0.1", port=DEFAULT_PORT):
+        super().__init__(host, port)
+        import mapzoo_alt_version  # The GLUT front end is only needed on this side
+        self.mz = mapzoo_alt_version
+        self.objects = {}  # (kind, id) -> local Animal/Poacher/Dart used for drawing
+        self.epoch = None
+        self.last_idle = None
+
+    def apply(self, snap):
+        if snap.epoch != self.epoch:
+            self.objects = {}
+            self.epoch = snap.epoch
+            self.mz.particles.clear()
+
+        sim.game_score = snap.score
+        sim.currency = snap.currency
+        sim.game_time = snap.game_time
+        sim.game_over = snap.game_over
+        sim.game_paused = snap.paused
+        sim.restart_timer = None if snap.restart_in < 0 else time.time() + snap.restart_in
+        for i, level in enumerate(snap.food):
+            sim.FOOD_LEVEL[i] = level
+
+        animals, poachers, darts, rangers = [], [], [], []
+        selected = None
+        for key in list(self.objects):
+            if key not in snap.entities:
+                del self.objects[key]
+        for key, rec in snap.entities.items():
+            kind, entity_id = key
+            qx, qy, qz, yaw, a, b, c, flags = rec
+            pos = [qx / POS_SCALE, qy / POS_SCALE, qz / POS_SCALE]
+            heading = math.radians(dequantize_angle(yaw))
+            if kind == KIND_ANIMAL:
+                animal = self.objects.get(key)
+                if animal is None:
+                    animal_type = sim.animal_types[a]
+                    habitat = sim.habitats[animal_type["habitat_index"]]
+                    animal = sim.Animal(pos, animal_type["name"], habitat["color"], animal_type["size"])
+                    animal.habitat_index = animal_type["habitat_index"]
+                    animal.habitat_pos = habitat["center"]
+                    self.objects[key] = animal
+                animal.pos = pos
+                animal.move_dir = [math.cos(heading), math.sin(heading), 0]
+                animal.health = b / 2.55
+                animal.happiness = c / 2.55
+                animal.is_eating = bool(flags & 1)
+                animal.captured = bool(flags & 2)
+                animal.dead = bool(flags & 4)
+                animal.handle = key  # The server's id stands in for a local handle
+                if entity_id == snap.selected:
+                    selected = key
+                animals.append(animal)
+            elif kind == KIND_POACHER:
+                poacher = self.objects.get(key)
+                if poacher is None:
+                    poacher = self.objects[key] = sim.Poacher(pos, None)
+                poacher.pos = pos
+                poacher.captured = bool(flags & 2)
+                poachers.append(poacher)
+            elif kind == KIND_DART:
+                direction = [math.cos(heading), math.sin(heading), 0]
+                dart = self.objects.get(key)
+                if dart is None:
+                    dart = self.objects[key] = sim.Dart(pos, direction)
+                dart.pos, dart.direction = pos, direction
+                darts.append(dart)
+            elif kind == KIND_RANGER:
+                angle = dequantize_angle(yaw)
+                if entity_id == snap.ranger_id:
+                    sim.player_pos[:] = pos
+                    sim.player_angle = angle
+                else:
+                    rangers.append((pos, angle))
+
+        sim.animals = animals
+        sim.poachers = poachers
+        sim.darts = darts
+        self.mz.other_rangers = rangers
+        sim.selected_animal = selected
+
+    def idle(self):
+        # The client's step_frame: snapshots stand in for the simulation
+        if self.poll():
+            self.apply(self.latest)
+        for effect, pos in self.effects:
+            self.mz.particles.burst(effect, pos)
+        if self.mz.profiler.armed:
+            self.mz.profiler.frame_boundary()
+        now = time.time()
+        if self.last_idle is not None:
+            if not sim.game_paused:
+                self.mz.particles.update(now - self.last_idle, sim.ground_offsets)
+            self.mz.quality.update(now - self.last_idle)  # Render detail still adapts on clients
+        self.last_idle = now
+        self.mz.glutPostRedisplay()
+
+    def keyboard(self, key, x, y):
+        if key in SERVER_KEYS:
+            self.send_key(key)
+        elif key in (b'\x1b', b'c', b'q', b'P', b'm'):
+            self.mz.keyboardListener(key, x, y)
+
+    def mouse(self, button, state, x, y):
+        if state == GLUT_DOWN:
+            self.send_mouse(button, state, self.mz.mouse_ray(x, y))
+
+
+def run_client(host, port):
+    client = GLClient(host, port)
+    if not client.connect():
+        print(f"No server answering at {host}:{port}")
+        return
+    print(f"Connected as ranger {client.ranger_id}")
+    try:
+        client.mz.main(idle_func=client.idle, keyboard_func=client.keyboard, mouse_func=client.mouse,
+                       threaded=False)  # Snapshots come from the server instead
+    finally:
+        client.close()
+
+
+def run_bots(host, port, count, duration):
+    # Several headless rangers wandering, feeding and shooting from one process
+    bots = []
+    for _ in range(count):
+        bot = HeadlessClient(host, port)
+        if bot.connect():
+            bots.append(bot)
+    print(f"{len(bots)} bots connected")
+    keys = [b'w', b'w', b'w', b'a', b'd', b's', b'f']
+    start = time.time()
+    last_report = start
+    try:
+        while time.time() - start < duration:
+            for bot in bots:
+                bot.poll()
+                if random.random() < 0.2:
+                    bot.send_key(random.choice(keys))
+                if random.random() < 0.02:
+                    bot.send_mouse(random.choice((0, 2)), GLUT_DOWN)
+            now = time.time()
+            if now - last_report > 5:
+                received = sum(b.bytes_received for b in bots)
+                dropped = sum(b.snapshots_dropped for b in bots)
+                print(f"bots: {received / (now - last_report) / 1024 / max(1, len(bots)):.1f} KiB/s per client, "
+                      f"{dropped} undecodable snapshots")
+                for bot in bots:
+                    bot.bytes_received = 0
+                last_report = now
+            time.sleep(1.0 / TICK_RATE)
+    finally:
+        for bot in bots:
+            bot.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Zoo Defender local multiplayer")
+    parser.add_argument("mode", choices=("server", "client", "bots"))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--count", type=int, default=8, help="number of bots")
+    parser.add_argument("--duration", type=float, default=60, help="bot run time in seconds")
+    args = parser.parse_args()
+
+    if args.mode == "server":
+        Server(args.port, args.host).run()
+    elif args.mode == "client":
+        run_client(args.host, args.port)
+    else:
+        run_bots(args.host, args.port, args.count, args.duration)
+
+
+if __name__ == "__main__":
+    main()
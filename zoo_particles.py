@@ -0,0 +1,114 @@
+"""
+Array-backed particle system for gameplay effects.
+
+All particle state lives in preallocated NumPy arrays and is integrated in one
+vectorized step per tick. Given the terrain, the step samples the ground
+height under every live particle, so they bounce off hills and fall into
+valleys. Slots are handed out from a ring cursor, so once the
+cap is reached the oldest particles are recycled first. The cap can be lowered
+below the allocated capacity at run time (set_limit) without reallocating. The front end draws
+the whole pool with a single glDrawArrays(GL_POINTS) call.
+"""
+import numpy as np
+
+MAX_PARTICLES = 50000
+GRAVITY = 180.0  # Units per second squared
+GROUND_Z = 0.0  # Over the flat ground; update() raises it by the terrain under each particle
+BOUNCE = 0.3  # Fraction of vertical speed kept when hitting the ground
+
+# Burst presets: particle count, colour, speed range, upward kick, lifetime range
+EFFECTS = {
+    "feed": {"count": 30, "color": (0.3, 0.9, 0.2), "speed": (10, 40), "up": 60, "life": (0.6, 1.2)},
+    "dart_hit": {"count": 60, "color": (0.3, 0.5, 1.0), "speed": (40, 120), "up": 40, "life": (0.3, 0.8)},
+    "capture": {"count": 120, "color": (0.8, 0.1, 0.8), "speed": (30, 90), "up": 120, "life": (0.8, 1.6)},
+    "death": {"count": 80, "color": (0.5, 0.5, 0.5), "speed": (5, 30), "up": 90, "life": (1.5, 2.5)},
+}
+
+
+class ParticleSystem:
+    def __init__(self, capacity=MAX_PARTICLES, seed=None):
+        self.capacity = capacity
+        self.limit = capacity  # Slots in use by the ring; <= capacity
+        self.pos = np.zeros((capacity, 3), dtype=np.float32)
+        self.vel = np.zeros((capacity, 3), dtype=np.float32)
+        self.color = np.zeros((capacity, 4), dtype=np.float32)  # RGBA; alpha fades with age
+        self.age = np.zeros(capacity, dtype=np.float32)
+        self.life = np.zeros(capacity, dtype=np.float32)  # 0 marks a free slot
+        self.cursor = 0  # Next slot to (re)use
+        self.used = 0  # High-water mark; only [0, used) is integrated and drawn
+        self.rng = np.random.default_rng(seed)
+
+    def emit(self, pos, count, color, speed=(20, 60), up=50, life=(0.5, 1.0)):
+        count = min(count, self.limit)
+        if count <= 0:
+            return
+        slots = (self.cursor + np.arange(count)) % self.limit
+        self.cursor = (self.cursor + count) % self.limit
+        self.used = max(self.used, min(self.limit, slots.max() + 1))
+
+        # Random directions in the XY plane with an upward kick
+        angle = self.rng.uniform(0, 2 * np.pi, count)
+        magnitude = self.rng.uniform(speed[0], speed[1], count)
+        self.vel[slots, 0] = np.cos(angle) * magnitude
+        self.vel[slots, 1] = np.sin(angle) * magnitude
+        self.vel[slots, 2] = self.rng.uniform(0.5, 1.0, count) * up
+        self.pos[slots] = pos
+        self.color[slots, :3] = color
+        self.color[slots, 3] = 1.0
+        self.age[slots] = 0
+        self.life[slots] = self.rng.uniform(life[0], life[1], count)
+
+    def burst(self, effect, pos):
+        preset = EFFECTS[effect]
+        self.emit(pos, preset["count"], preset["color"], preset["speed"], preset["up"], preset["life"])
+
+    def update(self, dt, ground=None):
+        # ground, if given, maps arrays of x and y to the ground's height above the flat
+        # ground (zoo_sim.ground_offsets)
+        n = self.used
+        if n == 0:
+            return
+        pos, vel = self.pos[:n], self.vel[:n]
+        age, life = self.age[:n], self.life[:n]
+
+        vel[:, 2] -= GRAVITY * dt
+        pos += vel * dt
+        age += dt
+
+        # Bounce off the ground
+        floor = GROUND_Z
+        if ground is not None:
+            # Sampled under live particles only; free slots stay where they are
+            floor = np.full(n, GROUND_Z, dtype=np.float32)
+            live = np.flatnonzero(life > 0)
+            floor[live] += ground(pos[live, 0], pos[live, 1])
+        below = pos[:, 2] < floor
+        pos[:, 2] = np.maximum(pos[:, 2], floor)
+        vel[below, 2] *= -BOUNCE
+        vel[below, :2] *= 0.7
+
+        # Fade out and free expired particles
+        alive = life > 0
+        fade = np.zeros(n, dtype=np.float32)
+        np.divide(age, life, out=fade, where=alive)
+        self.color[:n, 3] = np.clip(1.0 - fade, 0.0, 1.0) * alive
+        life[alive & (age >= life)] = 0
+
+    def set_limit(self, limit):
+        # Particles beyond a lowered limit are dropped at once
+        self.limit = max(1, min(limit, self.capacity))
+        if self.used > self.limit:
+            self.life[self.limit:self.used] = 0
+            self.color[self.limit:self.used, 3] = 0
+            self.used = self.limit
+        if self.cursor >= self.limit:
+            self.cursor = 0
+
+    def live_count(self):
+        return int(np.count_nonzero(self.life[:self.used]))
+
+    def clear(self):
+        self.life[:] = 0
+        self.color[:, 3] = 0
+        self.cursor = 0
+        self.used = 0
@@ -0,0 +1,252 @@
+"""
+Screen-space picking for animals and poachers.
+
+A mouse click is unprojected through the camera matrices captured in
+showScreen and cast as a ray against a bounding-volume hierarchy of entity
+spheres. Each tick only hands the picker that tick's entities; the tree is
+refitted to them on the first pick after it, and rebuilt only when the set
+of entities has changed, so frames without a click cost nothing. Traversal
+is breadth-first over NumPy arrays, so a pick costs a couple of dozen vector
+operations regardless of entity count.
+"""
+import math
+from itertools import chain
+
+import numpy as np
+
+LEAF_SIZE = 8
+REBUILD_INTERVAL = 600  # Ticks of movement before a full rebuild to restore tree quality
+
+
+def unproject_ray(x, y, modelview, projection, viewport):
+    """World-space ray (origin, unit direction) through GLUT window pixel (x, y).
+
+    modelview and projection are 4x4 as returned by glGetDoublev (column-major),
+    viewport is (x, y, width, height).
+    """
+    mv = np.asarray(modelview, dtype=np.float64).reshape(4, 4)
+    pr = np.asarray(projection, dtype=np.float64).reshape(4, 4)
+    # Column-major GL matrices read row-major are transposed, so row vectors multiply on the left
+    inverse = np.linalg.inv(mv @ pr)
+
+    vx, vy, width, height = viewport
+    ndc_x = 2.0 * (x - vx) / width - 1.0
+    ndc_y = 2.0 * ((height - y) - vy) / height - 1.0  # GLUT y grows downward
+    near = np.array([ndc_x, ndc_y, -1.0, 1.0]) @ inverse
+    far = np.array([ndc_x, ndc_y, 1.0, 1.0]) @ inverse
+    near = near[:3] / near[3]
+    far = far[:3] / far[3]
+    direction = far - near
+    return near, direction / np.linalg.norm(direction)
+
+
+def ray_plane_z(origin, direction, z):
+    """Point where the ray crosses the horizontal plane at height z, or None."""
+    if abs(direction[2]) < 1e-9:
+        return None
+    t = (z - origin[2]) / direction[2]
+    if t <= 0:
+        return None
+    return origin + direction * t
+
+
+def aim_direction(picker, ray, muzzle, animals, poachers):
+    """Horizontal unit vector from the muzzle towards what the ray points at, or None.
+
+    The target is the entity the ray picks, else the point where the ray
+    crosses the muzzle's height.
+    """
+    entity, _ = picker.pick(*ray)
+    if entity is not None:
+        kind, index = entity
+        target = animals[index].pos if kind == "animal" else poachers[index].pos
+    else:
+        target = ray_plane_z(ray[0], ray[1], muzzle[2])
+    if target is None:
+        return None
+    aim_x, aim_y = target[0] - muzzle[0], target[1] - muzzle[1]
+    length = math.sqrt(aim_x**2 + aim_y**2)
+    if length == 0:
+        return None
+    return [aim_x / length, aim_y / length, 0]
+
+
+class SphereBVH:
+    def __init__(self):
+        self.count = 0
+        self.nodes = 0
+
+    def build(self, centers, radii):
+        centers = np.asarray(centers, dtype=np.float32).reshape(-1, 3)
+        radii = np.asarray(radii, dtype=np.float32)
+        n = len(centers)
+        self.count = n
+        self.order = np.arange(n)
+        capacity = 2 * (n // (LEAF_SIZE // 2) + 1)  # Leaves hold at least LEAF_SIZE/2 items
+        self.left = np.full(capacity, -1, dtype=np.int64)
+        self.right = np.full(capacity, -1, dtype=np.int64)
+        self.start = np.zeros(capacity, dtype=np.int64)
+        self.size = np.zeros(capacity, dtype=np.int64)
+        self.depth = np.zeros(capacity, dtype=np.int64)
+
+        # Top-down median split on the widest axis; children always get higher indices
+        self.nodes = 1
+        self.start[0], self.size[0] = 0, n
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            lo, count = self.start[node], self.size[node]
+            if count <= LEAF_SIZE:
+                continue
+            members = self.order[lo:lo + count]
+            pts = centers[members]
+            axis = int(np.argmax(pts.max(axis=0) - pts.min(axis=0)))
+            half = count // 2
+            split = np.argpartition(pts[:, axis], half)
+            self.order[lo:lo + count] = members[split]
+            for child, child_lo, child_count in ((self.nodes, lo, half),
+                                                 (self.nodes + 1, lo + half, count - half)):
+                self.start[child], self.size[child] = child_lo, child_count
+                self.depth[child] = self.depth[node] + 1
+                stack.append(child)
+            self.left[node], self.right[node] = self.nodes, self.nodes + 1
+            self.nodes += 2
+
+        m = self.nodes
+        for name in ("left", "right", "start", "size", "depth"):
+            setattr(self, name, getattr(self, name)[:m].copy())
+        self.is_leaf = self.left < 0
+        leaves = np.nonzero(self.is_leaf)[0]
+        self.leaves = leaves[np.argsort(self.start[leaves])]  # reduceat needs ascending starts
+        self.internal_by_depth = [np.nonzero(~self.is_leaf & (self.depth == d))[0]
+                                  for d in range(int(self.depth.max()) + 1)]
+        self.lo = np.zeros((m, 3), dtype=np.float32)
+        self.hi = np.zeros((m, 3), dtype=np.float32)
+        self.refits = 0
+        self.refit(centers, radii)
+
+    def refit(self, centers, radii):
+        # Leaf boxes from their spheres, then parents bottom-up one depth level at a time
+        centers = np.asarray(centers, dtype=np.float32).reshape(-1, 3)
+        radii = np.asarray(radii, dtype=np.float32)
+        self.centers = centers
+        self.radii = radii
+        self.refits += 1
+        if self.count == 0:
+            return
+        ordered = centers[self.order]
+        r = radii[self.order][:, None]
+        starts = self.start[self.leaves]
+        self.lo[self.leaves] = np.minimum.reduceat(ordered - r, starts, axis=0)
+        self.hi[self.leaves] = np.maximum.reduceat(ordered + r, starts, axis=0)
+        for nodes in reversed(self.internal_by_depth):
+            if len(nodes):
+                self.lo[nodes] = np.minimum(self.lo[self.left[nodes]], self.lo[self.right[nodes]])
+                self.hi[nodes] = np.maximum(self.hi[self.left[nodes]], self.hi[self.right[nodes]])
+
+    def intersect(self, origin, direction, max_dist=np.inf, mask=None):
+        """Index of the nearest sphere hit by the ray and its distance, or (None, None).
+
+        mask optionally restricts the test to primitives where it is True.
+        """
+        if self.count == 0:
+            return None, None
+        origin = np.asarray(origin, dtype=np.float64)
+        direction = np.asarray(direction, dtype=np.float64)
+        with np.errstate(divide="ignore"):
+            inv = 1.0 / direction
+
+        frontier = np.array([0])
+        leaves = []
+        while len(frontier):
+            # Slab test against every node on the frontier at once
+            t0 = (self.lo[frontier] - origin) * inv
+            t1 = (self.hi[frontier] - origin) * inv
+            t_near = np.nanmax(np.minimum(t0, t1), axis=1)
+            t_far = np.nanmin(np.maximum(t0, t1), axis=1)
+            hit = frontier[(t_near <= t_far) & (t_far >= 0) & (t_near <= max_dist)]
+            leaf_mask = self.is_leaf[hit]
+            leaves.append(hit[leaf_mask])
+            inner = hit[~leaf_mask]
+            frontier = np.concatenate([self.left[inner], self.right[inner]])
+
+        leaves = np.concatenate(leaves)
+        if not len(leaves):
+            return None, None
+        candidates = np.concatenate([self.order[s:s + c]
+                                     for s, c in zip(self.start[leaves], self.size[leaves])])
+        if mask is not None:
+            candidates = candidates[mask[candidates]]
+            if not len(candidates):
+                return None, None
+
+        # Ray-sphere test over every candidate primitive
+        oc = self.centers[candidates] - origin
+        b = oc @ direction
+        c = np.einsum("ij,ij->i", oc, oc) - self.radii[candidates] ** 2
+        disc = b * b - c
+        ok = disc >= 0
+        if not ok.any():
+            return None, None
+        root = np.sqrt(np.where(ok, disc, 0))
+        t = np.where(b - root >= 0, b - root, b + root)  # Origin inside a sphere uses the exit point
+        t = np.where(ok & (t >= 0) & (t <= max_dist), t, np.inf)
+        best = int(np.argmin(t))
+        if not np.isfinite(t[best]):
+            return None, None
+        return int(candidates[best]), float(t[best])
+
+
+class EntityPicker:
+    """Keeps a BVH over live animals and active poachers in step with the game."""
+
+    def __init__(self):
+        self.bvh = SphereBVH()
+        self.slots = None  # (animal indices, poacher indices) of the BVH primitives, in order
+        self.indices = np.zeros(0, dtype=np.int64)
+        self.kind_masks = {}
+        self.pending = None  # (animals, poachers) not yet fitted into the tree
+        self.ticks = 0
+        self.built_at = 0  # Tick of the last full build
+
+    def update(self, animals, poachers):
+        # Picks are rare next to frames, so the tree is fitted when one happens
+        self.pending = (animals, poachers)
+        self.ticks += 1
+
+    def sync(self):
+        if self.pending is None:
+            return
+        animals, poachers = self.pending
+        self.pending = None
+        live_animals = [i for i, a in enumerate(animals) if not a.captured and not a.dead]
+        live_poachers = [i for i, p in enumerate(poachers) if p.active and not p.captured]
+        n = len(live_animals) + len(live_poachers)
+        # float64 through fromiter is several times faster than building float32 from lists
+        positions = [animals[i].pos for i in live_animals] + [poachers[i].pos for i in live_poachers]
+        centers = np.fromiter(chain.from_iterable(positions), dtype=np.float64, count=3 * n).reshape(n, 3)
+        centers[len(live_animals):, 2] += 25  # Poachers are 50-unit cones; centre the sphere halfway up
+        radii = np.fromiter((animals[i].size for i in live_animals), dtype=np.float64, count=len(live_animals))
+        radii = np.concatenate([radii, np.full(len(live_poachers), 30.0)])
+
+        # Entity slots, not list identity: the simulation thread publishes new tuples every tick
+        slots = (live_animals, live_poachers)
+        if slots != self.slots or self.ticks - self.built_at >= REBUILD_INTERVAL:
+            self.slots = slots
+            self.built_at = self.ticks
+            self.indices = np.array(live_animals + live_poachers, dtype=np.int64)
+            is_animal = np.arange(n) < len(live_animals)
+            self.kind_masks = {"animal": is_animal, "poacher": ~is_animal}
+            self.bvh.build(centers, radii)
+        else:
+            self.bvh.refit(centers, radii)
+
+    def pick(self, origin, direction, kind=None, max_dist=np.inf):
+        """First entity under the ray as ("animal" | "poacher", index), optionally of one kind."""
+        self.sync()
+        mask = self.kind_masks.get(kind) if kind is not None else None
+        index, dist = self.bvh.intersect(origin, direction, max_dist, mask)
+        if index is None:
+            return None, None
+        kind = "animal" if self.kind_masks["animal"][index] else "poacher"
+        return (kind, int(self.indices[index])), dist
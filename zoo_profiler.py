@@ -0,0 +1,182 @@
+"""
+On-demand deep profiling of the running game.
+
+Arming the profiler (Shift+P in the game) captures the next PROFILE_FRAMES
+frames with two profilers at once:
+
+- cProfile on the render thread, giving exact call counts and times for
+  draw_shapes, update_game (when it runs inline), Dart.update and the rest.
+- A sampling thread that records the Python stack of every thread about once
+  a millisecond. It also covers the simulation thread, which cProfile cannot
+  see from the render thread. Samples are only taken when the sampler gets
+  the GIL, so the real rate is lower during long stretches of pure Python.
+
+The results go to OUTPUT_DIR under a timestamped name:
+
+    zoo_profile_<time>.prof          cProfile data (pstats, snakeviz)
+    zoo_profile_<time>.txt           frame times and the hottest functions
+    zoo_profile_<time>.folded        folded stacks (flamegraph.pl, speedscope)
+
+Nothing is hooked while the profiler is idle. The front end checks `armed`
+once per frame and otherwise never calls in here. Frame times inside a
+capture include cProfile's own overhead.
+"""
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+PROFILE_FRAMES = 120
+SAMPLE_INTERVAL = 0.001  # Seconds between stack samples
+OUTPUT_DIR = "profiles"
+TOP_FUNCTIONS = 30
+MESSAGE_SECONDS = 5  # How long the HUD shows where a profile was saved
+
+
+def _label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler(threading.Thread):
+    """Counts the folded Python stack of every other thread, each interval."""
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        super().__init__(name="zoo-profiler", daemon=True)
+        self.interval = interval
+        self.stacks = Counter()  # "thread;outer;...;inner" -> samples
+        self.samples = 0
+        self.running = False
+
+    def start(self):
+        self.running = True
+        super().start()
+
+    def stop(self):
+        self.running = False
+        self.join()
+
+    def run(self):
+        own = threading.get_ident()
+        while self.running:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}"))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+            time.sleep(self.interval)
+
+    def hottest(self, count=TOP_FUNCTIONS):
+        """(thread, function, inclusive samples, own samples) for the busiest functions."""
+        inclusive, own = Counter(), Counter()
+        for stack, samples in self.stacks.items():
+            thread, *functions = stack.split(";")
+            for function in set(functions):
+                inclusive[thread, function] += samples
+            if functions:
+                own[thread, functions[-1]] += samples
+        return [(thread, function, samples, own[thread, function])
+                for (thread, function), samples in inclusive.most_common(count)]
+
+
+class DeepProfiler:
+    def __init__(self, frames=PROFILE_FRAMES, output_dir=OUTPUT_DIR):
+        self.frames = frames
+        self.output_dir = output_dir
+        self.armed = False
+        self.profile = None  # cProfile.Profile while capturing
+        self.sampler = None
+        self.started = None  # Local time of the capture's first frame
+        self.frame_times = []
+        self.last_boundary = None
+        self.message = None
+        self.message_until = 0
+
+    def arm(self, frames=None):
+        """Captures the next frames, starting at the next frame boundary."""
+        if self.armed:
+            return
+        self.frames = frames or self.frames
+        self.armed = True
+        self.frame_times = []
+        self.message = f"Profiling the next {self.frames} frames..."
+        self.message_until = float("inf")
+
+    def frame_boundary(self):
+        # Called by the front end once per frame, but only while armed
+        now = time.perf_counter()
+        if self.profile is None:
+            self.started = time.localtime()
+            self.sampler = StackSampler()
+            self.sampler.start()
+            self.profile = cProfile.Profile()
+            self.last_boundary = now
+            self.profile.enable()
+            return
+        self.frame_times.append(now - self.last_boundary)
+        self.last_boundary = now
+        if len(self.frame_times) >= self.frames:
+            self.finish()
+
+    def finish(self):
+        self.profile.disable()
+        self.sampler.stop()
+        try:
+            path = self.write()
+            self.message = f"Profile saved: {path}.*"
+        except OSError as error:
+            self.message = f"Profile not saved: {error}"
+        print(self.message, file=sys.stderr)
+        self.message_until = time.time() + MESSAGE_SECONDS
+        self.profile = self.sampler = None
+        self.armed = False
+
+    def write(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(self.output_dir, "zoo_profile_" + time.strftime("%Y%m%d-%H%M%S", self.started))
+        self.profile.dump_stats(base + ".prof")
+        with open(base + ".folded", "w") as out:
+            for stack, samples in sorted(self.sampler.stacks.items()):
+                out.write(f"{stack} {samples}\n")
+        with open(base + ".txt", "w") as out:
+            out.write(self.summary())
+        return base
+
+    def summary(self):
+        out = io.StringIO()
+        times = sorted(self.frame_times)
+        average = sum(times) / len(times)
+        out.write(f"Zoo Defender deep profile, {time.strftime('%Y-%m-%d %H:%M:%S', self.started)}\n")
+        out.write(f"{len(times)} frames: avg {average * 1000:.1f} ms, min {times[0] * 1000:.1f} ms, "
+                  f"p95 {times[int(len(times) * 0.95)] * 1000:.1f} ms, max {times[-1] * 1000:.1f} ms\n")
+        slowest = sorted(range(len(self.frame_times)), key=self.frame_times.__getitem__, reverse=True)[:5]
+        out.write("Slowest frames: " + ", ".join(f"#{i} {self.frame_times[i] * 1000:.1f} ms" for i in slowest) + "\n")
+
+        for title, key in (("cumulative time", "cumulative"), ("own time", "tottime")):
+            out.write(f"\n== Render thread, cProfile, by {title} ==\n")
+            stats = pstats.Stats(self.profile, stream=out)
+            stats.strip_dirs().sort_stats(key).print_stats(TOP_FUNCTIONS)
+
+        samples = max(self.sampler.samples, 1)
+        out.write(f"\n== All threads, sampled ({self.sampler.samples} samples) ==\n")
+        out.write(f"{'inclusive':>9} {'own':>6}  thread: function\n")
+        for thread, function, inclusive, own in self.sampler.hottest():
+            out.write(f"{inclusive / samples:8.1%} {own / samples:6.1%}  {thread}: {function}\n")
+        return out.getvalue()
+
+    def status(self):
+        """HUD line while capturing and shortly after, else None."""
+        if self.profile is not None:
+            return f"Profiling: {len(self.frame_times)}/{self.frames} frames"
+        if self.message is not None and time.time() < self.message_until:
+            return self.message
+        return None
@@ -0,0 +1,122 @@
+"""
+Adaptive quality controller.
+
+The front end reports every frame's duration to QualityController.update().
+The controller smooths it with an exponential moving average and compares
+that with a target frame time. It steps down one quality tier when frames stay
+too slow, and back up one tier when they stay comfortably fast. The two
+thresholds are far apart, the up-step needs a much longer streak than the
+down-step, and no change is made during a cooldown after the last one. A tier
+that is only just affordable therefore doesn't flip back and forth.
+
+A tier is a dict of render settings: tessellation detail, mountain ring
+segments, fence detail, particle cap, terrain LOD range, the distance at
+which animals become impostor sprites, and the internal render scale (the
+scene is drawn into a smaller buffer and upscaled).
+pin() holds a tier regardless of frame time; ZOO_QUALITY=<tier name> pins it
+at startup, which suits kiosks whose hardware is known in advance.
+"""
+import os
+
+TARGET_FRAME_TIME = 1 / 30  # Seconds
+SMOOTHING = 0.1  # Weight of the newest frame in the moving average
+DOWNGRADE_ABOVE = 1.2  # Step down while the average is above target * this...
+DOWNGRADE_FRAMES = 30  # ...for this many frames in a row
+UPGRADE_BELOW = 0.7  # Step up while the average is below target * this...
+UPGRADE_FRAMES = 180  # ...for this many frames in a row
+COOLDOWN_FRAMES = 60  # Frames to wait after a change before judging again
+MAX_FRAME_TIME = 0.25  # Longer frames (window drags, breakpoints) are clamped
+
+# Highest quality first
+TIERS = [
+    {"name": "High", "detail": 1.0, "mountain_segments": 64, "fence_posts": 36, "fence_rails": 2,
+     "particle_cap": 50000, "terrain_lod_range": 250, "impostor_distance": 700, "render_scale": 1.0},
+    {"name": "Medium", "detail": 0.6, "mountain_segments": 48, "fence_posts": 24, "fence_rails": 2,
+     "particle_cap": 20000, "terrain_lod_range": 180, "impostor_distance": 500, "render_scale": 1.0},
+    {"name": "Low", "detail": 0.4, "mountain_segments": 32, "fence_posts": 18, "fence_rails": 1,
+     "particle_cap": 8000, "terrain_lod_range": 120, "impostor_distance": 350, "render_scale": 0.75},
+    {"name": "Minimal", "detail": 0.25, "mountain_segments": 24, "fence_posts": 12, "fence_rails": 1,
+     "particle_cap": 2000, "terrain_lod_range": 80, "impostor_distance": 250, "render_scale": 0.5},
+]
+
+
+def tier_index(name):
+    for i, tier in enumerate(TIERS):
+        if tier["name"].lower() == name.lower():
+            return i
+    raise ValueError(f"Unknown quality tier {name!r}; expected one of "
+                     f"{', '.join(t['name'] for t in TIERS)}")
+
+
+class QualityController:
+    def __init__(self, target=TARGET_FRAME_TIME, tier=0):
+        self.target = target
+        self.tier = tier
+        self.pinned = False
+        self.average = None  # Smoothed frame time in seconds
+        self.slow_frames = 0
+        self.fast_frames = 0
+        self.cooldown = 0
+        self.listeners = []  # Called with the new settings after every tier change
+
+        pinned = os.environ.get("ZOO_QUALITY", "auto")
+        if pinned.lower() != "auto":
+            self.pin(tier_index(pinned))
+
+    @property
+    def settings(self):
+        return TIERS[self.tier]
+
+    def set_tier(self, tier):
+        tier = max(0, min(len(TIERS) - 1, tier))
+        self.slow_frames = self.fast_frames = 0
+        self.cooldown = COOLDOWN_FRAMES
+        if tier != self.tier:
+            self.tier = tier
+            for listener in self.listeners:
+                listener(self.settings)
+
+    def pin(self, tier):
+        self.pinned = True
+        self.set_tier(tier)
+
+    def unpin(self):
+        self.pinned = False
+        self.cooldown = COOLDOWN_FRAMES
+
+    def cycle_pin(self):
+        """Auto -> each tier pinned in turn -> auto; for the quality hotkey."""
+        if not self.pinned:
+            self.pin(0)
+        elif self.tier < len(TIERS) - 1:
+            self.pin(self.tier + 1)
+        else:
+            self.unpin()
+
+    def update(self, frame_time):
+        """Feeds one frame's duration; returns True if the tier changed."""
+        frame_time = min(frame_time, MAX_FRAME_TIME)
+        if self.average is None:
+            self.average = frame_time
+        else:
+            self.average += (frame_time - self.average) * SMOOTHING
+        if self.pinned:
+            return False
+        if self.cooldown > 0:
+            self.cooldown -= 1
+            return False
+
+        self.slow_frames = self.slow_frames + 1 if self.average > self.target * DOWNGRADE_ABOVE else 0
+        self.fast_frames = self.fast_frames + 1 if self.average < self.target * UPGRADE_BELOW else 0
+        if self.slow_frames >= DOWNGRADE_FRAMES and self.tier < len(TIERS) - 1:
+            self.set_tier(self.tier + 1)
+            return True
+        if self.fast_frames >= UPGRADE_FRAMES and self.tier > 0:
+            self.set_tier(self.tier - 1)
+            return True
+        return False
+
+    def status(self):
+        mode = "pinned" if self.pinned else "auto"
+        average = f"{self.average * 1000:.1f}" if self.average is not None else "-"
+        return f"Quality: {self.settings['name']} ({mode})  {average}/{self.target * 1000:.0f} ms"
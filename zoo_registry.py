@@ -0,0 +1,117 @@
+"""
+Generational-handle registry for game entities.
+
+Each entity kind (animals, poachers, darts) lives in its own Registry. The
+live entities are kept packed in the `dense` list, which update and draw loops
+iterate directly. A handle is an int that packs a slot number and that slot's
+generation. Lookups go slot -> dense index in O(1). Removal swaps the last
+entity into the hole, so it is O(1) too. The slot's generation is then bumped,
+so old handles to it stop resolving instead of pointing at whatever reuses the
+slot.
+
+Removals requested during a tick are usually deferred with defer_remove() and
+applied after the update loops, so that nothing is removed from under a loop
+that is still iterating.
+"""
+
+SLOT_BITS = 32
+SLOT_MASK = (1 << SLOT_BITS) - 1
+
+
+def make_handle(slot, generation):
+    return generation << SLOT_BITS | slot
+
+
+class Registry:
+    def __init__(self):
+        self.dense = []  # Live entities, packed; this list object is never replaced
+        self.dense_slot = []  # Slot of each dense entry
+        self.generation = []  # Per slot
+        self.slot_dense = []  # Per slot: index into dense, or -1 when the slot is free
+        self.free = []
+        self.pending = []
+
+    def __len__(self):
+        return len(self.dense)
+
+    def __iter__(self):
+        return iter(self.dense)
+
+    def __contains__(self, handle):
+        return self.get(handle) is not None
+
+    def add(self, entity):
+        """Stores entity, sets entity.handle and returns the handle."""
+        if self.free:
+            slot = self.free.pop()
+        else:
+            slot = len(self.generation)
+            self.generation.append(0)
+            self.slot_dense.append(-1)
+        self.slot_dense[slot] = len(self.dense)
+        self.dense.append(entity)
+        self.dense_slot.append(slot)
+        entity.handle = make_handle(slot, self.generation[slot])
+        return entity.handle
+
+    def _dense_index(self, handle):
+        if handle is None:
+            return -1
+        slot = handle & SLOT_MASK
+        if slot >= len(self.generation) or self.generation[slot] != handle >> SLOT_BITS:
+            return -1
+        return self.slot_dense[slot]
+
+    def get(self, handle):
+        """The entity for handle, or None if it was removed (or never existed)."""
+        index = self._dense_index(handle)
+        return self.dense[index] if index >= 0 else None
+
+    def remove(self, handle):
+        index = self._dense_index(handle)
+        if index < 0:
+            return False  # Stale: already removed
+        slot = self.dense_slot[index]
+
+        # Move the last entity into the hole
+        last = len(self.dense) - 1
+        if index != last:
+            self.dense[index] = self.dense[last]
+            self.dense_slot[index] = self.dense_slot[last]
+            self.slot_dense[self.dense_slot[index]] = index
+        self.dense.pop()
+        self.dense_slot.pop()
+
+        self.slot_dense[slot] = -1
+        self.generation[slot] += 1
+        self.free.append(slot)
+        return True
+
+    def defer_remove(self, handle):
+        self.pending.append(handle)
+
+    def apply_removals(self):
+        for handle in self.pending:
+            self.remove(handle)  # Duplicates are harmless; the second is stale
+        self.pending.clear()
+
+    def clear(self):
+        # Every outstanding handle goes stale
+        for slot in self.dense_slot:
+            self.slot_dense[slot] = -1
+            self.generation[slot] += 1
+            self.free.append(slot)
+        self.dense.clear()
+        self.dense_slot.clear()
+        self.pending.clear()
+
+    def dense_indices(self, handles):
+        """Vectorized lookup: dense index per handle in a NumPy array, -1 where stale."""
+        import numpy as np  # Only the array-based systems (poacher waves) need this
+        handles = np.asarray(handles, dtype=np.int64)
+        slots = handles & SLOT_MASK
+        valid = (handles >= 0) & (slots < len(self.generation))
+        slots = np.where(valid, slots, 0)
+        generation = np.asarray(self.generation + [0], dtype=np.int64)[slots]
+        index = np.asarray(self.slot_dense + [-1], dtype=np.int64)[slots]
+        return np.where(valid & (generation == handles >> SLOT_BITS), index, -1)
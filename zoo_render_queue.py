@@ -0,0 +1,328 @@
+"""
+Render queue for the game's solid shapes.
+
+Draw code records shapes with the same calls it used to make on GL directly:
+push/pop, translate/rotate/scale, colour, and primitives such as spheres,
+cylinders and cubes. Recording only tracks the transform on a NumPy matrix
+stack and appends a draw item (pass, colour, mesh, matrix). flush() sorts the
+items by pass, colour and mesh, so each colour is set once per run of items
+that share it. Primitives that zoo_meshes has unit meshes for are instead
+grouped by mesh alone: a run of BATCH_MIN or more items of the same mesh in
+the same pass is one glDrawElements. The unit mesh is moved by every item's
+matrix at once with NumPy, each item's colour goes into a colour array, and
+the arrays are drawn under the camera. Any other item is drawn as a compiled
+unit mesh in a display list, loading its matrix directly. Meshes are unit
+sized and scaled by the item's matrix, so GL_NORMALIZE is on while the queue
+draws.
+
+The OVERLAY pass keeps submission order, because health bars are drawn on top
+of their backgrounds at the same depth. Batching keeps it too: a run's
+triangles are drawn in the order its items were submitted.
+
+`detail` scales the slices and stacks of curved primitives (spheres, cones,
+cylinders, discs) as they are recorded; the quality controller lowers it on
+slow machines. Each tessellation gets its own compiled mesh.
+
+packed() submits triangles that were built elsewhere (the species meshes of
+zoo_meshes); they are compiled into a display list like the primitives.
+"""
+import math
+
+import numpy as np
+from OpenGL.GL import *
+from OpenGL.GLU import *
+from OpenGL.GLUT import *
+
+OPAQUE = 0
+OVERLAY = 1
+ORDERED_PASSES = {OVERLAY}
+MIN_SLICES = 4
+MIN_STACKS = 2
+BATCH_MIN = 2  # Items in a run before it is drawn as one array draw
+BATCHED_KINDS = {"sphere", "cone", "cube", "cylinder", "cylinder_tip", "rect", "disc"}  # Have unit meshes
+
+
+def _translation(x, y, z):
+    m = np.identity(4)
+    m[:3, 3] = (x, y, z)
+    return m
+
+
+def _rotation(angle, x, y, z):
+    # Same matrix as glRotatef: angle in degrees about the axis (x, y, z)
+    length = math.sqrt(x * x + y * y + z * z)
+    if length == 0:
+        return np.identity(4)
+    x, y, z = x / length, y / length, z / length
+    c, s = math.cos(math.radians(angle)), math.sin(math.radians(angle))
+    t = 1 - c
+    m = np.identity(4)
+    m[:3, :3] = ((t * x * x + c, t * x * y - s * z, t * x * z + s * y),
+                 (t * x * y + s * z, t * y * y + c, t * y * z - s * x),
+                 (t * x * z - s * y, t * y * z + s * x, t * z * z + c))
+    return m
+
+
+def _scaling(x, y, z):
+    return np.diag((x, y, z, 1.0))
+
+
+class RenderQueue:
+    def __init__(self):
+        self.items = []  # (pass, colour, mesh key, 4x4 matrix)
+        self.stack = [np.identity(4)]
+        self.current_color = (1.0, 1.0, 1.0)
+        self.current_pass = OPAQUE
+        self.detail = 1.0  # Tessellation scale for curved primitives
+        self.meshes = {}  # Mesh key -> display list, compiled on first use
+        self.sources = {}  # Packed mesh key -> arrays, until compiled
+        self.unit_meshes = {}  # Mesh key -> (positions, normals, flat triangle indices) for batched runs
+        self.stats = {"items": 0, "draw_calls": 0, "batched_items": 0,
+                      "state_changes_submitted": 0, "state_changes_sorted": 0}
+
+    def begin(self):
+        self.items = []
+        self.stack = [np.identity(4)]
+        self.current_pass = OPAQUE
+
+    def include(self, other):
+        # Items recorded once elsewhere, e.g. static scenery
+        self.items.extend(other.items)
+
+    # Transform and state, mirroring the GL calls they replace
+
+    def push(self):
+        self.stack.append(self.stack[-1])
+
+    def pop(self):
+        self.stack.pop()
+
+    def translate(self, x, y, z):
+        self.stack[-1] = self.stack[-1] @ _translation(x, y, z)
+
+    def rotate(self, angle, x, y, z):
+        self.stack[-1] = self.stack[-1] @ _rotation(angle, x, y, z)
+
+    def scale(self, x, y, z):
+        self.stack[-1] = self.stack[-1] @ _scaling(x, y, z)
+
+    def multiply(self, matrix):
+        self.stack[-1] = self.stack[-1] @ matrix
+
+    def color(self, r, g, b):
+        self.current_color = (float(r), float(g), float(b))
+
+    def set_pass(self, render_pass):
+        self.current_pass = render_pass
+
+    # Primitives
+
+    def _lod(self, count, floor):
+        # Scaled slice/stack count; counts already at or below the floor are kept
+        if count <= floor or self.detail >= 1.0:
+            return count
+        return max(floor, round(count * self.detail))
+
+    def submit(self, mesh, matrix=None):
+        matrix = self.stack[-1] if matrix is None else matrix
+        self.items.append((self.current_pass, self.current_color, mesh, matrix))
+
+    def sphere(self, radius, slices, stacks):
+        slices, stacks = self._lod(slices, MIN_SLICES), self._lod(stacks, MIN_STACKS)
+        self.submit(("sphere", slices, stacks), self.stack[-1] @ _scaling(radius, radius, radius))
+
+    def wire_sphere(self, radius, slices, stacks):
+        slices, stacks = self._lod(slices, MIN_SLICES), self._lod(stacks, MIN_STACKS)
+        self.submit(("wire_sphere", slices, stacks), self.stack[-1] @ _scaling(radius, radius, radius))
+
+    def cone(self, base, height, slices, stacks):
+        slices, stacks = self._lod(slices, MIN_SLICES), self._lod(stacks, 1)
+        self.submit(("cone", slices, stacks), self.stack[-1] @ _scaling(base, base, height))
+
+    def cube(self, size):
+        self.submit(("cube",), self.stack[-1] @ _scaling(size, size, size))
+
+    def cylinder(self, base, top, height, slices, stacks):
+        # Unit cylinder with the top/base ratio baked in; scaled to size by the matrix
+        slices, stacks = self._lod(slices, MIN_SLICES), self._lod(stacks, 1)
+        if base > 0:
+            mesh = ("cylinder", round(top / base, 4), slices, stacks)
+            self.submit(mesh, self.stack[-1] @ _scaling(base, base, height))
+        else:
+            self.submit(("cylinder_tip", round(top, 4), slices, stacks), self.stack[-1] @ _scaling(1, 1, height))
+
+    def rect(self, x0, y0, x1, y1):
+        # Flat quad in the local XY plane, like the glBegin(GL_QUADS) health bars
+        self.submit(("rect",), self.stack[-1] @ _translation(x0, y0, 0) @ _scaling(x1 - x0, y1 - y0, 1))
+
+    def disc(self, radius, segments, z=0):
+        segments = self._lod(segments, MIN_SLICES * 2)
+        self.submit(("disc", segments), self.stack[-1] @ _translation(0, 0, z) @ _scaling(radius, radius, 1))
+
+    def packed(self, key, positions, normals, indices):
+        # Prebuilt triangles at their final size; key must name the data
+        mesh = ("packed", key)
+        if mesh not in self.meshes:
+            self.sources[mesh] = (positions, normals, indices)
+        self.submit(mesh)
+
+    # Execution
+
+    def _compile(self, mesh):
+        display_list = glGenLists(1)
+        glNewList(display_list, GL_COMPILE)
+        kind = mesh[0]
+        if kind == "sphere":
+            glutSolidSphere(1, mesh[1], mesh[2])
+        elif kind == "wire_sphere":
+            glutWireSphere(1, mesh[1], mesh[2])
+        elif kind == "cone":
+            glutSolidCone(1, 1, mesh[1], mesh[2])
+        elif kind == "cube":
+            glutSolidCube(1)
+        elif kind in ("cylinder", "cylinder_tip"):
+            quadric = gluNewQuadric()
+            base = 1 if kind == "cylinder" else 0
+            gluCylinder(quadric, base, mesh[1], 1, mesh[2], mesh[3])
+            gluDeleteQuadric(quadric)
+        elif kind == "rect":
+            glBegin(GL_QUADS)
+            glNormal3f(0, 0, 1)
+            glVertex3f(0, 0, 0)
+            glVertex3f(1, 0, 0)
+            glVertex3f(1, 1, 0)
+            glVertex3f(0, 1, 0)
+            glEnd()
+        elif kind == "disc":
+            glBegin(GL_POLYGON)
+            glNormal3f(0, 0, 1)
+            for j in range(mesh[1]):
+                angle = 2 * math.pi * j / mesh[1]
+                glVertex3f(math.cos(angle), math.sin(angle), 0)
+            glEnd()
+        elif kind == "packed":
+            # The arrays are copied into the display list here, so they can go afterwards
+            positions, normals, indices = self.sources.pop(mesh)
+            glEnableClientState(GL_VERTEX_ARRAY)
+            glEnableClientState(GL_NORMAL_ARRAY)
+            glVertexPointer(3, GL_FLOAT, 0, positions)
+            glNormalPointer(GL_FLOAT, 0, normals)
+            glDrawElements(GL_TRIANGLES, len(indices), GL_UNSIGNED_INT, np.ascontiguousarray(indices))
+            glDisableClientState(GL_NORMAL_ARRAY)
+            glDisableClientState(GL_VERTEX_ARRAY)
+        glEndList()
+        self.meshes[mesh] = display_list
+        return display_list
+
+    def _sorted(self):
+        # Stable sort; ordered passes keep their submission order within the pass. Meshes that
+        # can be batched are grouped by mesh alone, as a batch carries its colours per vertex.
+        def key(item):
+            render_pass, color, mesh, _ = item
+            if render_pass in ORDERED_PASSES:
+                return (render_pass,)
+            if mesh[0] in BATCHED_KINDS:
+                return (render_pass, 0, mesh)
+            return (render_pass, 1, color, mesh)
+        return sorted(self.items, key=key)
+
+    @staticmethod
+    def runs(items):
+        """(start, end, batched) over items in draw order; a batched run shares pass and mesh."""
+        start = 0
+        while start < len(items):
+            end = start + 1
+            if items[start][2][0] in BATCHED_KINDS:
+                render_pass, _, mesh, _ = items[start]
+                while end < len(items) and items[end][0] == render_pass and items[end][2] == mesh:
+                    end += 1
+            if end - start >= BATCH_MIN:
+                yield start, end, True
+            else:
+                for i in range(start, end):
+                    yield i, i + 1, False
+            start = end
+
+    def _batch(self, items):
+        """World-space positions, normals, colours and indices of a run of items sharing a mesh."""
+        mesh = items[0][2]
+        if mesh not in self.unit_meshes:
+            from zoo_meshes import unit_mesh  # zoo_meshes records through this module
+            p, n, t = unit_mesh(mesh)
+            self.unit_meshes[mesh] = (p, n, t.ravel())
+        p, n, t = self.unit_meshes[mesh]
+        models = np.array([item[3] for item in items])
+        linear = models[:, :3, :3]
+        positions = np.einsum("kij,vj->kvi", linear, p) + models[:, None, :3, 3]
+        # Cofactors: the inverse transpose up to scale, which GL_NORMALIZE takes out
+        cofactors = np.cross(linear[:, [1, 2, 0]], linear[:, [2, 0, 1]])
+        sign = np.where(np.einsum("ki,ki->k", linear[:, 0], cofactors[:, 0]) < 0, -1.0, 1.0)
+        normals = np.einsum("kij,vj->kvi", cofactors * sign[:, None, None], n)
+        colors = np.repeat(np.array([item[1] for item in items], dtype=np.float32), len(p), axis=0)
+        indices = (t + len(p) * np.arange(len(items))[:, None]).ravel()
+        return (positions.reshape(-1, 3).astype(np.float32), normals.reshape(-1, 3).astype(np.float32),
+                colors, indices.astype(np.uint32))
+
+    @staticmethod
+    def count_state_changes(items, runs=None):
+        # Colour/pass changes drawing items takes, one at a time unless runs are given;
+        # batched runs set their colours per vertex
+        changes, state = 0, None
+        for start, _, batched in runs if runs is not None else ((i, i + 1, False) for i in range(len(items))):
+            if batched:
+                state = None
+                continue
+            render_pass, color = items[start][:2]
+            if (render_pass, color) != state:
+                changes += 1
+                state = (render_pass, color)
+        return changes
+
+    def flush(self):
+        """Sorts and draws everything recorded since begin() under the current modelview."""
+        items = self._sorted()
+        runs = list(self.runs(items))
+        self.stats = {
+            "items": len(items),
+            "draw_calls": len(runs),
+            "batched_items": sum(end - start for start, end, batched in runs if batched),
+            "state_changes_submitted": self.count_state_changes(self.items),
+            "state_changes_sorted": self.count_state_changes(items, runs),
+        }
+        if not items:
+            return
+
+        # Camera * model for the unbatched items in one multiply (column-major for glLoadMatrixf)
+        view = np.asarray(glGetFloatv(GL_MODELVIEW_MATRIX), dtype=np.float64).reshape(4, 4)
+        camera = view.astype(np.float32)
+        single = [start for start, _, batched in runs if not batched]
+        models = np.array([items[i][3] for i in single]).reshape(-1, 4, 4)
+        loads = dict(zip(single, np.matmul(models.transpose(0, 2, 1), view).astype(np.float32)))
+
+        glEnable(GL_NORMALIZE)
+        color = None
+        for start, end, batched in runs:
+            if batched:
+                positions, normals, colors, indices = self._batch(items[start:end])
+                glLoadMatrixf(camera)
+                glEnableClientState(GL_VERTEX_ARRAY)
+                glEnableClientState(GL_NORMAL_ARRAY)
+                glEnableClientState(GL_COLOR_ARRAY)
+                glVertexPointer(3, GL_FLOAT, 0, positions)
+                glNormalPointer(GL_FLOAT, 0, normals)
+                glColorPointer(3, GL_FLOAT, 0, colors)
+                glDrawElements(GL_TRIANGLES, len(indices), GL_UNSIGNED_INT, indices)
+                glDisableClientState(GL_COLOR_ARRAY)
+                glDisableClientState(GL_NORMAL_ARRAY)
+                glDisableClientState(GL_VERTEX_ARRAY)
+                color = None  # The colour array leaves the current colour undefined
+                continue
+            _, item_color, mesh, _ = items[start]
+            if item_color != color:
+                glColor3f(*item_color)
+                color = item_color
+            display_list = self.meshes.get(mesh) or self._compile(mesh)
+            glLoadMatrixf(loads[start])
+            glCallList(display_list)
+        glLoadMatrixf(camera)
+        glDisable(GL_NORMALIZE)
@@ -0,0 +1,257 @@
+"""
+Rewind buffer: the last few seconds of the world, for scrubbing back through.
+
+record() takes the zoo_simthread Snapshot of every tick. Each entity kind
+(animals, poachers, darts, wave poachers) is flattened into a table: a dict of
+NumPy columns, one row per entity. Every KEYFRAME_INTERVAL frames the whole
+tables are kept as a keyframe. In between, a frame only keeps what changed
+since the previous frame. For each column, that is the indices of the rows that
+changed and their new values. If the rows themselves changed (an animal died,
+a poacher spawned), the kind's whole table is kept instead. The scalars
+(score, currency, player, FOOD_LEVEL, ...) are kept only when one of them
+changed, and game time once per frame.
+
+Frames live in segments of one keyframe and its deltas. Whole segments are
+dropped from the front once the newest segments alone cover `seconds`, so
+memory is bounded by the window and the keyframe interval. seek() copies the
+nearest keyframe at or before the frame and applies at most
+KEYFRAME_INTERVAL - 1 deltas to it. Moving one frame forward from the last
+seek applies a single delta.
+"""
+from collections import deque
+
+import numpy as np
+
+import zoo_sim as sim
+from zoo_simthread import AnimalView, DartView, PoacherView, Snapshot, WaveView
+
+SECONDS = 10.0
+RATE = 60  # Frames recorded per second
+KEYFRAME_INTERVAL = 60
+
+# Flag bits
+CAPTURED, DEAD, EATING, ACTIVE = 1, 2, 4, 8
+
+# Scalars in the order they are stored
+SCALARS = ("game_score", "currency", "game_paused", "game_over", "restart_timer", "player_pos",
+           "player_angle", "selected_animal", "starting_animals", "FOOD_LEVEL")
+
+
+def diff_table(old, new):
+    """What turns table old into table new: None, ("full", new) or ("rows", {column: (indices, values)})."""
+    if old is None or len(old["pos"]) != len(new["pos"]) or \
+            ("handle" in new and not np.array_equal(old["handle"], new["handle"])):
+        return ("full", new)
+    changes = {}
+    for name, column in new.items():
+        changed = column != old[name]
+        if changed.ndim > 1:
+            changed = changed.any(axis=1)
+        rows = np.flatnonzero(changed)
+        if len(rows) == len(column):
+            changes[name] = (None, column)
+        elif len(rows):
+            changes[name] = (rows.astype(np.int32), column[rows])
+    return ("rows", changes) if changes else None
+
+
+def apply_delta(table, delta):
+    # table is a working copy and is changed in place
+    if delta is None:
+        return table
+    kind, data = delta
+    if kind == "full":
+        return {name: column.copy() for name, column in data.items()}
+    for name, (rows, values) in data.items():
+        if rows is None:
+            table[name] = values.copy()
+        else:
+            table[name][rows] = values
+    return table
+
+
+class RewindBuffer:
+    def __init__(self, seconds=SECONDS, rate=RATE, keyframe_interval=KEYFRAME_INTERVAL):
+        self.capacity = max(1, int(seconds * rate))  # Frames that must stay seekable
+        self.keyframe_interval = keyframe_interval
+        self.segments = deque()  # [keyframe tables, keyframe scalars, frames]; frame = (tick, game_time, scalars, deltas)
+        self.frames = 0
+        self.last_tick = None  # Tick of the newest frame
+        self.type_names = []  # Animal type codes
+        self.last_tables = None
+        self.last_scalars = None
+        self.cursor = None  # Frame being shown while scrubbing; None when live
+        self.decoded = None  # (frame index, tables, scalars) from the last seek
+
+    def __len__(self):
+        return self.frames
+
+    def clear(self):
+        self.segments.clear()
+        self.frames = 0
+        self.last_tick = None
+        self.last_tables = self.last_scalars = None
+        self.cursor = self.decoded = None
+
+    # Recording
+
+    def _type_code(self, name):
+        if name not in self.type_names:
+            self.type_names.append(name)
+        return self.type_names.index(name)
+
+    def encode(self, snap):
+        animals = snap.animals
+        tables = {
+            "animals": {
+                "handle": np.array([a.handle for a in animals], dtype=np.int64),
+                "pos": np.array([a.pos for a in animals], dtype=np.float32).reshape(-1, 3),
+                "move_dir": np.array([a.move_dir for a in animals], dtype=np.float32).reshape(-1, 3),
+                "health": np.array([a.health for a in animals], dtype=np.float32),
+                "happiness": np.array([a.happiness for a in animals], dtype=np.float32),
+                "flags": np.array([CAPTURED * a.captured | DEAD * a.dead | EATING * a.is_eating
+                                   for a in animals], dtype=np.uint8),
+                "type": np.array([self._type_code(a.type) for a in animals], dtype=np.uint16),
+                "size": np.array([a.size for a in animals], dtype=np.float32),
+            },
+            "poachers": {
+                "pos": np.array([p.pos for p in snap.poachers], dtype=np.float32).reshape(-1, 3),
+                "flags": np.array([CAPTURED * p.captured | ACTIVE * p.active for p in snap.poachers],
+                                  dtype=np.uint8),
+            },
+            "darts": {
+                "pos": np.array([d.pos for d in snap.darts], dtype=np.float32).reshape(-1, 3),
+                "direction": np.array([d.direction for d in snap.darts], dtype=np.float32).reshape(-1, 3),
+            },
+        }
+        wave = snap.poacher_wave
+        if wave is not None:
+            tables["wave"] = {"pos": wave.pos[:wave.count].astype(np.float32),
+                              "active": wave.active[:wave.count].copy(),
+                              "captured": wave.captured[:wave.count].copy()}
+        scalars = (snap.game_score, snap.currency, snap.game_paused, snap.game_over, snap.restart_timer,
+                   tuple(snap.player_pos), snap.player_angle, snap.selected_animal, snap.starting_animals,
+                   tuple(sorted(snap.FOOD_LEVEL.items())))
+        return tables, scalars
+
+    def record(self, snap):
+        """Adds the world as of snapshot snap as the newest frame."""
+        tables, scalars = self.encode(snap)
+        if not self.segments or len(self.segments[-1][2]) >= self.keyframe_interval:
+            self.segments.append([tables, scalars, []])
+            deltas, changed = None, None
+        else:
+            previous = self.last_tables
+            deltas = {kind: diff_table(previous.get(kind), table) for kind, table in tables.items()}
+            deltas.update((kind, ("gone", None)) for kind in previous if kind not in tables)
+            changed = scalars if scalars != self.last_scalars else None
+        self.segments[-1][2].append((snap.tick, snap.game_time, changed, deltas))
+        self.frames += 1
+        self.last_tick = snap.tick
+        self.last_tables, self.last_scalars = tables, scalars
+
+        # Drop the oldest segment once the rest still hold `capacity` frames
+        while len(self.segments) > 1 and self.frames - len(self.segments[0][2]) >= self.capacity:
+            dropped = len(self.segments.popleft()[2])
+            self.frames -= dropped
+            if self.cursor is not None:
+                self.cursor = max(0, self.cursor - dropped)
+            self.decoded = None
+
+    # Seeking
+
+    def _locate(self, index):
+        for segment in self.segments:
+            if index < len(segment[2]):
+                return segment, index
+            index -= len(segment[2])
+        raise IndexError("frame out of range")
+
+    def seek(self, index):
+        """Snapshot of frame index (0 = oldest kept, len - 1 = newest)."""
+        segment, offset = self._locate(index)
+        keyframe, scalars, frames = segment
+        if self.decoded is not None and self.decoded[0] <= index and index - self.decoded[0] <= offset:
+            start, tables, scalars = self.decoded  # Same segment, earlier frame: carry on from it
+            start -= index - offset
+        else:
+            start = 0
+            tables = {kind: {name: column.copy() for name, column in table.items()}
+                      for kind, table in keyframe.items()}
+        for _, _, changed, deltas in frames[start + 1:offset + 1]:
+            for kind, delta in deltas.items():
+                if delta is not None and delta[0] == "gone":
+                    tables.pop(kind, None)
+                else:
+                    tables[kind] = apply_delta(tables.get(kind), delta)
+            if changed is not None:
+                scalars = changed
+        self.decoded = (index, tables, scalars)
+        tick, game_time = frames[offset][:2]
+        return self.decode(tick, game_time, tables, scalars)
+
+    def decode(self, tick, game_time, tables, scalars):
+        values = dict(zip(SCALARS, scalars))
+        a = tables["animals"]
+        flags = a["flags"].tolist()
+        animals = tuple(
+            AnimalView(handle, tuple(pos), self.type_names[kind], size, health, happiness,
+                       bool(f & CAPTURED), bool(f & DEAD), bool(f & EATING), tuple(move_dir))
+            for handle, pos, kind, size, health, happiness, f, move_dir in zip(
+                a["handle"].tolist(), a["pos"].tolist(), a["type"].tolist(), a["size"].tolist(),
+                a["health"].tolist(), a["happiness"].tolist(), flags, a["move_dir"].tolist()))
+        p = tables["poachers"]
+        poachers = tuple(PoacherView(tuple(pos), bool(f & ACTIVE), bool(f & CAPTURED))
+                         for pos, f in zip(p["pos"].tolist(), p["flags"].tolist()))
+        d = tables["darts"]
+        darts = tuple(DartView(tuple(pos), tuple(direction), True)
+                      for pos, direction in zip(d["pos"].tolist(), d["direction"].tolist()))
+        wave = tables.get("wave")
+        if wave is not None:
+            wave = WaveView(wave["pos"].copy(), wave["active"].copy(), wave["captured"].copy(), len(wave["pos"]))
+        return Snapshot(
+            tick=tick, animals=animals, poachers=poachers, darts=darts, poacher_wave=wave,
+            player_pos=values["player_pos"], player_angle=values["player_angle"],
+            selected_animal=values["selected_animal"], starting_animals=values["starting_animals"],
+            game_score=values["game_score"], currency=values["currency"], game_time=game_time,
+            game_paused=values["game_paused"], game_over=values["game_over"],
+            restart_timer=values["restart_timer"], FOOD_LEVEL=dict(values["FOOD_LEVEL"]),
+            habitats=sim.habitats, FEEDING_STATION_SIZE=sim.FEEDING_STATION_SIZE, terrain=sim.terrain,
+        )
+
+    # Scrubbing
+
+    def scrub(self, frames):
+        """Moves the cursor by frames (negative is back) and returns its Snapshot, or None once live again."""
+        if not self.frames:
+            return None
+        position = (self.frames if self.cursor is None else self.cursor) + frames
+        if position >= self.frames:
+            self.cursor = None
+            return None
+        self.cursor = max(0, position)
+        return self.seek(self.cursor)
+
+    def seconds_back(self):
+        """How far behind the newest frame the cursor is, in game time."""
+        if self.cursor is None:
+            return 0.0
+        newest = self.segments[-1][2][-1][1]
+        segment, offset = self._locate(self.cursor)
+        return newest - segment[2][offset][1]
+
+    def nbytes(self):
+        """Array bytes held (the Python objects around them are not counted)."""
+        total = 0
+        for keyframe, _, frames in self.segments:
+            total += sum(column.nbytes for table in keyframe.values() for column in table.values())
+            for _, _, _, deltas in frames:
+                for delta in (deltas or {}).values():
+                    if delta is None or delta[0] == "gone":
+                        continue
+                    if delta[0] == "full":
+                        total += sum(column.nbytes for column in delta[1].values())
+                    else:
+                        total += sum(values.nbytes + (0 if rows is None else rows.nbytes)
+                                     for rows, values in delta[1].values())
+        return total
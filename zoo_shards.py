@@ -0,0 +1,496 @@
+"""
+Habitat-sharded simulation across worker processes.
+
+Animals only touch their own habitat's food and feeding station, so each
+habitat (or group of habitats, with fewer workers) is stepped by its own
+process. Animal state lives in structure-of-arrays form in one
+multiprocessing.shared_memory block. Animals are sorted by habitat, so each
+shard owns a contiguous slice, and the coordinator and every worker map the
+same arrays without copying. Each animal has a species from the species data
+files, and its speeds, wander interval and hunger rate come from the same
+BehaviourTable that zoo_sim uses.
+
+Poachers and darts belong to the shard whose habitat is nearest to them. When
+one moves into another shard's territory it is passed on through that shard's
+inbox queue. A capture of an animal owned by another shard is passed on the
+same way. The coordinator only spawns poachers, fires darts, advances the
+clock and reads the shared arrays (e.g. to render). Ticks run in lock step on
+a barrier. Poachers chase animals in any shard, so whatever a shard reads of
+other shards' animals comes from seen_pos/seen_flags. Every worker copies its
+own slice into them after a tick, before the next tick can start, so nobody
+reads rows that are being written.
+
+Animals of herd species are steered by zoo_herding before moving (cohesion,
+alignment, separation, fleeing from the shard's poachers), one pass per
+habitat, unless herding is turned off.
+
+This is a headless mode for now: nothing in the GLUT front end draws a
+ShardedPark yet.
+
+    python zoo_shards.py --animals 1000000 --workers 4 --ticks 200 [--no-herding]
+"""
+import argparse
+import math
+import multiprocessing as mp
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import zoo_herding
+import zoo_sim as sim
+
+# Per-animal fields in the shared block
+ANIMAL_FIELDS = [
+    ("pos", np.float32, 2),
+    ("move_dir", np.float32, 2),
+    ("happiness", np.float32, 1),
+    ("health", np.float32, 1),
+    ("hunger_rate", np.float32, 1),
+    ("last_move_time", np.float64, 1),
+    ("last_happiness_decay", np.float64, 1),
+    ("last_food_check", np.float64, 1),
+    ("habitat_index", np.int8, 1),
+    ("species", np.int16, 1),  # Row of zoo_sim.behaviour
+    ("flags", np.uint8, 1),
+    ("seen_pos", np.float32, 2),  # pos and flags as of the start of the tick, for other shards
+    ("seen_flags", np.uint8, 1),
+]
+EATING, CAPTURED, DEAD = 1, 2, 4  # Bits in flags, as in the network snapshots
+FLEEING = 8
+
+# Fields that are not per animal; "shards" entries are sized by the worker count
+HEADER_FIELDS = [
+    ("clock", np.float64, 2),  # Current tick time, stop flag
+    ("food_level", np.int64, len(sim.habitats)),
+    ("shard_score", np.int64, "shards"),  # Score earned by darts in each shard
+    ("shard_poachers", np.int64, "shards"),  # Active poachers owned by each shard
+]
+
+HABITAT_CENTERS = np.array([h["center"][:2] for h in sim.habitats], dtype=np.float32)
+FEEDING_OFFSET = np.array([50, -50], dtype=np.float32)
+RETARGET_TRIES = 8  # Random picks per tick when a poacher looks for a new target
+TICK_TIMEOUT = 30  # Seconds the coordinator waits for a tick before giving up on the workers
+
+
+def _layout(count, shards):
+    # Byte offset, dtype and shape for every field, each aligned to 8 bytes
+    layout, offset = {}, 0
+    for name, dtype, width in HEADER_FIELDS:
+        width = shards if width == "shards" else width
+        shape = (width,)
+        layout[name] = (offset, dtype, shape)
+        offset += -(-np.dtype(dtype).itemsize * width // 8) * 8
+    for name, dtype, width in ANIMAL_FIELDS:
+        shape = (count, width) if width > 1 else (count,)
+        layout[name] = (offset, dtype, shape)
+        offset += -(-np.dtype(dtype).itemsize * width * count // 8) * 8
+    return layout, offset
+
+
+class SharedPark:
+    """NumPy views of the shared block; create=True allocates it, otherwise it is attached by name."""
+
+    def __init__(self, count, shards, name=None, create=False):
+        self.count = count
+        layout, size = _layout(count, shards)
+        self.shm = shared_memory.SharedMemory(name=name, create=create, size=size)
+        for field, (offset, dtype, shape) in layout.items():
+            setattr(self, field, np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=offset))
+
+    def close(self):
+        # Views must go before the mapping can be closed
+        for name, _, _ in HEADER_FIELDS + ANIMAL_FIELDS:
+            delattr(self, name)
+        self.shm.close()
+
+
+class Behaviour:
+    """zoo_sim.behaviour as NumPy arrays, indexed by the species field."""
+
+    def __init__(self, table):
+        for name in ("hunger_min", "hunger_max", "wander_speed", "flee_speed", "hungry_speed",
+                     "wander_interval", "herd"):
+            setattr(self, name, np.array(getattr(table, name), dtype=bool if name == "herd" else np.float32))
+        self.default = table.default
+
+
+def load_behaviour():
+    # Workers are spawned, so each process loads the species files itself
+    if not sim.animal_types:
+        sim.load_species()
+    return Behaviour(sim.behaviour)
+
+
+def populate(park, rng, behaviour):
+    """Spreads the animals evenly over the habitats, sorted by habitat, with species of that habitat."""
+    n, h = park.count, len(sim.habitats)
+    habitat = np.repeat(np.arange(h), [n // h + (i < n % h) for i in range(h)])
+    park.habitat_index[:] = habitat
+    species = np.full(n, behaviour.default, dtype=np.int16)
+    for i in range(h):
+        choices = [number for number, t in enumerate(sim.animal_types) if t["habitat_index"] == i]
+        if choices:
+            species[habitat == i] = rng.choice(choices, int(np.count_nonzero(habitat == i)))
+    park.species[:] = species
+    park.pos[:] = HABITAT_CENTERS[habitat] + rng.uniform(-150, 150, (n, 2))
+    direction = rng.uniform(-1, 1, (n, 2))
+    park.move_dir[:] = direction / np.maximum(np.linalg.norm(direction, axis=1), 1e-9)[:, None]
+    park.happiness[:] = 100
+    park.health[:] = 100
+    park.hunger_rate[:] = rng.uniform(behaviour.hunger_min[species], behaviour.hunger_max[species])
+    now = time.time()
+    park.last_move_time[:] = now
+    park.last_happiness_decay[:] = now
+    park.last_food_check[:] = now
+    park.flags[:] = 0
+    park.seen_pos[:] = park.pos
+    park.seen_flags[:] = 0
+    park.food_level[:] = 0
+
+
+def habitat_of(x, y):
+    return int(np.argmin(np.hypot(HABITAT_CENTERS[:, 0] - x, HABITAT_CENTERS[:, 1] - y)))
+
+
+def step_animals(park, lo, hi, now, rng, behaviour):
+    """Animal.update for animals [lo, hi), vectorized, with each animal's species parameters.
+
+    Movement is applied as masked arithmetic over the whole slice rather than
+    through boolean fancy indexing, which would copy every selected row.
+    """
+    pos, move_dir = park.pos[lo:hi], park.move_dir[lo:hi]
+    happiness, health = park.happiness[lo:hi], park.health[lo:hi]
+    flags, habitat = park.flags[lo:hi], park.habitat_index[lo:hi]
+    food = park.food_level
+    species = park.species[lo:hi]
+
+    live = (flags & (CAPTURED | DEAD)) == 0
+    flags &= ~np.uint8(EATING)
+    center = HABITAT_CENTERS[habitat]
+    fleeing = (flags & FLEEING) != 0
+    hungry = live & (happiness < 70) & ~fleeing
+    if food.any():
+        hungry &= food[habitat] > 0
+    else:
+        hungry[:] = False
+
+    if hungry.any():
+        # Hungry animals head for their feeding station and eat when there
+        to_food = center + FEEDING_OFFSET - pos
+        food_dist = np.hypot(to_food[:, 0], to_food[:, 1])
+        eating = hungry & (food_dist < 30)
+        flags[eating] |= EATING
+        ready = np.nonzero(eating & (now - park.last_food_check[lo:hi] > 5))[0]
+        for h in np.unique(habitat[ready]):
+            # Food is handed out one unit per animal until the trough is empty
+            eaters = ready[habitat[ready] == h][:max(0, int(food[h]))]
+            happiness[eaters] = np.minimum(100, happiness[eaters] + 20)
+            health[eaters] = np.minimum(100, health[eaters] + 15)
+            park.last_food_check[lo:hi][eaters] = now
+            food[h] -= len(eaters)
+        walking = (hungry & ~eating & (food_dist > 0))[:, None]
+        np.copyto(move_dir, to_food / np.maximum(food_dist, 1e-9)[:, None], where=walking)
+        pos += move_dir * (walking * behaviour.hungry_speed[species][:, None])
+
+    # Everyone else wanders, changing direction every wander_interval seconds
+    wander = live & ~hungry
+    turn = np.nonzero(wander & (now - park.last_move_time[lo:hi] > behaviour.wander_interval[species]))[0]
+    if len(turn):
+        direction = rng.uniform(-1, 1, (len(turn), 2)).astype(np.float32)
+        move_dir[turn] = direction / np.maximum(np.linalg.norm(direction, axis=1), 1e-9)[:, None]
+        park.last_move_time[lo:hi][turn] = now
+    to_center = center - pos
+    center_dist = np.hypot(to_center[:, 0], to_center[:, 1])
+    inside = wander & (center_dist < 180)
+    outside = wander & ~inside
+    speed = np.where(fleeing, behaviour.flee_speed[species], behaviour.wander_speed[species])
+    pos += move_dir * (inside * speed)[:, None]
+    pos += to_center * (outside * (2 / np.maximum(center_dist, 1e-9)))[:, None]
+
+    # Happiness and health decay every 10 seconds
+    decay = np.nonzero(live & (now - park.last_happiness_decay[lo:hi] > 10))[0]
+    if len(decay):
+        happiness[decay] = np.maximum(0, happiness[decay] - 3)
+        factor = np.where(happiness[decay] < 30, 4, np.where(happiness[decay] < 60, 2, 1))
+        health[decay] = np.maximum(0, health[decay] - park.hunger_rate[lo:hi][decay] * factor)
+        park.last_happiness_decay[lo:hi][decay] = now
+        flags[decay[health[decay] <= 0]] |= DEAD
+
+
+class Shard:
+    """One worker's share of the park: a range of animals plus the poachers and darts on its ground."""
+
+    def __init__(self, index, park, habitats, inboxes, seed, herding=True, behaviour=None):
+        self.index = index
+        self.park = park
+        self.behaviour = behaviour or load_behaviour()
+        self.habitats = habitats
+        self.inboxes = inboxes
+        self.owner = {}  # Habitat -> shard, filled by run_shard
+        in_shard = np.isin(park.habitat_index, habitats)
+        members = np.nonzero(in_shard)[0]
+        self.lo, self.hi = (int(members[0]), int(members[-1]) + 1) if len(members) else (0, 0)
+        self.herding = herding
+        self.ranges = []  # (lo, hi) per habitat; animals are sorted by habitat
+        for h in habitats:
+            members = np.nonzero(park.habitat_index == h)[0]
+            if len(members):
+                self.ranges.append((int(members[0]), int(members[-1]) + 1))
+        self.poachers = []  # [x, y, target, next_steer]
+        self.darts = []  # [x, y, z, dx, dy, dz, expires]
+        self.rng = np.random.default_rng(seed)
+
+    def owner_of(self, x, y):
+        return self.owner[habitat_of(x, y)]
+
+    def send(self, shard, message):
+        if shard == self.index:
+            self.receive(message)
+        else:
+            self.inboxes[shard].put(message)
+
+    def receive(self, message):
+        kind, payload = message
+        if kind == "poacher":
+            self.poachers.append(list(payload))
+        elif kind == "dart":
+            self.darts.append(list(payload))
+        elif kind == "capture":
+            self.park.flags[payload] |= CAPTURED
+        elif kind == "food":
+            self.park.food_level[payload[0]] += payload[1]
+
+    def drain_inbox(self):
+        inbox = self.inboxes[self.index]
+        while True:
+            try:
+                self.receive(inbox.get_nowait())
+            except queue.Empty:
+                return
+
+    def tick(self, now):
+        self.drain_inbox()
+        if self.herding:
+            self.step_herding()
+        step_animals(self.park, self.lo, self.hi, now, self.rng, self.behaviour)
+        self.step_poachers(now)
+        self.step_darts(now)
+        self.park.shard_poachers[self.index] = len(self.poachers)
+
+    def publish(self):
+        # Only between ticks: other shards read these while they step
+        park = self.park
+        park.seen_pos[self.lo:self.hi] = park.pos[self.lo:self.hi]
+        park.seen_flags[self.lo:self.hi] = park.flags[self.lo:self.hi]
+
+    def step_herding(self):
+        # One herding pass per habitat; habitats are far enough apart not to see each other
+        park = self.park
+        threats = [poacher[:2] for poacher in self.poachers]
+        for lo, hi in self.ranges:
+            flags = park.flags[lo:hi]
+            flags &= ~np.uint8(FLEEING)
+            herd = self.behaviour.herd[park.species[lo:hi]]
+            live = np.nonzero(((flags & (CAPTURED | DEAD)) == 0) & herd)[0]
+            if not len(live):
+                continue
+            headings, fleeing = zoo_herding.steer(park.pos[lo:hi][live], park.move_dir[lo:hi][live], threats)
+            park.move_dir[lo:hi][live] = headings
+            flags[live[fleeing]] |= FLEEING
+
+    def capture(self, animal):
+        owner = self.owner[int(self.park.habitat_index[animal])]
+        if owner == self.index:
+            self.park.flags[animal] |= CAPTURED
+        else:
+            self.send(owner, ("capture", animal))
+
+    def random_target(self):
+        # Sampling beats scanning a million flags; give up for this tick if unlucky
+        flags = self.park.seen_flags
+        for animal in self.rng.integers(0, self.park.count, RETARGET_TRIES):
+            if flags[animal] & (CAPTURED | DEAD) == 0:
+                return int(animal)
+        return -1
+
+    def step_poachers(self, now):
+        # Poacher.update: re-aim every 2 seconds with jitter, capture within 20 units
+        park = self.park
+        staying = []
+        for poacher in self.poachers:
+            x, y, target, next_steer = poacher
+            if target < 0 or park.seen_flags[target] & (CAPTURED | DEAD):
+                poacher[2] = self.random_target()
+                staying.append(poacher)
+                continue
+            if now < next_steer:
+                staying.append(poacher)
+                continue
+            poacher[3] = now + 2
+            dx, dy = float(park.seen_pos[target, 0]) - x, float(park.seen_pos[target, 1]) - y
+            length = math.hypot(dx, dy)
+            if length < 20:
+                self.capture(target)
+                continue  # The poacher leaves with the animal
+            if length > 0:
+                dx = dx / length + self.rng.uniform(-0.3, 0.3)
+                dy = dy / length + self.rng.uniform(-0.3, 0.3)
+                length = math.hypot(dx, dy) or 1
+                poacher[0] = x + dx / length * 10
+                poacher[1] = y + dy / length * 10
+            owner = self.owner_of(poacher[0], poacher[1])
+            if owner == self.index:
+                staying.append(poacher)
+            else:
+                self.send(owner, ("poacher", poacher))
+        self.poachers = staying
+
+    def step_darts(self, now):
+        staying = []
+        for dart in self.darts:
+            dart[0] += dart[3] * 15
+            dart[1] += dart[4] * 15
+            dart[2] += dart[5] * 15
+            if now > dart[6]:
+                continue
+            hit = None
+            for i, poacher in enumerate(self.poachers):
+                if math.hypot(dart[0] - poacher[0], dart[1] - poacher[1]) < 30:
+                    hit = i
+                    break
+            if hit is not None:
+                del self.poachers[hit]  # Tranquilized poachers are taken away
+                self.park.shard_score[self.index] += 100
+                continue
+            owner = self.owner_of(dart[0], dart[1])
+            if owner == self.index:
+                staying.append(dart)
+            else:
+                self.send(owner, ("dart", dart))
+        self.darts = staying
+
+
+def run_shard(index, name, count, shards, habitats, owner, inboxes, barrier, seed, herding):
+    park = SharedPark(count, shards, name)
+    shard = Shard(index, park, habitats, inboxes, seed, herding)
+    shard.owner = owner
+    try:
+        while True:
+            barrier.wait()  # Tick start
+            if park.clock[1]:
+                break
+            shard.tick(float(park.clock[0]))
+            barrier.wait()  # Tick done
+            shard.publish()  # Everyone does this before anyone passes the next tick start
+    finally:
+        del shard
+        park.close()
+
+
+class ShardedPark:
+    """Coordinator: owns the shared block, the worker processes and the tick barrier."""
+
+    def __init__(self, count, workers=4, seed=None, herding=True):
+        workers = max(1, min(workers, len(sim.habitats)))
+        self.park = SharedPark(count, workers, create=True)
+        populate(self.park, np.random.default_rng(seed), load_behaviour())
+        self.rng = np.random.default_rng(None if seed is None else seed + 1000)
+        self.groups = [list(range(w, len(sim.habitats), workers)) for w in range(workers)]
+        self.owner = {h: w for w, group in enumerate(self.groups) for h in group}
+
+        context = mp.get_context("spawn")
+        self.inboxes = [context.Queue() for _ in range(workers)]
+        self.barrier = context.Barrier(workers + 1)
+        self.workers = [
+            context.Process(target=run_shard, name=f"zoo-shard-{w}", daemon=True,
+                            args=(w, self.park.shm.name, count, workers, group, self.owner, self.inboxes,
+                                  self.barrier, None if seed is None else seed + w, herding))
+            for w, group in enumerate(self.groups)]
+        for worker in self.workers:
+            worker.start()
+        self.ticks = 0
+
+    def owner_of(self, x, y):
+        return self.owner[habitat_of(x, y)]
+
+    def spawn_poacher(self, now):
+        # At a random point on the map edge, as in update_game
+        edge = sim.GRID_LENGTH
+        side = self.rng.integers(0, 4)
+        along = self.rng.uniform(-edge, edge)
+        x, y = [(along, edge), (edge, along), (along, -edge), (-edge, along)][side]
+        self.inboxes[self.owner_of(x, y)].put(("poacher", (x, y, -1, now)))
+
+    def fire_dart(self, pos, direction, now):
+        self.inboxes[self.owner_of(pos[0], pos[1])].put(("dart", (*pos, *direction, now + 5)))
+
+    def add_food(self, habitat, units=5):
+        self.inboxes[self.owner[habitat]].put(("food", (habitat, units)))
+
+    def step(self, now=None):
+        self.park.clock[0] = time.time() if now is None else now
+        # A dead worker breaks the barrier (BrokenBarrierError) instead of hanging the game
+        self.barrier.wait(TICK_TIMEOUT)  # Workers step their shards...
+        self.barrier.wait(TICK_TIMEOUT)  # ...and are done; the shared arrays are consistent until the next step
+        self.ticks += 1
+
+    def stats(self):
+        flags = self.park.flags
+        return {
+            "alive": int(np.count_nonzero((flags & (CAPTURED | DEAD)) == 0)),
+            "captured": int(np.count_nonzero(flags & CAPTURED)),
+            "dead": int(np.count_nonzero(flags & DEAD)),
+            "poachers": int(self.park.shard_poachers.sum()),
+            "score": int(self.park.shard_score.sum()),
+        }
+
+    def close(self):
+        self.park.clock[1] = 1
+        try:
+            self.barrier.wait(TICK_TIMEOUT)  # Releases the workers into their stop check
+        except threading.BrokenBarrierError:
+            pass  # A worker died; the rest are stopped below
+        finally:
+            for worker in self.workers:
+                worker.join(5)
+                if worker.is_alive():
+                    worker.terminate()
+                    worker.join(1)
+            self.park.close()
+            self.park.shm.unlink()
+
+
+def benchmark(count, workers, ticks, seed=0, herding=True):
+    park = ShardedPark(count, workers, seed, herding)
+    try:
+        now = time.time()
+        for i in range(50):
+            park.spawn_poacher(now)
+        start = time.perf_counter()
+        for i in range(ticks):
+            now += 1 / 60
+            park.step(now)
+        elapsed = time.perf_counter() - start
+    finally:
+        stats = park.stats()
+        park.close()
+    print(f"{count} animals, {workers} worker(s){'' if herding else ', no herding'}: {elapsed / ticks * 1000:.2f} ms/tick, "
+          f"{count * ticks / elapsed / 1e6:.1f}M animal-updates/s  {stats}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the habitat-sharded simulation headless")
+    parser.add_argument("--animals", type=int, default=1000000)
+    parser.add_argument("--workers", type=int, default=mp.cpu_count())
+    parser.add_argument("--ticks", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-herding", dest="herding", action="store_false", help="animals wander independently")
+    args = parser.parse_args()
+    benchmark(args.animals, args.workers, args.ticks, args.seed, args.herding)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,702 @@
+"""
+Zoo Defender simulation: world state, entities and game rules.
+
+This module has no OpenGL dependency and no import-time side effects. The
+world (animals, feeding stations, timers) is built by init_world(), which the
+GLUT front end calls from main(). Tools and tests can import it cheaply and
+drive update_game() and the player actions directly.
+
+The globals named in WORLD_STATE make up one world; everything else (habitats,
+species, terrain, constants) is shared. zoo_host runs several worlds in one
+process by swapping their WORLD_STATE values in and out of this module.
+"""
+import copy
+import math
+import random
+import time
+
+from zoo_registry import Registry
+import zoo_species
+
+GRID_LENGTH = 600  # Poachers spawn on the edges of this square
+
+# Time source for the simulation; tools that run simulated time (zoo_soak) replace it
+clock = time.time
+
+# Game state
+game_score = 0
+currency = 1000  # Starting currency
+game_time = 0
+game_paused = False
+game_over = False
+restart_timer = None
+last_time = 0
+
+# Player-related variables
+player_pos = [0, 0, 30]  # x, y, z position
+player_angle = 0
+player_speed = 10
+interaction_range = 100  # Range for animal interaction
+shoot_cooldown = 0
+selected_animal = None  # Handle into animal_registry
+feed_cost = 50
+ranger_positions = None  # Every player's position when several share the world (zoo_net)
+
+# Visual effects hook: the front end points this at its particle system
+effect_sink = None
+
+# Called after reset_game() replaces the world
+reset_listeners = []
+
+# Gameplay event hook (see zoo_events): called as
+# event_sink(kind, time, game_time, x, y, habitat, species, value)
+event_sink = None
+
+def emit_effect(effect, pos):
+    if effect_sink is not None:
+        effect_sink(effect, (pos[0], pos[1], pos[2]))
+
+def log_event(kind, pos=(0, 0), habitat=-1, species=-1, value=0):
+    if event_sink is not None:
+        event_sink(kind, clock(), game_time, pos[0], pos[1], habitat, species, value)
+
+# Heightfield terrain; stays None (flat ground) until load_terrain() is called
+terrain = None
+
+def load_terrain():
+    global terrain
+    import zoo_terrain  # NumPy-backed; only loaded when terrain is wanted
+    terrain = zoo_terrain.load_heightfield()
+
+def ground_offset(x, y):
+    # How far the ground at (x, y) sits above the old flat ground plane
+    if terrain is None:
+        return 0
+    return terrain.height_at(x, y) - terrain.ground_z
+
+def ground_offsets(xs, ys):
+    # ground_offset() for arrays of positions
+    if terrain is None:
+        return 0
+    return terrain.heights_at(xs, ys) - terrain.ground_z
+
+# Animals
+class Animal:
+    def __init__(self, pos, type_name, habitat_color, size):
+        self.pos = list(pos)
+        self.type = type_name
+        self.species = behaviour.number(type_name)
+        self.habitat_color = habitat_color
+        self.size = size
+        self.happiness = 100
+        self.health = 100
+        self.last_move_time = clock()
+        self.move_dir = [random.uniform(-1, 1), random.uniform(-1, 1), 0]
+        self.normalize_dir()
+        self.captured = False
+        self.last_happiness_decay = clock()
+        self.is_eating = False
+        self.habitat_index = None  # Will be set when creating the animal
+        self.last_food_check = clock()
+        self.last_food_check = clock()
+        self.hunger_rate = random.uniform(behaviour.hunger_min[self.species],
+                                          behaviour.hunger_max[self.species])  # Different hunger rates for animals
+        self.dead = False
+        self.fleeing = False  # Set by update_herding() when poachers are close
+    def normalize_dir(self):
+        length = math.sqrt(self.move_dir[0]**2 + self.move_dir[1]**2)
+        if length > 0:
+            self.move_dir[0] /= length
+            self.move_dir[1] /= length
+    
+    def update(self, current_time):
+        if self.dead or self.captured:
+            return
+            
+        # Move randomly or go to feeding station if hungry (unless running from poachers)
+        if self.happiness < 70 and FOOD_LEVEL[self.habitat_index] > 0 and not self.fleeing:
+            # Calculate direction to feeding station
+            habitat = habitats[self.habitat_index]
+            feeding_x = habitat["center"][0] + 50  # Feeding station offset
+            feeding_y = habitat["center"][1] - 50
+            
+            dir_to_food = [feeding_x - self.pos[0], feeding_y - self.pos[1]]
+            food_dist = math.sqrt(dir_to_food[0]**2 + dir_to_food[1]**2)
+            
+            if food_dist < 30:  # Close enough to eat - increased range
+                self.is_eating = True
+                # Check if we can consume food every 5 seconds
+                if current_time - self.last_food_check > 5 and FOOD_LEVEL[self.habitat_index] > 0:
+                    self.happiness = min(100, self.happiness + 20)
+                    self.health = min(100, self.health + 15)
+                    FOOD_LEVEL[self.habitat_index] -= 1  # Consume food
+                    self.last_food_check = current_time
+                    emit_effect("feed", self.pos)
+                    log_event("eat", self.pos, self.habitat_index, self.species, FOOD_LEVEL[self.habitat_index])
+            else:
+                # Move toward feeding station
+                self.is_eating = False
+                if food_dist > 0:
+                    self.move_dir[0] = dir_to_food[0] / food_dist
+                    self.move_dir[1] = dir_to_food[1] / food_dist
+                    speed = behaviour.hungry_speed[self.species]  # Move faster when hungry
+                    self.pos[0] += self.move_dir[0] * speed
+                    self.pos[1] += self.move_dir[1] * speed
+        else:
+            self.is_eating = False
+            # Normal random movement
+            if current_time - self.last_move_time > behaviour.wander_interval[self.species]:
+                self.move_dir = [random.uniform(-1, 1), random.uniform(-1, 1), 0]
+                self.normalize_dir()
+                self.last_move_time = current_time
+            
+            # Stay within habitat bounds (radius 200 from habitat center)
+            dist_from_habitat = math.sqrt((self.pos[0] - self.habitat_pos[0])**2 + 
+                                         (self.pos[1] - self.habitat_pos[1])**2)
+            
+            if dist_from_habitat < 180:  # Normal movement inside habitat
+                speed = (behaviour.flee_speed if self.fleeing else behaviour.wander_speed)[self.species]
+                self.pos[0] += self.move_dir[0] * speed
+                self.pos[1] += self.move_dir[1] * speed
+            else:  # Move back toward habitat center
+                dir_to_center = [self.habitat_pos[0] - self.pos[0], 
+                                self.habitat_pos[1] - self.pos[1]]
+                length = math.sqrt(dir_to_center[0]**2 + dir_to_center[1]**2)
+                if length > 0:
+                    dir_to_center[0] /= length
+                    dir_to_center[1] /= length
+                self.pos[0] += dir_to_center[0] * 2
+                self.pos[1] += dir_to_center[1] * 2
+        
+        # Happiness and health decay over time - more significant impact of hunger
+        if current_time - self.last_happiness_decay > 10:  # Every 10 seconds
+            self.happiness = max(0, self.happiness - 3)  # Faster happiness decay
+            
+            # Health decay based on happiness level
+            if self.happiness < 30:
+                self.health = max(0, self.health - self.hunger_rate * 4)  # Severe health impact
+            elif self.happiness < 60:
+                self.health = max(0, self.health - self.hunger_rate * 2)  # Moderate health impact
+            else:
+                # Minor health decay even when happy, to ensure feeding is needed
+                self.health = max(0, self.health - self.hunger_rate)
+                
+            self.last_happiness_decay = current_time
+            
+        # Follow the terrain
+        self.pos[2] = 20 + ground_offset(self.pos[0], self.pos[1])
+        
+        # Check if animal has died from starvation
+        if self.health <= 0:
+            global animals_dead
+            self.dead = True
+            animals_dead += 1
+            animal_registry.defer_remove(self.handle)
+            emit_effect("death", self.pos)
+            log_event("starve", self.pos, self.habitat_index, self.species)
+    
+    def feed(self):
+        # Old direct feeding method (still used for backward compatibility)
+        self.happiness = min(100, self.happiness + 30)
+        self.health = min(100, self.health + 20)
+        
+    def get_color(self):
+        # Health-based color (red component increases as health decreases)
+        r = 1.0 - (self.health / 100) * 0.8
+        g = (self.health / 100) * 0.8
+        b = 0.2
+        return (r, g, b)
+# Initialize animal habitats and animals
+# Update habitats to rename Desert to Farm
+habitats = [
+    {"center": (-400, 400, 0), "color": (0.2, 0.7, 0.2), "name": "Savannah"},
+    {"center": (400, 400, 0), "color": (0.2, 0.2, 0.7), "name": "Arctic"},
+    {"center": (-400, -400, 0), "color": (0.7, 0.5, 0.2), "name": "Farm"},  # Changed from Desert
+    {"center": (400, -400, 0), "color": (0.1, 0.5, 0.1), "name": "Jungle"}
+]
+FEEDING_STATION_SIZE = 40
+FOOD_LEVEL = {}  # Filled by reset_game(), one entry per habitat
+
+# Species come from the data files in species/ (see zoo_species); load_species() fills these
+animal_types = []
+behaviour = zoo_species.BehaviourTable([])  # Per-species parameters, indexed by Animal.species
+
+def load_species(directory=zoo_species.SPECIES_DIR):
+    global behaviour
+    animal_types[:] = zoo_species.load_species(directory, habitats)
+    behaviour = zoo_species.BehaviourTable(animal_types)
+
+# Animals are created by reset_game() (see init_world). Dead and captured
+# animals are removed, so `animals` only holds live ones.
+animal_registry = Registry()
+animals = animal_registry.dense
+starting_animals = 0
+animals_dead = 0  # Counted since the last reset, for telemetry
+animals_captured = 0
+# Poachers
+class Poacher:
+    def __init__(self, pos, target):
+        self.pos = list(pos)
+        self.target = target  # Animal handle
+        self.speed = 10
+        self.captured = False
+        self.active = True
+        self.direction_change_time = clock()
+        
+    def update(self):
+        if not self.active or self.captured:
+            return
+        
+        current_time = clock()
+        
+        # Move towards target animal
+        target_animal = animal_registry.get(self.target)
+        if target_animal and not target_animal.captured and not target_animal.dead:
+            # Change direction less frequently for slower, more predictable movement
+            if current_time - self.direction_change_time > 2:
+                dir_x = target_animal.pos[0] - self.pos[0]
+                dir_y = target_animal.pos[1] - self.pos[1]
+                length = math.sqrt(dir_x**2 + dir_y**2)
+                
+                if length < 20:  # Captured animal
+                    capture_animal(target_animal)
+                    self.active = False
+                    poacher_registry.defer_remove(self.handle)
+                elif length > 0:
+                    dir_x /= length
+                    dir_y /= length
+                    
+                    # Route around the player and recent darts, through fence cover
+                    if influence is not None:
+                        dir_x, dir_y = influence.steer_one(self.pos[0], self.pos[1], dir_x, dir_y)
+                    
+                    # Add some randomness to movement for less direct pathing
+                    dir_x += random.uniform(-0.3, 0.3)
+                    dir_y += random.uniform(-0.3, 0.3)
+                    
+                    # Re-normalize
+                    new_length = math.sqrt(dir_x**2 + dir_y**2)
+                    if new_length > 0:
+                        dir_x /= new_length
+                        dir_y /= new_length
+                    
+                    # Update position
+                    self.pos[0] += dir_x * self.speed
+                    self.pos[1] += dir_y * self.speed
+                    self.pos[2] = 30 + ground_offset(self.pos[0], self.pos[1])
+                    
+                self.direction_change_time = current_time
+        else:
+            # Find a new target if the current one is captured or dead
+            valid_targets = [a for a in animals if not a.captured and not a.dead]
+            if valid_targets:
+                choices = random.sample(valid_targets, min(RETARGET_CHOICES, len(valid_targets)))
+                if influence is not None:
+                    # Of a few random picks, go for the one among the most animals
+                    density = influence.density([a.pos[0] for a in choices], [a.pos[1] for a in choices])
+                    self.target = choices[int(density.argmax())].handle
+                else:
+                    self.target = choices[0].handle
+            else:
+                self.active = False  # No more targets available
+                poacher_registry.defer_remove(self.handle)
+
+def capture_animal(animal):
+    global animals_captured
+    animal.captured = True
+    animals_captured += 1
+    animal_registry.defer_remove(animal.handle)
+    emit_effect("capture", animal.pos)
+    log_event("capture", animal.pos, animal.habitat_index, animal.species)
+
+poacher_registry = Registry()
+poachers = poacher_registry.dense
+RETARGET_CHOICES = 3
+
+# Influence map (zoo_influence) that poachers steer by; created on the first tick.
+# It changes over seconds, so it is updated INFLUENCE_RATE times a second with
+# the time gathered since the last update.
+INFLUENCE_RATE = 10  # Updates per second
+influence = None
+influence_elapsed = 0.0
+
+def update_influence(dt):
+    global influence, influence_elapsed
+    if influence is None:
+        import zoo_influence  # NumPy-backed, like the waves
+        influence = zoo_influence.InfluenceMap(habitats)
+    influence_elapsed += dt
+    if influence_elapsed < 1 / INFLUENCE_RATE:
+        return
+    players = [player_pos] if ranger_positions is None else ranger_positions
+    influence.update(influence_elapsed, players, [d.pos for d in darts if d.active],
+                     [a.pos for a in animals])
+    influence_elapsed = 0.0
+
+last_poacher_spawn_time = 0
+poacher_spawn_interval = 15  # Spawn a poacher every 15 seconds
+
+# Poacher waves: many poachers in NumPy arrays (zoo_waves), started with the V key
+poacher_wave = None
+WAVE_SIZE = 1000
+
+def start_wave(count=WAVE_SIZE):
+    global poacher_wave
+    if poacher_wave is None:
+        import zoo_waves  # NumPy is only loaded once a wave is launched
+        poacher_wave = zoo_waves.PoacherWave(count)
+    poacher_wave.spawn(count, clock(), GRID_LENGTH)
+    log_event("spawn_poacher", value=count)
+    if terrain is not None:
+        new = slice(poacher_wave.count - count, poacher_wave.count)
+        poacher_wave.pos[new, 2] = wave_ground(poacher_wave.pos[new, 0], poacher_wave.pos[new, 1])
+
+def wave_ground(xs, ys):
+    return 30 + ground_offsets(xs, ys)
+
+def update_wave(current_time):
+    import numpy as np
+    animal_pos = np.array([a.pos[:2] for a in animals], dtype=np.float64).reshape(-1, 2)
+    animal_ok = np.array([not a.captured and not a.dead for a in animals], dtype=bool)
+    animal_handles = np.array([a.handle for a in animals], dtype=np.int64)
+    ground = wave_ground if terrain is not None else None
+    captured = poacher_wave.update(current_time, animal_pos, animal_ok, animal_handles,
+                                   animal_registry.dense_indices, ground, influence)
+    for index in captured:
+        capture_animal(animals[index])
+
+# Herd species steer together and run from poachers (zoo_herding). Headings only
+# drift between passes, so the pass runs at HERDING_RATE and turns by as much as
+# the ticks it covers would have.
+HERDING_RATE = 10  # Passes per second
+HERDING_TUNED_RATE = 60  # Ticks per second zoo_herding.TURN_RATE is tuned for
+last_herding = 0
+
+def update_herding(current_time):
+    global last_herding
+    elapsed = current_time - last_herding
+    if elapsed < 1 / HERDING_RATE:
+        return
+    last_herding = current_time
+    import zoo_herding  # NumPy-backed, like the waves
+    herd = [a for a in animals if behaviour.herd[a.species]]
+    if not herd:
+        return
+    threats = [p.pos[:2] for p in poachers if p.active and not p.captured]
+    if poacher_wave is not None:
+        threats.extend(poacher_wave.pos[:poacher_wave.count][poacher_wave.live(), :2].tolist())
+    turn_rate = zoo_herding.TURN_RATE * HERDING_TUNED_RATE * min(elapsed, 2 / HERDING_RATE)
+    headings, fleeing = zoo_herding.steer([a.pos[:2] for a in herd], [a.move_dir[:2] for a in herd],
+                                          threats, turn_rate)
+    for animal, heading, flee in zip(herd, headings.tolist(), fleeing.tolist()):
+        animal.move_dir[0], animal.move_dir[1] = heading
+        animal.fleeing = flee
+
+# Tranquilizer darts
+class Dart:
+    def __init__(self, pos, direction):
+        self.pos = list(pos)
+        self.direction = direction
+        self.speed = 15
+        self.active = True
+        self.life_time = clock() + 5  # Dart exists for 5 seconds
+        
+    def update(self):
+        if not self.active:
+            return
+        
+        self.pos[0] += self.direction[0] * self.speed
+        self.pos[1] += self.direction[1] * self.speed
+        self.pos[2] += self.direction[2] * self.speed
+        
+        # Check if dart has expired
+        if clock() > self.life_time:
+            self.active = False
+            dart_registry.defer_remove(self.handle)
+        
+        # Check collision with poachers (use only X/Y distance)
+        for poacher in poachers:
+            if poacher.active and not poacher.captured:
+                dist = math.sqrt((self.pos[0] - poacher.pos[0])**2 + 
+                                (self.pos[1] - poacher.pos[1])**2)
+                if dist < 30:  # Hit detection radius
+                    poacher.captured = True
+                    poacher_registry.defer_remove(poacher.handle)  # Taken away
+                    self.active = False
+                    dart_registry.defer_remove(self.handle)
+                    emit_effect("dart_hit", self.pos)
+                    global game_score
+                    game_score += 100
+                    log_event("dart_hit", self.pos, value=100)
+        
+        if self.active and poacher_wave is not None:
+            if poacher_wave.dart_hit(self.pos[0], self.pos[1]) is not None:
+                self.active = False
+                dart_registry.defer_remove(self.handle)
+                emit_effect("dart_hit", self.pos)
+                game_score += 100
+                log_event("dart_hit", self.pos, value=100)
+
+dart_registry = Registry()
+darts = dart_registry.dense
+
+def reset_game():
+    global game_time, currency, game_score, game_over, restart_timer
+    global last_poacher_spawn_time, poacher_spawn_interval, FOOD_LEVEL, selected_animal
+    global last_time, poacher_wave, starting_animals, animals_dead, animals_captured
+    
+    # Reset game variables
+    last_time = clock()
+    game_time = 0
+    currency = 1000
+    game_score = 0
+    game_over = False
+    restart_timer = None
+    last_poacher_spawn_time = clock()
+    poacher_spawn_interval = 15
+    selected_animal = None
+    log_event("reset")
+    
+    # Clear existing entities; outstanding handles go stale
+    poacher_registry.clear()
+    poacher_wave = None
+    dart_registry.clear()
+    
+    if influence is not None:
+        influence.clear()
+    
+    # Reset feeding stations
+    for i, habitat in enumerate(habitats):
+        FOOD_LEVEL[i] = 0
+    
+    # Re-initialize animals
+    animal_registry.clear()
+    for animal_type in animal_types:
+        habitat = habitats[animal_type["habitat_index"]]
+        pos_x = habitat["center"][0] + random.uniform(-150, 150)
+        pos_y = habitat["center"][1] + random.uniform(-150, 150)
+        animal = Animal((pos_x, pos_y, 20), animal_type["name"], habitat["color"], animal_type["size"])
+        animal.habitat_pos = habitat["center"]
+        animal.habitat_index = animal_type["habitat_index"]
+        animal.dead = False
+        animal.captured = False
+        animal.health = 100
+        animal.happiness = 100
+        animal_registry.add(animal)
+        log_event("spawn_animal", animal.pos, animal.habitat_index, animal.species)
+    starting_animals = len(animals)
+    animals_dead = animals_captured = 0
+    
+    for listener in reset_listeners:
+        listener()
+
+def update_game():
+    if game_paused:
+        return
+        
+    global last_time, game_time, last_poacher_spawn_time, currency, poacher_spawn_interval
+    global game_over, restart_timer
+    
+    current_time = clock()
+    dt = current_time - last_time
+    last_time = current_time
+    
+    # Check for game over
+    if game_over:
+        if restart_timer is None:
+            restart_timer = current_time + 5  # Wait 5 seconds before restarting
+        elif current_time >= restart_timer:
+            reset_game()
+        return
+        
+    # Check if all animals are dead or captured (they were removed at the end of their tick)
+    if not animals:
+        game_over = True
+        return
+    
+    # Update game timer
+    game_time += dt
+    
+    # Add currency over time
+    if int(game_time) % 10 == 0 and int(game_time) > 0:  # Every 10 seconds
+        currency += 25
+    
+    # Update all animals
+    update_herding(current_time)
+    for animal in animals:
+        animal.update(current_time)
+    
+    # Update all poachers, steering by this tick's influence map
+    update_influence(dt)
+    for poacher in poachers:
+        poacher.update()
+    if poacher_wave is not None:
+        update_wave(current_time)
+    
+    # Update all darts
+    for dart in darts:
+        dart.update()
+    
+    # Drop everything that died, was captured or expired this tick
+    animal_registry.apply_removals()
+    poacher_registry.apply_removals()
+    dart_registry.apply_removals()
+    
+    # Spawn new poachers
+    if current_time - last_poacher_spawn_time > poacher_spawn_interval:
+        # Find a valid animal target that's not already captured or dead
+        valid_targets = [a for a in animals if not a.captured and not a.dead]
+        
+        if valid_targets:
+            target_animal = random.choice(valid_targets)
+            
+            # Spawn poacher at edge of map
+            spawn_side = random.randint(0, 3)  # 0=top, 1=right, 2=bottom, 3=left
+            
+            if spawn_side == 0:  # Top
+                poacher_pos = [random.uniform(-GRID_LENGTH, GRID_LENGTH), GRID_LENGTH, 30]
+            elif spawn_side == 1:  # Right
+                poacher_pos = [GRID_LENGTH, random.uniform(-GRID_LENGTH, GRID_LENGTH), 30]
+            elif spawn_side == 2:  # Bottom
+                poacher_pos = [random.uniform(-GRID_LENGTH, GRID_LENGTH), -GRID_LENGTH, 30]
+            else:  # Left
+                poacher_pos = [-GRID_LENGTH, random.uniform(-GRID_LENGTH, GRID_LENGTH), 30]
+            poacher_pos[2] = 30 + ground_offset(poacher_pos[0], poacher_pos[1])
+                
+            poacher_registry.add(Poacher(poacher_pos, target_animal.handle))
+            log_event("spawn_poacher", poacher_pos, value=1)
+            last_poacher_spawn_time = current_time
+            
+            # Make poachers spawn more frequently as game progresses, but not too fast
+            poacher_spawn_interval = max(8, 15 - game_time / 120)  # Slower scaling
+
+def init_world(seed=None):
+    """Builds the starting world; call once before the first update_game()."""
+    if seed is not None:
+        random.seed(seed)
+    if not animal_types:
+        load_species()
+    reset_game()
+
+def key_action(key):
+    """Applies a gameplay key (WASD movement, F feed, P pause) to the player."""
+    global player_angle, game_paused, currency
+    
+    if key == b'p':  # Pause game
+        game_paused = not game_paused
+    
+    if key == b'v' and not game_over:  # Launch a poacher wave
+        start_wave()
+    
+    # Rotate player left (A key)
+    if key == b'a':
+        player_angle += 5
+    
+    # Rotate player right (D key)
+    if key == b'd':
+        player_angle -= 5
+    
+    # Player movement
+    if key == b'w':  # Forward
+        angle_rad = player_angle * math.pi / 180
+        player_pos[0] += -math.sin(angle_rad) * player_speed
+        player_pos[1] += math.cos(angle_rad) * player_speed
+    
+    if key == b's':  # Backward
+        angle_rad = player_angle * math.pi / 180
+        player_pos[0] -= -math.sin(angle_rad) * player_speed
+        player_pos[1] -= math.cos(angle_rad) * player_speed
+    
+    if key in (b'w', b's'):
+        player_pos[2] = 30 + ground_offset(player_pos[0], player_pos[1])
+    
+    # Add food to feeding station or feed selected animal
+    if key == b'f':
+        if selected_animal is not None and not game_over:
+            animal = animal_registry.get(selected_animal)  # None once it has died or been captured
+            if animal is not None and not animal.dead and not animal.captured and currency >= feed_cost:
+                animal.feed()
+                currency -= feed_cost
+                emit_effect("feed", animal.pos)
+                log_event("feed", animal.pos, animal.habitat_index, animal.species, feed_cost)
+        else:
+            # Check if player is near a feeding station
+            for i, habitat in enumerate(habitats):
+                feeding_x = habitat["center"][0] + 50  # Feeding station offset
+                feeding_y = habitat["center"][1] - 50
+                dist = math.sqrt((player_pos[0] - feeding_x)**2 + 
+                               (player_pos[1] - feeding_y)**2)
+                if dist < 50:  # Close enough to feeding station
+                    if currency >= feed_cost:
+                        FOOD_LEVEL[i] += 5  # Add food units
+                        currency -= feed_cost
+                        emit_effect("feed", (feeding_x, feeding_y, 20))
+                        log_event("feed", (feeding_x, feeding_y), i, value=feed_cost)
+                        break
+
+def gun_muzzle():
+    # Dart spawn point: match gun muzzle position visually
+    angle_rad = math.radians(player_angle)
+    return [
+        player_pos[0] + 30 * math.sin(angle_rad),  # Further forward
+        player_pos[1] - 30 * math.cos(angle_rad),  # Further forward
+        player_pos[2] + 31  # Match gun height (25 + 6)
+    ]
+
+def fire_dart(direction=None):
+    """Shoots a dart, by default along the player's facing. Returns False while on cooldown."""
+    global shoot_cooldown
+    current_time = clock()
+    if shoot_cooldown > current_time:
+        return False
+    shoot_cooldown = current_time + 1  # 1 second cooldown
+    
+    if direction is None:
+        # Dart direction: player is facing along +Y rotated by player_angle
+        angle_rad = math.radians(player_angle)
+        direction = [-math.sin(angle_rad), math.cos(angle_rad), 0]
+    
+    dart_registry.add(Dart(gun_muzzle(), direction))
+    return True
+
+def select_nearest_animal():
+    # Closest animal to player within interaction range
+    global selected_animal
+    closest_animal = None
+    closest_distance = interaction_range
+    
+    for animal in animals:
+        if animal.captured:
+            continue
+            
+        dist = math.sqrt((player_pos[0] - animal.pos[0])**2 + 
+                       (player_pos[1] - animal.pos[1])**2)
+        
+        if dist < closest_distance:
+            closest_animal = animal.handle
+            closest_distance = dist
+    
+    selected_animal = closest_animal
+
+# One world's share of the globals above. clock and random are per world too, so
+# each world can run on its own time source and random.Random.
+WORLD_STATE = (
+    "game_score", "currency", "game_time", "game_paused", "game_over", "restart_timer", "last_time",
+    "player_pos", "player_angle", "shoot_cooldown", "selected_animal", "ranger_positions",
+    "effect_sink", "event_sink", "reset_listeners", "FOOD_LEVEL",
+    "animal_registry", "animals", "starting_animals", "animals_dead", "animals_captured", "last_herding",
+    "poacher_registry", "poachers", "influence", "influence_elapsed", "last_poacher_spawn_time",
+    "poacher_spawn_interval", "poacher_wave", "dart_registry", "darts",
+    "clock", "random",
+)
+_PRISTINE = copy.deepcopy({name: globals()[name] for name in WORLD_STATE[:-2]})
+
+def new_world_state(clock=time.time, rng=None):
+    """WORLD_STATE values as they are at import, for a world still to be built by init_world()."""
+    state = copy.deepcopy(_PRISTINE)  # One deepcopy, so `animals` stays the registry's dense list
+    state["clock"] = clock
+    if rng is None:
+        import random as stdlib_random  # The global may be a world's Random just now
+        rng = stdlib_random.Random()
+    state["random"] = rng
+    return state
@@ -0,0 +1,158 @@
+"""
+Simulation on its own thread.
+
+SimThread runs zoo_sim.update_game() at a fixed tick rate. After every tick it
+publishes an immutable Snapshot of everything the renderer draws. The front end
+picks up the latest snapshot at the start of a frame and draws from it for the
+whole frame, without taking a lock. Publishing swaps the front and back
+references in one assignment. The previous snapshot is never modified, so a
+frame that is still drawing it stays consistent.
+
+Input goes the other way through a queue of (action, args) calls, which the
+thread applies before its next tick. Effects emitted by the simulation, and
+world resets, are queued for the render thread, which owns the particle system.
+"""
+import queue
+import threading
+import time
+from collections import deque, namedtuple
+
+import zoo_sim as sim
+
+TICK_RATE = 60  # Simulation ticks per second
+
+
+class AnimalView(namedtuple("AnimalView", "handle pos type size health happiness captured dead is_eating move_dir")):
+    __slots__ = ()
+
+    def get_color(self):
+        # Same as Animal.get_color
+        r = 1.0 - (self.health / 100) * 0.8
+        g = (self.health / 100) * 0.8
+        b = 0.2
+        return (r, g, b)
+
+
+PoacherView = namedtuple("PoacherView", "pos active captured")
+DartView = namedtuple("DartView", "pos direction active")
+
+
+class WaveView(namedtuple("WaveView", "pos active captured count")):
+    __slots__ = ()
+
+    def live_count(self):
+        return int((self.active & ~self.captured).sum())
+
+
+Snapshot = namedtuple("Snapshot", [
+    "tick", "animals", "poachers", "darts", "poacher_wave",
+    "player_pos", "player_angle", "selected_animal", "starting_animals",
+    "game_score", "currency", "game_time", "game_paused", "game_over", "restart_timer",
+    "FOOD_LEVEL", "habitats", "FEEDING_STATION_SIZE", "terrain",
+])
+
+
+def take_snapshot(tick):
+    """Copies the render-visible part of zoo_sim into a new Snapshot."""
+    wave = sim.poacher_wave
+    if wave is not None:
+        n = wave.count
+        wave = WaveView(wave.pos[:n].copy(), wave.active[:n].copy(), wave.captured[:n].copy(), n)
+    return Snapshot(
+        tick=tick,
+        animals=tuple(AnimalView(a.handle, tuple(a.pos), a.type, a.size, a.health, a.happiness,
+                                 a.captured, a.dead, a.is_eating, tuple(a.move_dir))
+                      for a in sim.animals),
+        poachers=tuple(PoacherView(tuple(p.pos), p.active, p.captured) for p in sim.poachers),
+        darts=tuple(DartView(tuple(d.pos), tuple(d.direction), d.active) for d in sim.darts),
+        poacher_wave=wave,
+        player_pos=tuple(sim.player_pos),
+        player_angle=sim.player_angle,
+        selected_animal=sim.selected_animal,
+        starting_animals=sim.starting_animals,
+        game_score=sim.game_score,
+        currency=sim.currency,
+        game_time=sim.game_time,
+        game_paused=sim.game_paused,
+        game_over=sim.game_over,
+        restart_timer=sim.restart_timer,
+        FOOD_LEVEL=dict(sim.FOOD_LEVEL),
+        habitats=sim.habitats,
+        FEEDING_STATION_SIZE=sim.FEEDING_STATION_SIZE,
+        terrain=sim.terrain,
+    )
+
+
+class SimThread(threading.Thread):
+    def __init__(self, rate=TICK_RATE):
+        super().__init__(name="zoo-sim", daemon=True)
+        self.interval = 1.0 / rate
+        self.inputs = queue.SimpleQueue()
+        self.effects = deque()  # (effect, pos); (None, None) marks a world reset
+        self.running = False
+        self.ticks = 0
+        self.front = None
+        self.back = None
+        self.tick_time = 0.0  # Seconds spent in the last update_game()
+        self.telemetry = None  # zoo_telemetry writer, published to after every tick
+
+        # The simulation reports effects from this thread; hand them to the renderer
+        sim.effect_sink = self.queue_effect
+        if self.queue_reset not in sim.reset_listeners:
+            sim.reset_listeners.append(self.queue_reset)
+
+    def queue_effect(self, effect, pos):
+        self.effects.append((effect, pos))
+
+    def queue_reset(self):
+        self.effects.append((None, None))
+
+    def drain_effects(self):
+        effects = []
+        while self.effects:
+            effects.append(self.effects.popleft())
+        return effects
+
+    def submit(self, action, *args):
+        """Runs action(*args) on the simulation thread before its next tick."""
+        self.inputs.put((action, args))
+
+    def publish(self, snapshot):
+        # Reference swap: the renderer sees either the old or the new snapshot, never a mix
+        self.back = self.front
+        self.front = snapshot
+
+    def start(self):
+        self.running = True
+        self.publish(take_snapshot(0))  # Something to draw before the first tick
+        super().start()
+
+    def stop(self, timeout=1.0):
+        self.running = False
+        if self.is_alive():
+            self.join(timeout)
+
+    def run(self):
+        next_tick = time.perf_counter()
+        while self.running:
+            while True:
+                try:
+                    action, args = self.inputs.get_nowait()
+                except queue.Empty:
+                    break
+                action(*args)
+
+            start = time.perf_counter()
+            sim.update_game()
+            self.tick_time = time.perf_counter() - start
+            self.ticks += 1
+            self.publish(take_snapshot(self.ticks))
+            if self.telemetry is not None:
+                self.telemetry.publish(self.tick_time, self.ticks)
+
+            next_tick += self.interval
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_tick = time.perf_counter()  # Running late; don't try to catch up
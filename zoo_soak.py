@@ -0,0 +1,335 @@
+"""
+Soak test: hours of simulated play, checked for anything that keeps growing.
+
+The game runs on a virtual clock (zoo_sim.clock), so a simulated hour takes
+as long as its ticks take to compute rather than an hour. A bot plays through
+the same entry points the GLUT handlers forward to: gameplay keys go to
+sim.key_action (or to the front end's keyboardListener with --render) and
+darts to sim.fire_dart. It turns and walks, keeps the feeding stations
+stocked and shoots the nearest poacher. After --round minutes of game time it
+launches a poacher wave and stops defending, so the game ends and resets by
+itself. A long run therefore goes through many reset_game cycles.
+
+Every --sample-every simulated seconds the harness collects garbage and
+records resident memory, the traced Python heap (tracemalloc), the number of
+GC-tracked objects, entity counts, registry slots and the mean tick time.
+After the warm-up a least-squares slope per simulated hour is fitted to each
+metric. The run fails (exit status 1) if any slope is above its limit.
+tracemalloc makes every tick about three times slower; --no-tracemalloc
+skips the heap metric.
+
+    python zoo_soak.py --hours 4                     # headless simulation
+    python zoo_soak.py --hours 1 --render            # also render frames with OSMesa
+    python zoo_soak.py --max-slope rss_mb=4 --csv soak.csv
+
+--render draws a frame into an offscreen framebuffer every --render-every
+ticks through the real render path: display lists, impostors, minimap, scene
+buffer.
+"""
+import argparse
+import gc
+import math
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+import zoo_sim as sim
+
+TICK = 1 / 60  # Simulated seconds per tick
+ROUND_MINUTES = 15  # Game time before the bot lets the poachers win
+WARMUP_FRACTION = 0.2  # Samples before this fraction of the run are not used for trends
+ENGAGE_RANGE = 450  # The bot shoots poachers closer than this
+STATION_RANGE = 40  # ...and presses F this close to a feeding station
+
+# Largest allowed growth per simulated hour
+DEFAULT_SLOPES = {
+    "rss_mb": 8.0,
+    "heap_mb": 2.0,
+    "gc_objects": 5000,
+    "tick_ms": 0.5,
+    "animals": 2,
+    "poachers": 2,
+    "darts": 2,
+    "slots": 10,
+}
+METRICS = ["sim_hours", "resets", "rss_mb", "heap_mb", "gc_objects", "tick_ms",
+           "animals", "poachers", "darts", "wave", "slots"]
+
+
+class VirtualClock:
+    """Stands in for time.time() in zoo_sim; moves only when advanced."""
+
+    def __init__(self, start=None):
+        self.now = time.time() if start is None else start
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        import resource  # No /proc: fall back to the peak, which still shows growth
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+class Bot:
+    def __init__(self, press, rng, round_minutes=ROUND_MINUTES):
+        self.press = press  # Sends one gameplay key
+        self.rng = rng
+        self.round_time = round_minutes * 60
+        self.wave_launched = False
+        self.wander_turns = 0
+
+    def act(self):
+        if sim.game_over:
+            self.wave_launched = False
+            return
+        if sim.game_time > self.round_time:
+            # End the round: let a wave through and stop defending
+            if not self.wave_launched:
+                self.press(b'v')
+                self.wave_launched = True
+            return
+
+        poacher = self.nearest_poacher()
+        if poacher is not None:
+            dx, dy = poacher.pos[0] - sim.player_pos[0], poacher.pos[1] - sim.player_pos[1]
+            if self.turn_towards(dx, dy):
+                length = math.hypot(dx, dy)
+                sim.fire_dart([dx / length, dy / length, 0])  # Returns False while on cooldown
+            return
+
+        hungry = [i for i, level in sim.FOOD_LEVEL.items() if level == 0]
+        if hungry and sim.currency >= sim.feed_cost:
+            center = sim.habitats[hungry[0]]["center"]
+            dx = center[0] + 50 - sim.player_pos[0]  # Feeding station offset, as in key_action
+            dy = center[1] - 50 - sim.player_pos[1]
+            if math.hypot(dx, dy) < STATION_RANGE:
+                self.press(b'f')
+            elif self.turn_towards(dx, dy):
+                self.press(b'w')
+            return
+
+        # Nothing to do: wander
+        if self.wander_turns == 0:
+            self.wander_turns = self.rng.randint(-12, 12)
+        key = b'a' if self.wander_turns > 0 else b'd'
+        self.wander_turns -= 1 if self.wander_turns > 0 else -1
+        self.press(key if self.rng.random() < 0.3 else b'w')
+
+    def nearest_poacher(self):
+        best, best_distance = None, ENGAGE_RANGE
+        for poacher in sim.poachers:
+            if poacher.active and not poacher.captured:
+                distance = math.hypot(poacher.pos[0] - sim.player_pos[0], poacher.pos[1] - sim.player_pos[1])
+                if distance < best_distance:
+                    best, best_distance = poacher, distance
+        return best
+
+    def turn_towards(self, dx, dy):
+        """Presses A or D towards the direction; True once facing it."""
+        # The player faces (-sin, cos) of player_angle
+        wanted = math.degrees(math.atan2(-dx, dy))
+        difference = (wanted - sim.player_angle + 180) % 360 - 180
+        if abs(difference) <= 5:
+            return True
+        self.press(b'a' if difference > 0 else b'd')
+        return False
+
+
+class Renderer:
+    """Offscreen frames through the front end, for --render."""
+
+    def __init__(self, seed):
+        os.environ.setdefault("PYOPENGL_PLATFORM", "osmesa")  # Before PyOpenGL is first imported
+        import zoo_capture
+        from zoo_framebuffer import Framebuffer
+        from OpenGL.GL import glFinish
+        self.mz, self.finish = zoo_capture.mz, glFinish
+        self.context = zoo_capture.create_osmesa_context()
+        self.mz.hud_text = False  # No GLUT fonts without glutInit
+        self.mz.init_gl()
+        self.mz.quality.pin(0)  # Tick times must not depend on tier changes
+        self.mz.start_game(seed)
+        self.fbo = Framebuffer(zoo_capture.WIDTH, zoo_capture.HEIGHT)
+        self.frames = 0
+
+    def press(self, key):
+        self.mz.keyboardListener(key, 0, 0)
+
+    def tick(self):
+        self.mz.step_frame()
+
+    def draw(self):
+        self.fbo.bind()
+        self.mz.render_frame()
+        self.finish()
+        self.fbo.unbind()
+        self.frames += 1
+
+
+def slope(xs, ys):
+    """Least-squares slope of ys over xs."""
+    n = len(xs)
+    mean_x, mean_y = sum(xs) / n, sum(ys) / n
+    var = sum((x - mean_x) ** 2 for x in xs)
+    if var == 0:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / var
+
+
+def trends(samples, limits, warmup=WARMUP_FRACTION):
+    """(metric, slope per simulated hour, limit, ok) for every limited metric."""
+    end = samples[-1]["sim_hours"]
+    used = [s for s in samples if s["sim_hours"] >= end * warmup]
+    if len(used) < 3:
+        return []
+    hours = [s["sim_hours"] for s in used]
+    results = []
+    for metric, limit in limits.items():
+        growth = slope(hours, [s[metric] for s in used])
+        results.append((metric, growth, limit, growth <= limit))
+    return results
+
+
+class Soak:
+    def __init__(self, options):
+        self.options = options
+        self.clock = VirtualClock()
+        sim.clock = self.clock
+        self.renderer = Renderer(options.seed) if options.render else None
+        if self.renderer is None:
+            sim.init_world(options.seed)
+        self.bot = Bot(self.renderer.press if self.renderer else sim.key_action,
+                       random.Random(options.seed), options.round)
+        self.resets = 0
+        sim.reset_listeners.append(self.count_reset)
+        self.samples = []
+        self.tick_times = []
+
+    def count_reset(self):
+        self.resets += 1
+
+    def tick(self):
+        self.clock.advance(TICK)
+        self.bot.act()
+        start = time.perf_counter()
+        if self.renderer is not None:
+            self.renderer.tick()
+        else:
+            sim.update_game()
+        self.tick_times.append(time.perf_counter() - start)
+
+    def sample(self, ticks):
+        gc.collect()
+        self.samples.append({
+            "sim_hours": ticks * TICK / 3600,
+            "resets": self.resets,
+            "rss_mb": rss_mb(),
+            "heap_mb": tracemalloc.get_traced_memory()[0] / 2**20 if tracemalloc.is_tracing() else 0.0,
+            "gc_objects": len(gc.get_objects()),
+            "tick_ms": sum(self.tick_times) / max(len(self.tick_times), 1) * 1000,
+            "animals": len(sim.animals),
+            "poachers": len(sim.poachers),
+            "darts": len(sim.darts),
+            "wave": sim.poacher_wave.live_count() if sim.poacher_wave is not None else 0,
+            "slots": sum(len(r.generation) for r in (sim.animal_registry, sim.poacher_registry, sim.dart_registry)),
+        })
+        self.tick_times = []
+
+    def run(self):
+        options = self.options
+        if not options.no_tracemalloc:
+            tracemalloc.start()
+        total = round(options.hours * 3600 / TICK)
+        sample_ticks = max(1, round(options.sample_every / TICK))
+        started = time.perf_counter()
+        self.sample(0)
+        for ticks in range(1, total + 1):
+            self.tick()
+            if self.renderer is not None and ticks % options.render_every == 0:
+                self.renderer.draw()
+            if ticks % sample_ticks == 0:
+                self.sample(ticks)
+                if options.verbose:
+                    print(format_sample(self.samples[-1]), file=sys.stderr)
+        elapsed = time.perf_counter() - started
+        tracemalloc.stop()
+        print(f"Simulated {options.hours:g} h ({total} ticks, {self.resets} resets"
+              f"{f', {self.renderer.frames} frames' if self.renderer else ''}) in {elapsed:.1f} s")
+
+
+def format_sample(s):
+    return (f"{s['sim_hours']:6.2f} h  resets {s['resets']:>3}  rss {s['rss_mb']:7.1f} MB  "
+            f"heap {s['heap_mb']:6.2f} MB  objects {s['gc_objects']:>7}  tick {s['tick_ms']:6.3f} ms  "
+            f"animals {s['animals']:>3}  poachers {s['poachers']:>3}  darts {s['darts']:>2}  "
+            f"wave {s['wave']:>4}  slots {s['slots']:>4}")
+
+
+def write_csv(path, samples):
+    with open(path, "w") as f:
+        f.write(",".join(METRICS) + "\n")
+        for s in samples:
+            f.write(",".join(f"{s[m]:.6g}" for m in METRICS) + "\n")
+
+
+def parse_slopes(values):
+    limits = dict(DEFAULT_SLOPES)
+    for value in values:
+        name, _, limit = value.partition("=")
+        if name not in DEFAULT_SLOPES:
+            raise SystemExit(f"Unknown metric {name!r}; expected one of {', '.join(DEFAULT_SLOPES)}")
+        limits[name] = float(limit)
+    return limits
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Soak-test Zoo Defender for leaks over hours of simulated play")
+    parser.add_argument("--hours", type=float, default=2.0, help="simulated hours to play")
+    parser.add_argument("--sample-every", type=float, default=60.0, help="simulated seconds between samples")
+    parser.add_argument("--round", type=float, default=ROUND_MINUTES, help="game minutes before the bot gives up")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--render", action="store_true", help="also render frames offscreen with OSMesa")
+    parser.add_argument("--render-every", type=int, default=60, help="ticks between rendered frames")
+    parser.add_argument("--max-slope", action="append", default=[], metavar="METRIC=LIMIT",
+                        help="largest allowed growth per simulated hour, e.g. rss_mb=4")
+    parser.add_argument("--no-tracemalloc", action="store_true", help="skip heap tracing (faster)")
+    parser.add_argument("--csv", help="write every sample to this file")
+    parser.add_argument("--verbose", action="store_true", help="print every sample")
+    options = parser.parse_args(argv)
+    limits = parse_slopes(options.max_slope)
+    if options.no_tracemalloc:
+        limits.pop("heap_mb")
+
+    soak = Soak(options)
+    soak.run()
+    if options.csv:
+        write_csv(options.csv, soak.samples)
+    print(format_sample(soak.samples[0]))
+    print(format_sample(soak.samples[-1]))
+
+    results = trends(soak.samples, limits)
+    if not results:
+        print("Too few samples after the warm-up to judge trends; run longer or sample more often")
+        return 1
+    for metric, growth, limit, ok in results:
+        print(f"{metric:>10} {growth:+10.3f}/h  (limit {limit:g}/h)  {'ok' if ok else 'FAIL'}")
+    failed = [metric for metric, _, _, ok in results if not ok]
+    if failed:
+        print(f"Soak failed: {', '.join(failed)} kept growing")
+        return 1
+    print("Soak passed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
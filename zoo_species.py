@@ -0,0 +1,109 @@
+"""
+Species definitions loaded from data files.
+
+Every species is one JSON file in species/: its name, size, home habitat,
+behaviour parameters and, optionally, its model as a part list (see
+zoo_meshes). Adding a species means adding a file; nothing in the game code
+names a species any more.
+
+    {
+      "name": "Cow", "size": 45, "habitat": "Farm",
+      "behaviour": {"hunger_rate": [0.15, 0.25], "wander_speed": 1, "herd": true},
+      "model": [{"color": [0.9, 0.9, 0.9], "transform": [["scale", 1.5, 0.9, 0.8]],
+                 "shape": ["sphere", 0.8, 20, 20]}, ...]
+    }
+
+Missing behaviour keys take their value from DEFAULT_BEHAVIOUR and a missing
+model is DEFAULT_MODEL. load_species() returns the species in a fixed order
+(by habitat, then name), so every process that loads the same files numbers
+them the same way. BehaviourTable turns the behaviour parameters into one
+tuple per parameter, indexed by species number, for Animal.update().
+
+This module only needs the standard library, so zoo_sim can import it.
+"""
+import glob
+import hashlib
+import json
+import os
+
+SPECIES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "species")
+
+DEFAULT_BEHAVIOUR = {
+    "hunger_rate": [0.15, 0.25],  # Health lost per decay step is drawn from this range per animal
+    "wander_speed": 1,  # Units per tick while wandering
+    "flee_speed": 2,  # ...while running from poachers
+    "hungry_speed": 2,  # ...while heading for the feeding station
+    "wander_interval": 3,  # Seconds between random changes of direction
+    "herd": False,  # Steered by zoo_herding
+}
+
+# Body in the health colour with a head; for species that have no model of their own
+DEFAULT_MODEL = [
+    {"color": "health", "shape": ["sphere", 1.0, 20, 20]},
+    {"color": "health", "transform": [["translate", 0.6, 0, 0.2]], "shape": ["sphere", 0.4, 12, 12]},
+]
+
+
+def model_hash(model):
+    """Content hash of a part list, used to key compiled meshes and the impostor atlas."""
+    return hashlib.sha1(json.dumps(model, sort_keys=True).encode()).hexdigest()
+
+
+def load_species(directory=SPECIES_DIR, habitats=None):
+    """Reads every species file; returns a list of dicts (name, size, habitat_index, behaviour, model, hash)."""
+    if habitats is None:
+        import zoo_sim
+        habitats = zoo_sim.habitats
+    habitat_index = {h["name"]: i for i, h in enumerate(habitats)}
+
+    species = []
+    for path in glob.glob(os.path.join(directory, "*.json")):
+        with open(path) as f:
+            data = json.load(f)
+        try:
+            name, size, habitat = data["name"], data["size"], data["habitat"]
+        except KeyError as error:
+            raise ValueError(f"{path}: missing {error.args[0]!r}") from None
+        if habitat not in habitat_index:
+            raise ValueError(f"{path}: unknown habitat {habitat!r}")
+        unknown = set(data.get("behaviour", {})) - set(DEFAULT_BEHAVIOUR)
+        if unknown:
+            raise ValueError(f"{path}: unknown behaviour parameter(s) {', '.join(sorted(unknown))}")
+        model = data.get("model", DEFAULT_MODEL)
+        species.append({
+            "name": name,
+            "size": size,
+            "habitat_index": habitat_index[habitat],
+            "behaviour": dict(DEFAULT_BEHAVIOUR, **data.get("behaviour", {})),
+            "model": model,
+            "hash": model_hash(model),
+        })
+
+    species.sort(key=lambda s: (s["habitat_index"], s["name"]))
+    names = [s["name"] for s in species]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Duplicate species names in {directory}")
+    return species
+
+
+class BehaviourTable:
+    """Behaviour parameters as per-species tuples: table.wander_speed[animal.species].
+
+    Row len(species) holds DEFAULT_BEHAVIOUR, for animals of a type that has no
+    species file.
+    """
+
+    def __init__(self, species):
+        self.index = {s["name"]: i for i, s in enumerate(species)}
+        self.default = len(species)
+        rows = [s["behaviour"] for s in species] + [DEFAULT_BEHAVIOUR]
+        self.hunger_min = tuple(float(b["hunger_rate"][0]) for b in rows)
+        self.hunger_max = tuple(float(b["hunger_rate"][1]) for b in rows)
+        self.wander_speed = tuple(float(b["wander_speed"]) for b in rows)
+        self.flee_speed = tuple(float(b["flee_speed"]) for b in rows)
+        self.hungry_speed = tuple(float(b["hungry_speed"]) for b in rows)
+        self.wander_interval = tuple(float(b["wander_interval"]) for b in rows)
+        self.herd = tuple(bool(b["herd"]) for b in rows)
+
+    def number(self, type_name):
+        return self.index.get(type_name, self.default)
@@ -0,0 +1,84 @@
+"""
+Startup profiling for Zoo Defender.
+
+Measures the import time of the simulation and of the GLUT front end with
+python -X importtime, checks that zoo_sim pulls in no OpenGL, and (when a
+display is available) launches the game once to time the first frame.
+
+    python zoo_startup.py [--first-frame]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+SIM_IMPORT_BUDGET = 0.05  # seconds for "import zoo_sim"
+FIRST_FRAME_TARGET = 1.5  # seconds, matches mapzoo_alt_version.FIRST_FRAME_TARGET
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def profile_import(module):
+    """(total seconds, [(cumulative us, module)]) for importing module in a fresh interpreter."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=HERE, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    rows = []
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)", line)
+        if match:
+            rows.append((int(match.group(2)), len(match.group(3)), match.group(4)))
+    total = next((cum for cum, _, name in rows if name == module), 0)
+    top_level = sorted(((cum, name) for cum, depth, name in rows if depth <= 3), reverse=True)
+    return total / 1e6, top_level, [name for _, _, name in rows]
+
+
+def report(module, budget=None):
+    total, top, loaded = profile_import(module)
+    verdict = ""
+    if budget is not None:
+        verdict = "  OK" if total <= budget else f"  OVER BUDGET ({budget * 1000:.0f} ms)"
+    print(f"import {module}: {total * 1000:.1f} ms{verdict}")
+    for cum, name in top[:8]:
+        print(f"    {cum / 1000:8.1f} ms  {name}")
+    return total, loaded
+
+
+def first_frame():
+    env = dict(os.environ, ZOO_EXIT_AFTER_FIRST_FRAME="1")
+    result = subprocess.run([sys.executable, "mapzoo_alt_version.py"], cwd=HERE, env=env,
+                            capture_output=True, text=True, timeout=120)
+    match = re.search(r"Time to first frame: (\d+) ms", result.stderr)
+    if not match:
+        print("Could not time the first frame (no display?)")
+        return None
+    elapsed = int(match.group(1)) / 1000
+    status = "OK" if elapsed <= FIRST_FRAME_TARGET else "OVER TARGET"
+    print(f"time to first frame: {elapsed * 1000:.0f} ms  {status} ({FIRST_FRAME_TARGET * 1000:.0f} ms)")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile Zoo Defender startup")
+    parser.add_argument("--first-frame", action="store_true", help="also launch the game and time its first frame")
+    args = parser.parse_args()
+
+    ok = True
+    total, loaded = report("zoo_sim", SIM_IMPORT_BUDGET)
+    gl_modules = [name for name in loaded if name.startswith("OpenGL")]
+    if gl_modules:
+        print(f"zoo_sim imported OpenGL modules: {', '.join(gl_modules[:5])}")
+        ok = False
+    ok &= total <= SIM_IMPORT_BUDGET
+    report("mapzoo_alt_version")
+
+    if args.first_frame:
+        elapsed = first_frame()
+        ok &= elapsed is not None and elapsed <= FIRST_FRAME_TARGET
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+"""
+Live telemetry over shared memory.
+
+A running game with ZOO_TELEMETRY set publishes one fixed-layout record per
+tick into a memory-mapped file: score, currency, animal counts, food per
+habitat, poachers and frame/tick timings. Records go into a ring of SLOTS
+slots. Every slot starts with a sequence counter used as a seqlock: the
+writer makes it odd, writes the record, then makes it even again. A reader
+copies the slot and keeps the copy only if the counter was even and
+unchanged around it, otherwise it retries. The writer never waits for
+readers and never knows they exist, so monitoring costs the game one
+struct.pack_into per tick.
+
+There is one file per game instance, named after its pid, in the telemetry
+directory (/dev/shm/zoo_telemetry where available). Running this module tails
+every instance in that directory and prints per-instance and total figures:
+
+    ZOO_TELEMETRY=1 python mapzoo_alt_version.py        # on each kiosk
+    python zoo_telemetry.py [--dir DIR] [--interval 1] [--once]
+
+ZOO_TELEMETRY=1 uses the default directory; any other value is taken as the
+directory to use.
+"""
+import argparse
+import atexit
+import glob
+import mmap
+import os
+import struct
+import tempfile
+import time
+
+MAGIC = b"ZOOTLM1\0"
+VERSION = 1
+SLOTS = 256  # Records kept per instance: a few seconds at 60 ticks/s
+HABITATS = 4
+STALE_AFTER = 5  # Seconds without a record before an instance is shown as stale
+READ_RETRIES = 16
+
+# magic, version, slots, record size, pid, records written, start time
+HEADER = struct.Struct("<8sIIIIQd")
+HEAD_OFFSET = 24  # Records written (u64); the writer bumps it after each record
+HEADER_SIZE = 64
+SEQ = struct.Struct("<Q")
+# tick, time, game time, score, currency, alive, dead, captured, poachers, wave poachers,
+# food per habitat, frame ms, tick ms, quality tier, flags (1 = paused, 2 = game over)
+RECORD = struct.Struct(f"<QddqqIIIII{HABITATS}iffBB6x")
+SLOT_SIZE = SEQ.size + RECORD.size
+FIELDS = ("tick", "time", "game_time", "score", "currency", "alive", "dead", "captured",
+          "poachers", "wave_poachers", "food", "frame_ms", "tick_ms", "quality", "flags")
+PAUSED, GAME_OVER = 1, 2
+
+
+def default_dir():
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(base, "zoo_telemetry")
+
+
+def from_environment():
+    """A TelemetryWriter if ZOO_TELEMETRY asks for one, else None."""
+    setting = os.environ.get("ZOO_TELEMETRY")
+    if not setting or setting == "0":
+        return None
+    return TelemetryWriter(default_dir() if setting == "1" else setting)
+
+
+class TelemetryWriter:
+    def __init__(self, directory=None, slots=SLOTS):
+        directory = directory or default_dir()
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"{os.getpid()}.tlm")
+        self.slots = slots
+        self.written = 0
+        self.frame_time = 0.0  # Set by the front end each frame; read when a tick is published
+        self.quality = 0
+        with open(self.path, "wb") as f:
+            f.truncate(HEADER_SIZE + slots * SLOT_SIZE)
+        self.file = open(self.path, "r+b")
+        self.buf = mmap.mmap(self.file.fileno(), 0)
+        HEADER.pack_into(self.buf, 0, MAGIC, VERSION, slots, SLOT_SIZE, os.getpid(), 0, time.time())
+        atexit.register(self.close)
+
+    def publish(self, tick_time, tick=None):
+        """Writes zoo_sim's current state as the next record."""
+        import zoo_sim as sim
+        tick = self.written if tick is None else tick
+        wave = sim.poacher_wave.live_count() if sim.poacher_wave is not None else 0
+        food = [sim.FOOD_LEVEL.get(i, 0) for i in range(HABITATS)]
+        flags = (PAUSED if sim.game_paused else 0) | (GAME_OVER if sim.game_over else 0)
+        self.write(tick, time.time(), sim.game_time, sim.game_score, sim.currency,
+                   len(sim.animals), sim.animals_dead, sim.animals_captured, len(sim.poachers), wave,
+                   *food, self.frame_time * 1000, tick_time * 1000, self.quality, flags)
+
+    def write(self, *values):
+        offset = HEADER_SIZE + self.written % self.slots * SLOT_SIZE
+        seq = SEQ.unpack_from(self.buf, offset)[0]
+        SEQ.pack_into(self.buf, offset, seq + 1)  # Odd: being written
+        RECORD.pack_into(self.buf, offset + SEQ.size, *values)
+        SEQ.pack_into(self.buf, offset, seq + 2)
+        self.written += 1
+        SEQ.pack_into(self.buf, HEAD_OFFSET, self.written)
+
+    def close(self):
+        if self.buf is None:
+            return
+        self.buf.close()
+        self.file.close()
+        self.buf = None
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+class TelemetryReader:
+    """Read-only view of one instance's ring."""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        self.buf = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.slots, slot_size, self.pid, _, self.started = HEADER.unpack_from(self.buf, 0)
+        if magic != MAGIC or version != VERSION or slot_size != SLOT_SIZE:
+            self.close()
+            raise ValueError(f"{path} is not a version {VERSION} telemetry file")
+
+    def written(self):
+        return SEQ.unpack_from(self.buf, HEAD_OFFSET)[0]
+
+    def read(self, index):
+        """Record number index as a dict, or None if it was overwritten or kept changing."""
+        offset = HEADER_SIZE + index % self.slots * SLOT_SIZE
+        for _ in range(READ_RETRIES):
+            before = SEQ.unpack_from(self.buf, offset)[0]
+            if before & 1:
+                continue  # Being written right now
+            data = self.buf[offset + SEQ.size:offset + SLOT_SIZE]
+            if SEQ.unpack_from(self.buf, offset)[0] != before:
+                continue
+            if before != 2 * (index // self.slots + 1):
+                return None  # The slot already holds a later lap of the ring
+            values = RECORD.unpack(data)
+            record = dict(zip(FIELDS[:10], values[:10]))
+            record["food"] = list(values[10:10 + HABITATS])
+            record.update(zip(FIELDS[11:], values[10 + HABITATS:]))
+            return record
+        return None
+
+    def latest(self, count=1):
+        """Up to count most recent consistent records, oldest first."""
+        end = self.written()
+        records = []
+        for index in range(max(0, end - min(count, self.slots)), end):
+            record = self.read(index)
+            if record is not None:
+                records.append(record)
+        return records
+
+    def alive(self):
+        try:
+            os.kill(self.pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    def close(self):
+        self.buf.close()
+        self.file.close()
+
+
+def instance_summary(reader, window=60):
+    records = reader.latest(window)
+    if not records:
+        return None
+    last = records[-1]
+    frame_ms = [r["frame_ms"] for r in records]
+    return {
+        "pid": reader.pid,
+        "record": last,
+        "frame_avg": sum(frame_ms) / len(frame_ms),
+        "frame_max": max(frame_ms),
+        "stale": time.time() - last["time"] > STALE_AFTER,
+    }
+
+
+def format_line(name, r, frame_avg, frame_max, stale=False):
+    state = ("stale" if stale else "over" if r["flags"] & GAME_OVER
+             else "paused" if r["flags"] & PAUSED else "running")
+    food = "/".join(str(f) for f in r["food"])
+    return (f"{name:>8} {state:>7} score {r['score']:>7} ${r['currency']:>6} "
+            f"animals {r['alive']:>3} alive {r['dead']:>3} dead {r['captured']:>3} captured  "
+            f"food {food:>11}  poachers {r['poachers']:>3}+{r['wave_poachers']:<5} "
+            f"frame {frame_avg:5.1f}/{frame_max:5.1f} ms  tick {r['tick_ms']:5.2f} ms")
+
+
+def tail(directory, interval, once=False):
+    readers = {}
+    while True:
+        for path in glob.glob(os.path.join(directory, "*.tlm")):
+            if path not in readers:
+                try:
+                    readers[path] = TelemetryReader(path)
+                except (OSError, ValueError):
+                    continue
+
+        summaries = []
+        for path, reader in list(readers.items()):
+            if not os.path.exists(path) or not reader.alive():
+                reader.close()  # Exited (or crashed without removing its file)
+                del readers[path]
+                continue
+            summary = instance_summary(reader)
+            if summary is not None:
+                summaries.append(summary)
+
+        print(time.strftime("%H:%M:%S"), f"{len(summaries)} instance(s) in {directory}")
+        for s in sorted(summaries, key=lambda s: s["pid"]):
+            print(format_line(str(s["pid"]), s["record"], s["frame_avg"], s["frame_max"], s["stale"]))
+        summaries = [s for s in summaries if not s["stale"]]  # Totals are for live instances
+        if summaries:
+            total = {key: sum(s["record"][key] for s in summaries)
+                     for key in ("score", "currency", "alive", "dead", "captured", "poachers", "wave_poachers")}
+            total["food"] = [sum(s["record"]["food"][i] for s in summaries) for i in range(HABITATS)]
+            total["flags"] = 0
+            total["tick_ms"] = max(s["record"]["tick_ms"] for s in summaries)
+            print(format_line("total", total, sum(s["frame_avg"] for s in summaries) / len(summaries),
+                              max(s["frame_max"] for s in summaries)))
+        if once:
+            break
+        time.sleep(interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tail the telemetry of running Zoo Defender instances")
+    parser.add_argument("--dir", default=default_dir())
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds between reports")
+    parser.add_argument("--once", action="store_true", help="print one report and exit")
+    args = parser.parse_args()
+    try:
+        tail(args.dir, args.interval, args.once)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""
+Heightfield terrain for the park and the mountain ring.
+
+Heights live in a .npy file that is memory-mapped, so the map can be larger
+than RAM: only the pages a query or a tile touches are ever read. Rendering
+uses a CDLOD-style quadtree. Nodes near the camera split into finer tiles and
+distant ones stay coarse. Every selected tile is a fixed 33x33 vertex grid
+sampled at its level's stride, with a skirt to hide cracks between levels.
+Tile vertex arrays are built on first use and kept in an LRU cache.
+"""
+import json
+import math
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+TERRAIN_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "terrain_height.npy")
+TERRAIN_EXTENT = 2048  # Terrain covers [-extent, extent] on both axes
+TERRAIN_SPACING = 4.0  # World units between height samples
+GROUND_Z = -1  # Height of the flat habitat pads (the old ground quad)
+
+TILE_CELLS = 32  # Cells per tile edge at every LOD level
+LOD_BASE_RANGE = 250  # Level-0 tiles are used within this distance of the camera
+VIEW_DISTANCE = 2200  # Tiles further than this are not drawn
+TILE_CACHE_SIZE = 512
+SKIRT_DEPTH = 40
+
+# Habitat pads are kept flat so fences, discs and troughs sit on the ground
+HABITAT_PADS = [(-400, 400), (400, 400), (-400, -400), (400, -400)]
+PAD_RADIUS = 230
+PAD_BLEND = 120
+
+
+def smoothstep(edge0, edge1, x):
+    t = np.clip((x - edge0) / (edge1 - edge0), 0.0, 1.0)
+    return t * t * (3 - 2 * t)
+
+
+def procedural_height(x, y):
+    """Rolling ground inside the park with a ring of mountains around it."""
+    r = np.hypot(x, y)
+    theta = np.arctan2(y, x)
+
+    # Gentle hills between habitats, flattened on the pads
+    hills = 14 * np.sin(x / 170.0) * np.cos(y / 210.0) + 7 * np.sin((x + y) / 97.0)
+    for cx, cy in HABITAT_PADS:
+        hills *= smoothstep(PAD_RADIUS, PAD_RADIUS + PAD_BLEND, np.hypot(x - cx, y - cy))
+    hills *= 1 - smoothstep(950, 1100, r)
+
+    # Mountain ring like draw_mountain_ring: wobbling radius and peak heights
+    ring_radius = 1450 + 150 * np.sin(theta * 5) + 60 * np.sin(theta * 13 + 1.3)
+    peak = 280 + 120 * np.sin(theta * 7.3) ** 2 + 60 * np.sin(theta * 17 + 0.4)
+    ridges = 1 + 0.15 * np.sin(theta * 41) * np.sin(r / 37.0)
+    mountains = peak * ridges * np.exp(-((r - ring_radius) / 260.0) ** 2)
+    mountains = np.where(r > ring_radius, np.maximum(mountains, peak * 0.6), mountains)
+
+    return (GROUND_Z + hills + mountains).astype(np.float32)
+
+
+def generate_heightfield(path=TERRAIN_FILE, extent=TERRAIN_EXTENT, spacing=TERRAIN_SPACING, band_rows=128):
+    # Written band by band through a memmap, so memory stays bounded for huge maps
+    samples = int(round(2 * extent / spacing)) + 1
+    heights = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=(samples, samples))
+    xs = -extent + np.arange(samples, dtype=np.float64) * spacing
+    for row in range(0, samples, band_rows):
+        ys = -extent + np.arange(row, min(samples, row + band_rows), dtype=np.float64) * spacing
+        gx, gy = np.meshgrid(xs, ys)
+        heights[row:row + len(ys)] = procedural_height(gx, gy)
+    heights.flush()
+    del heights
+    with open(path + ".json", "w") as f:
+        json.dump({"origin": [-extent, -extent], "spacing": spacing}, f)
+
+
+def _tile_indices(cells):
+    """Triangle indices for a (cells+1)^2 grid followed by its perimeter skirt."""
+    side = cells + 1
+    rows, cols = np.meshgrid(np.arange(cells), np.arange(cells), indexing="ij")
+    a = (rows * side + cols).ravel()
+    b, c, d = a + 1, a + side, a + side + 1
+    grid = np.stack([a, c, b, b, c, d], axis=1).ravel()
+
+    # Perimeter walked once around; skirt vertices follow the grid vertices
+    perimeter = _perimeter(cells)
+    base = side * side
+    p0 = perimeter
+    p1 = np.roll(perimeter, -1)
+    s0 = base + np.arange(len(perimeter))
+    s1 = np.roll(s0, -1)
+    skirt = np.stack([p0, s0, p1, p1, s0, s1], axis=1).ravel()
+    return np.concatenate([grid, skirt]).astype(np.uint32)
+
+
+def _perimeter(cells):
+    side = cells + 1
+    top = np.arange(side - 1)
+    right = np.arange(side - 1) * side + (side - 1)
+    bottom = (side - 1) * side + np.arange(side - 1, 0, -1)
+    left = np.arange(side - 1, 0, -1) * side
+    return np.concatenate([top, right, bottom, left])
+
+
+class Heightfield:
+    def __init__(self, path=TERRAIN_FILE):
+        self.heights = np.load(path, mmap_mode="r")
+        with open(path + ".json") as f:
+            meta = json.load(f)
+        self.origin = meta["origin"]
+        self.spacing = meta["spacing"]
+        self.rows, self.cols = self.heights.shape
+        self.ground_z = GROUND_Z
+
+        # Root level: the smallest power-of-two tile that covers the grid
+        cells = max(self.rows, self.cols) - 1
+        self.levels = max(0, math.ceil(math.log2(max(1, cells / TILE_CELLS))))
+        self.indices = _tile_indices(TILE_CELLS)
+        self.perimeter = _perimeter(TILE_CELLS)
+        self.tile_cache = OrderedDict()
+        self.tiles_built = 0
+
+    def height_at(self, x, y):
+        # Bilinear height at a world position; clamped at the map edge
+        fx = min(max((x - self.origin[0]) / self.spacing, 0), self.cols - 1.001)
+        fy = min(max((y - self.origin[1]) / self.spacing, 0), self.rows - 1.001)
+        ix, iy = int(fx), int(fy)
+        tx, ty = fx - ix, fy - iy
+        h = self.heights
+        top = h[iy, ix] * (1 - tx) + h[iy, ix + 1] * tx
+        bottom = h[iy + 1, ix] * (1 - tx) + h[iy + 1, ix + 1] * tx
+        return float(top * (1 - ty) + bottom * ty)
+
+    def heights_at(self, xs, ys):
+        fx = np.clip((np.asarray(xs) - self.origin[0]) / self.spacing, 0, self.cols - 1.001)
+        fy = np.clip((np.asarray(ys) - self.origin[1]) / self.spacing, 0, self.rows - 1.001)
+        ix, iy = fx.astype(np.intp), fy.astype(np.intp)
+        tx, ty = fx - ix, fy - iy
+        h = self.heights
+        top = h[iy, ix] * (1 - tx) + h[iy, ix + 1] * tx
+        bottom = h[iy + 1, ix] * (1 - tx) + h[iy + 1, ix + 1] * tx
+        return top * (1 - ty) + bottom * ty
+
+    def select_tiles(self, eye, view_distance=VIEW_DISTANCE, lod_range=LOD_BASE_RANGE):
+        """Walk the quadtree and return the (level, tx, ty) tiles to draw from eye.
+
+        A smaller lod_range switches to coarser tiles closer to the camera.
+        """
+        selected = []
+        stack = [(self.levels, 0, 0)]
+        while stack:
+            level, tx, ty = stack.pop()
+            size = TILE_CELLS << level  # Cells covered by this node
+            x0, y0 = tx * size, ty * size
+            if x0 >= self.cols - 1 or y0 >= self.rows - 1:
+                continue
+            dist = self._node_distance(eye, x0, y0, size)
+            if dist > view_distance:
+                continue
+            if level == 0 or dist > lod_range * (1 << (level - 1)):
+                selected.append((level, tx, ty))
+            else:
+                for cy in (0, 1):
+                    for cx in (0, 1):
+                        stack.append((level - 1, tx * 2 + cx, ty * 2 + cy))
+        return selected
+
+    def _node_distance(self, eye, x0, y0, size):
+        # Distance from the eye to the node's footprint, using the eye's height above ground level
+        min_x = self.origin[0] + x0 * self.spacing
+        min_y = self.origin[1] + y0 * self.spacing
+        max_x = min_x + size * self.spacing
+        max_y = min_y + size * self.spacing
+        dx = max(min_x - eye[0], 0, eye[0] - max_x)
+        dy = max(min_y - eye[1], 0, eye[1] - max_y)
+        dz = max(0, eye[2] - GROUND_Z)
+        return math.sqrt(dx * dx + dy * dy + dz * dz)
+
+    def tile(self, level, tx, ty):
+        """Cached (vertices, colours) arrays for one quadtree tile."""
+        key = (level, tx, ty)
+        cached = self.tile_cache.get(key)
+        if cached is not None:
+            self.tile_cache.move_to_end(key)
+            return cached
+        cached = self._build_tile(level, tx, ty)
+        self.tile_cache[key] = cached
+        self.tiles_built += 1
+        if len(self.tile_cache) > TILE_CACHE_SIZE:
+            self.tile_cache.popitem(last=False)
+        return cached
+
+    def _build_tile(self, level, tx, ty):
+        stride = 1 << level
+        side = TILE_CELLS + 1
+        cols = np.minimum(tx * TILE_CELLS * stride + np.arange(side) * stride, self.cols - 1)
+        rows = np.minimum(ty * TILE_CELLS * stride + np.arange(side) * stride, self.rows - 1)
+        # Strided read from the memmap: only the sampled rows are paged in
+        heights = np.asarray(self.heights[rows[:, None], cols[None, :]], dtype=np.float32)
+
+        xs = self.origin[0] + cols * self.spacing
+        ys = self.origin[1] + rows * self.spacing
+        gx, gy = np.meshgrid(xs, ys)
+        grid = np.stack([gx.ravel(), gy.ravel(), heights.ravel()], axis=1).astype(np.float32)
+        colors = self._shade(heights, stride).reshape(-1, 3)
+
+        skirt = grid[self.perimeter].copy()
+        skirt[:, 2] -= SKIRT_DEPTH * stride
+        vertices = np.ascontiguousarray(np.concatenate([grid, skirt]), dtype=np.float32)
+        colors = np.ascontiguousarray(np.concatenate([colors, colors[self.perimeter]]), dtype=np.float32)
+        return vertices, colors
+
+    def _shade(self, heights, stride):
+        # Colour by height (soil, rock, snow) and darken by slope for a lit look
+        step = self.spacing * stride
+        dzdy, dzdx = np.gradient(heights, step)
+        shade = 1.0 / np.sqrt(1.0 + dzdx * dzdx + dzdy * dzdy)  # Normal's z against a light from above
+        soil = np.array([0.76, 0.70, 0.50], dtype=np.float32)
+        rock = np.array([0.42, 0.36, 0.30], dtype=np.float32)
+        snow = np.array([0.95, 0.95, 0.97], dtype=np.float32)
+        t_rock = smoothstep(20, 150, heights)[..., None]
+        t_snow = smoothstep(280, 380, heights)[..., None]
+        color = soil * (1 - t_rock) + rock * t_rock
+        color = color * (1 - t_snow) + snow * t_snow
+        return (color * (0.55 + 0.45 * shade[..., None])).astype(np.float32)
+
+
+def load_heightfield(path=TERRAIN_FILE):
+    if not os.path.exists(path) or not os.path.exists(path + ".json"):
+        generate_heightfield(path)
+    return Heightfield(path)
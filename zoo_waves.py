@@ -0,0 +1,128 @@
+"""
+Vectorized poacher waves.
+
+A wave keeps every poacher in NumPy arrays and runs the same rules as
+zoo_sim.Poacher over all of them at once. A poacher re-aims at its target
+every 2 seconds with random jitter and steps 10 units. It captures the target
+within 20 units and retargets when the target is gone. Steering times are
+staggered, so each tick only touches the poachers that are due. Given an
+influence map (zoo_influence), the due poachers pick their headings from it
+before the jitter is added, as single poachers do.
+"""
+import numpy as np
+
+STEER_INTERVAL = 2.0  # Seconds between direction changes, as for single poachers
+POACHER_SPEED = 10
+CAPTURE_DISTANCE = 20
+JITTER = 0.3
+DART_HIT_RADIUS = 30
+
+
+class PoacherWave:
+    def __init__(self, capacity=1024, seed=None):
+        self.count = 0
+        self.rng = np.random.default_rng(seed)
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        old = self.count
+        def grow(name, shape, dtype, fill=0):
+            array = np.full(shape, fill, dtype=dtype)
+            if old:
+                array[:old] = getattr(self, name)[:old]
+            setattr(self, name, array)
+        grow("pos", (capacity, 3), np.float64)
+        grow("target", capacity, np.int64, -1)  # Animal handle
+        grow("next_steer", capacity, np.float64)
+        grow("active", capacity, bool, False)
+        grow("captured", capacity, bool, False)
+        self.capacity = capacity
+
+    def spawn(self, count, now, edge, z=30):
+        """Adds count poachers spread along the edges of the [-edge, edge] square."""
+        if self.count + count > self.capacity:
+            self._allocate(max(self.count + count, self.capacity * 2))
+        new = slice(self.count, self.count + count)
+        side = self.rng.integers(0, 4, count)  # 0=top, 1=right, 2=bottom, 3=left
+        along = self.rng.uniform(-edge, edge, count)
+        x = np.select([side == 0, side == 1, side == 2], [along, edge, along], -edge)
+        y = np.select([side == 0, side == 1, side == 2], [edge, along, -edge], along)
+        self.pos[new, 0] = x
+        self.pos[new, 1] = y
+        self.pos[new, 2] = z
+        self.target[new] = -1  # Picked on the first update
+        # Stagger steering so the wave doesn't all move on the same tick
+        self.next_steer[new] = now + self.rng.uniform(0, STEER_INTERVAL, count)
+        self.active[new] = True
+        self.captured[new] = False
+        self.count += count
+
+    def live(self):
+        n = self.count
+        return self.active[:n] & ~self.captured[:n]
+
+    def live_count(self):
+        return int(np.count_nonzero(self.live()))
+
+    def update(self, now, animal_pos, animal_ok, animal_handles, resolve, ground=None, influence=None):
+        """Steps every due poacher; returns indices of animals captured this tick.
+
+        animal_pos is (M, 2) and animal_ok (M,) marks animals that can still be taken.
+        Targets are stored as handles: animal_handles (M,) gives each animal's handle
+        and resolve maps an array of handles to animal indices (-1 once removed).
+        ground, if given, maps (xs, ys) arrays to the z the poachers should stand at.
+        influence, if given, is the InfluenceMap that steers the poachers round danger.
+        """
+        n = self.count
+        if n == 0:
+            return np.empty(0, dtype=np.int64)
+        live = self.live()
+        target = self.target[:n]
+        index = resolve(target)
+
+        # Retarget poachers whose animal is gone (or who never had one)
+        has_target = index >= 0
+        lost = live & ~(has_target & animal_ok[np.where(has_target, index, 0)])
+        if lost.any():
+            candidates = np.nonzero(animal_ok)[0]
+            if len(candidates) == 0:
+                self.active[:n][lost] = False  # No more targets available
+            else:
+                index[lost] = self.rng.choice(candidates, int(lost.sum()))
+                target[lost] = animal_handles[index[lost]]
+
+        due = np.nonzero(live & ~lost & (now >= self.next_steer[:n]))[0]
+        if len(due) == 0:
+            return np.empty(0, dtype=np.int64)
+        self.next_steer[due] = now + STEER_INTERVAL
+
+        delta = animal_pos[index[due]] - self.pos[due, :2]
+        length = np.hypot(delta[:, 0], delta[:, 1])
+
+        caught = length < CAPTURE_DISTANCE
+        self.active[due[caught]] = False
+        captured_animals = np.unique(index[due[caught]])
+
+        moving = due[~caught & (length > 0)]
+        direction = delta[~caught & (length > 0)] / length[~caught & (length > 0), None]
+        if influence is not None and len(moving):
+            direction = influence.steer(self.pos[moving], direction)
+        direction += self.rng.uniform(-JITTER, JITTER, direction.shape)
+        norm = np.hypot(direction[:, 0], direction[:, 1])
+        direction /= np.where(norm > 0, norm, 1)[:, None]
+        self.pos[moving, :2] += direction * POACHER_SPEED
+        if ground is not None and len(moving):
+            self.pos[moving, 2] = ground(self.pos[moving, 0], self.pos[moving, 1])
+        return captured_animals
+
+    def dart_hit(self, x, y, radius=DART_HIT_RADIUS):
+        """Captures the first live poacher within radius of (x, y); returns its index or None."""
+        n = self.count
+        if n == 0:
+            return None
+        d2 = (self.pos[:n, 0] - x) ** 2 + (self.pos[:n, 1] - y) ** 2
+        hits = np.nonzero(self.live() & (d2 < radius * radius))[0]
+        if len(hits) == 0:
+            return None
+        self.captured[hits[0]] = True
+        return int(hits[0])